@@ -0,0 +1,102 @@
+"""Regenerate the fixed benchmark fixtures.
+
+The fixtures are committed; run this only when changing them on purpose,
+since results are only comparable against baselines recorded on the same
+fixtures. Everything is derived from ``Model/dataset.xlsx`` and a fixed
+seed, so the output is byte-for-byte reproducible.
+
+The pages are synthetic: product-card markup with padding styles and
+scripts, filled with dataset strings. Captured retail pages cannot be
+redistributed with the repository and would not stay reproducible, so
+these stand in for them. They exercise the same parser and extractor
+paths, but real pages carry more nesting, inline JSON and boilerplate,
+so absolute timings are optimistic.
+
+    python -m benchmarks.make_fixtures
+"""
+
+import html
+import json
+import random
+from pathlib import Path
+from typing import List
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+DATASET_PATH = Path(__file__).resolve().parents[2] / "Model" / "dataset.xlsx"
+SEED = 20240917
+
+SHORT_STRINGS = 2000
+LONG_STRINGS = 300
+# (name, product cards) -> roughly 12 KB, 80 KB and 630 KB of markup.
+PAGES = (("small", 12), ("medium", 120), ("large", 1000))
+
+FILLER = (
+    "Our team carefully selects every product for quality and durability. "
+    "Read the full specifications below before placing an order, and contact "
+    "support if you have questions about sizing, materials or delivery times."
+)
+
+
+def _dataset_strings() -> List[str]:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(DATASET_PATH, read_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(min_row=2, values_only=True)
+        return [str(row[0]).strip() for row in rows if row and row[0] and str(row[0]).strip()]
+    finally:
+        workbook.close()
+
+
+def _corpus(strings: List[str], rng: random.Random) -> List[dict]:
+    items = [{"kind": "short", "text": rng.choice(strings)} for _ in range(SHORT_STRINGS)]
+    for _ in range(LONG_STRINGS):
+        parts = [rng.choice(strings) for _ in range(rng.randint(8, 30))]
+        items.append({"kind": "long", "text": " ".join(parts)})
+    return items
+
+
+def _page(strings: List[str], cards: int, rng: random.Random) -> str:
+    pick = lambda: html.escape(rng.choice(strings))  # noqa: E731
+    out = [
+        "<!DOCTYPE html>",
+        '<html lang="en"><head><meta charset="utf-8"><title>Shop</title>',
+        "<style>" + ".card{padding:8px;border:1px solid #ddd}" * 40 + "</style>",
+        "<script>" + "window.dataLayer=window.dataLayer||[];" * 60 + "</script>",
+        "</head><body>",
+        '<header><nav><a href="/">Home</a> <a href="/deals">Deals</a> <a href="/account">Account</a></nav></header>',
+        f'<div class="banner"><p>{pick()}</p><button>{pick()}</button></div>',
+    ]
+    for index in range(cards):
+        out.append(
+            f'<div class="card" id="p{index}"><h3>Product {index}</h3>'
+            f"<p>{pick()}</p><p>{FILLER}</p>"
+            f'<span class="price">${rng.randint(5, 500)}.99</span>'
+            f'<form><input type="submit" value="{pick()}"><input type="hidden" name="sku" value="{index}"></form>'
+            f'<button class="cta">{pick()}</button>'
+            f'<a href="/product/{index}?utm_source=list">Details</a>'
+            f"<script>track({index});</script></div>"
+        )
+    out.append(f'<div id="cookie"><p>{pick()}</p><button>Accept all</button><button>{pick()}</button></div>')
+    out.append(f"<footer><p>{FILLER}</p></footer></body></html>")
+    return "\n".join(out)
+
+
+def main() -> None:
+    rng = random.Random(SEED)
+    strings = _dataset_strings()
+    FIXTURES_DIR.mkdir(exist_ok=True)
+
+    with open(FIXTURES_DIR / "corpus.jsonl", "w", encoding="utf-8") as handle:
+        for item in _corpus(strings, rng):
+            handle.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    for name, cards in PAGES:
+        (FIXTURES_DIR / f"page_{name}.html").write_text(_page(strings, cards, rng), encoding="utf-8")
+
+    for path in sorted(FIXTURES_DIR.iterdir()):
+        print(f"{path.name}: {path.stat().st_size} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Offline audit of near-duplicate reuse on the training dataset.
+
+Holds out a seeded random sample of the dataset strings, fills a
+NearDuplicateIndex with the verdicts of the remaining strings, then looks
+up every held-out string and compares the verdict reuse would have given
+with the one it is actually scored. This is what ``NEAR_DUP_MODE=audit``
+measures on live traffic, run on fixed data.
+
+    python -m benchmarks.near_duplicates
+    python -m benchmarks.near_duplicates --max-distance 5 --held-out 1000
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+
+def audit(strings: List[str], held_out: int, max_distance: int, seed: int) -> Dict[str, Any]:
+    os.environ["PREDICTION_CACHE_BYTES"] = "0"
+    os.environ["INFERENCE_BACKEND"] = "inline"
+    os.environ["NEAR_DUP_MODE"] = "off"
+    from pipeline.inference import InferenceService
+    from pipeline.near_duplicates import NearDuplicateIndex, simhash_many
+
+    strings = sorted(set(strings))
+    random.Random(seed).shuffle(strings)
+    queries, known = strings[:held_out], strings[held_out:]
+
+    service = InferenceService()
+    index = NearDuplicateIndex(service.fingerprint, max_distance=max_distance, max_entries=len(known), audit=True)
+    index.add_many(simhash_many(known), service._verdicts(known))
+
+    _, matches = index.lookup(queries)
+    index.record_audit(matches, service._verdicts(queries))
+    stats = index.stats()
+    return {
+        "strings": len(strings),
+        "held_out": len(queries),
+        "max_distance": max_distance,
+        "matched": stats["matches"],
+        "matched_ratio": stats["matches"] / len(queries) if queries else 0.0,
+        "disagreements": stats["disagreements"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Audit near-duplicate reuse on the training dataset.")
+    parser.add_argument("--held-out", type=int, default=600, help="Strings looked up against the rest (default: 600)")
+    parser.add_argument("--max-distance", type=int, default=3, help="SimHash distance in bits (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the held-out sample")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    from benchmarks.make_fixtures import _dataset_strings
+
+    result = audit(_dataset_strings(), args.held_out, args.max_distance, args.seed)
+    print(
+        f"{result['held_out']} held-out of {result['strings']} distinct strings, distance {result['max_distance']}: "
+        f"{result['matched']} matched ({result['matched_ratio']:.0%}), {result['disagreements']} disagreements"
+    )
+
+
+if __name__ == "__main__":
+    main()
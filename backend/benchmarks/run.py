@@ -0,0 +1,314 @@
+"""Offline benchmarks for the preprocess -> score -> predict_chunks -> extract paths.
+
+Each stage runs over the committed fixtures in ``benchmarks/fixtures``,
+timed for several rounds (per-call latencies -> p50, p99; throughput is
+taken from the fastest round) and then once more under
+``tracemalloc`` for peak memory, so allocation tracing never skews the
+timings. No network access is needed.
+
+    python -m benchmarks.run                          # print results
+    python -m benchmarks.run --save baseline.json     # record a baseline
+    python -m benchmarks.run --compare baseline.json  # exit 1 on regressions
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+RESULTS_VERSION = 1
+
+# Compared metrics and whether larger values are better.
+COMPARED_METRICS = {"throughput": True, "p50_ms": False, "peak_kib": False, "bytes": False}
+
+
+class Stage:
+    """A benchmark stage: a callable applied to each of its inputs in turn.
+
+    Stages producing payloads pass ``size`` to also report output bytes per call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        unit: str,
+        inputs: Sequence[Any],
+        call: Callable[[Any], Any],
+        weight: Callable[[Any], int] = lambda _: 1,
+        size: Optional[Callable[[Any], int]] = None,
+    ):
+        self.name = name
+        self.unit = unit
+        self.inputs = inputs
+        self.call = call
+        self.weight = weight
+        self.size = size
+
+
+def load_fixtures() -> Dict[str, Any]:
+    with open(FIXTURES_DIR / "corpus.jsonl", encoding="utf-8") as handle:
+        corpus = [json.loads(line) for line in handle if line.strip()]
+    pages = {
+        path.stem.replace("page_", ""): path.read_text(encoding="utf-8")
+        for path in sorted(FIXTURES_DIR.glob("page_*.html"))
+    }
+    return {"corpus": corpus, "pages": pages}
+
+
+def build_stages(fixtures: Dict[str, Any]) -> List[Stage]:
+    from bs4 import BeautifulSoup
+
+    from pipeline.inference import InferenceService
+    from pipeline.preprocess import preprocess_text
+    from webscraper.extract import extract_chunks
+
+    service = InferenceService(backend="inline")
+    # Measure scoring itself, not verdict-cache hits on repeated inputs.
+    service.cache = None
+    service.warm_up()
+    lexicon = service.lexicon
+
+    short = [item["text"] for item in fixtures["corpus"] if item["kind"] == "short"]
+    long = [item["text"] for item in fixtures["corpus"] if item["kind"] == "long"]
+    processed_short = [preprocess_text(text, lexicon=lexicon) for text in short]
+    processed_long = [preprocess_text(text, lexicon=lexicon) for text in long]
+    pages = list(fixtures["pages"].items())
+    page_chunks = [extract_chunks(markup) for _, markup in pages]
+
+    stages = [
+        Stage("preprocess_short", "texts", short, lambda text: preprocess_text(text, lexicon=lexicon)),
+        Stage("preprocess_long", "texts", long, lambda text: preprocess_text(text, lexicon=lexicon)),
+        Stage("score_short", "texts", processed_short, lambda text: service._score([text])),
+        Stage("score_long", "texts", processed_long, lambda text: service._score([text])),
+        Stage("predict_chunks_page", "chunks", page_chunks, service.predict_chunks, weight=len),
+        Stage(
+            "predict_chunks_page_explain",
+            "chunks",
+            page_chunks,
+            lambda chunks: service.predict_chunks(chunks, explain=5),
+            weight=len,
+        ),
+    ]
+    for name, markup in pages:
+        stages.append(Stage(f"extract_{name}", "pages", [markup], extract_chunks))
+        stages.append(Stage(f"soup_parse_{name}", "pages", [markup], lambda html: BeautifulSoup(html, "lxml")))
+    stages.extend(_encode_stages([service.predict_chunks(chunks) for chunks in page_chunks]))
+    return stages
+
+
+def _encode_stages(page_predictions: List[List[Dict[str, Any]]]) -> List[Stage]:
+    import gzip
+
+    from fastapi.encoders import jsonable_encoder
+
+    from pipeline import responses
+    from routes.url_route import _compact, _summarize
+
+    def page_result(predictions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Every chunk flagged: the largest response a page can produce.
+        return _summarize([{**prediction, "prediction": 1} for prediction in predictions])
+
+    def batch_result(repeat: int) -> Dict[str, Any]:
+        results = [
+            {"url": f"https://shop.example/{index}", "status": "ok", **page_result(predictions)}
+            for index in range(repeat)
+            for predictions in page_predictions
+        ]
+        return {"total_urls": len(results), "results": results}
+
+    def compact(result: Dict[str, Any]) -> Dict[str, Any]:
+        result = json.loads(json.dumps(result))
+        table = responses.ChunkTable()
+        for page in result.get("results", [result]):
+            _compact(page, table)
+        result["chunks"] = table.texts
+        return result
+
+    payloads = {"page": page_result(max(page_predictions, key=len)), "batch": batch_result(10)}
+    stages = []
+    for name, payload in payloads.items():
+        compacted = compact(payload)
+        encoders = {
+            # FastAPI's path for a returned dict: jsonable_encoder, then json.dumps.
+            "default": lambda content: json.dumps(
+                jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8"),
+            "fast": responses.dumps,
+            "gzip": lambda content: gzip.compress(responses.dumps(content), compresslevel=responses.RESPONSE_GZIP_LEVEL),
+        }
+        if responses.brotli is not None:
+            encoders["brotli"] = lambda content: responses.brotli.compress(
+                responses.dumps(content), quality=responses.RESPONSE_BROTLI_QUALITY
+            )
+        for encoder_name, encode in encoders.items():
+            stages.append(Stage(f"encode_{name}_{encoder_name}", "payloads", [payload], encode, size=lambda body: len(body)))
+        stages.append(Stage(f"encode_{name}_compact", "payloads", [compacted], responses.dumps, size=lambda body: len(body)))
+        stages.append(
+            Stage(
+                f"encode_{name}_compact_gzip",
+                "payloads",
+                [compacted],
+                lambda content: gzip.compress(responses.dumps(content), compresslevel=responses.RESPONSE_GZIP_LEVEL),
+                size=lambda body: len(body),
+            )
+        )
+    return stages
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_stage(stage: Stage, min_time: float, min_rounds: int) -> Dict[str, Any]:
+    for item in stage.inputs[: max(1, len(stage.inputs) // 10)]:
+        stage.call(item)
+
+    latencies: List[float] = []
+    elapsed = 0.0
+    rounds = 0
+    best_throughput = 0.0
+    units_per_round = sum(stage.weight(item) for item in stage.inputs)
+    gc.collect()
+    while rounds < min_rounds or elapsed < min_time:
+        round_elapsed = 0.0
+        for item in stage.inputs:
+            started = time.perf_counter()
+            stage.call(item)
+            duration = time.perf_counter() - started
+            latencies.append(duration)
+            round_elapsed += duration
+        elapsed += round_elapsed
+        rounds += 1
+        # The fastest round is the least disturbed by other load on the host.
+        if round_elapsed > 0:
+            best_throughput = max(best_throughput, units_per_round / round_elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    outputs = [stage.call(item) for item in stage.inputs]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    result = {
+        "unit": stage.unit,
+        "calls": len(latencies),
+        "throughput": best_throughput,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "peak_kib": peak / 1024,
+    }
+    if stage.size is not None:
+        result["bytes"] = sum(stage.size(output) for output in outputs) // len(outputs)
+    return result
+
+
+def _environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+def run(stage_filter: Optional[List[str]], min_time: float, min_rounds: int) -> Dict[str, Any]:
+    stages = build_stages(load_fixtures())
+    if stage_filter:
+        stages = [stage for stage in stages if any(stage.name.startswith(prefix) for prefix in stage_filter)]
+    results = {}
+    for stage in stages:
+        results[stage.name] = run_stage(stage, min_time, min_rounds)
+        print(_format_row(stage.name, results[stage.name]), flush=True)
+    return {
+        "version": RESULTS_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": _environment(),
+        "stages": results,
+    }
+
+
+def _format_row(name: str, result: Dict[str, Any]) -> str:
+    row = (
+        f"{name:<24} {result['throughput']:>12.1f} {result['unit']}/s"
+        f"  p50 {result['p50_ms']:>9.3f} ms  p99 {result['p99_ms']:>9.3f} ms"
+        f"  peak {result['peak_kib']:>9.1f} KiB"
+    )
+    if "bytes" in result:
+        row += f"  {result['bytes']:>10,} B"
+    return row
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return one message per metric that regressed by more than threshold."""
+    regressions = []
+    for name, result in current["stages"].items():
+        reference = baseline["stages"].get(name)
+        if reference is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in reference or metric not in result:
+                continue
+            old, new = reference[metric], result[metric]
+            if old <= 0:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append(f"{name}.{metric}: {old:.3f} -> {new:.3f} ({change:+.1%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline pipeline benchmarks.")
+    parser.add_argument("--stage", action="append", help="Only run stages starting with this prefix (repeatable)")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Minimum timed seconds per stage")
+    parser.add_argument("--min-rounds", type=int, default=3, help="Minimum passes over each stage's inputs")
+    parser.add_argument("--save", type=Path, help="Write results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    results = run(args.stage, args.min_time, args.min_rounds)
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%} against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
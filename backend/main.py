@@ -6,15 +6,25 @@ from pathlib import Path
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+import anyio.to_thread
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
+from pipeline.admission import AdmissionController, AdmissionMiddleware, Rejected, rejection_response
+from pipeline.batching import MicroBatcher
+from pipeline.metrics import metrics
+from pipeline.tracing import TraceDisabled
+from pipeline.worker_pool import InferencePoolSaturated
+from webscraper.page_cache import get_shared_page_cache
+from webscraper.session import session_stats
+
 logger = logging.getLogger(__name__)
 
 _inference_service = None
+_admission = AdmissionController.from_env()
 
 def get_inference_service():
     global _inference_service
@@ -36,16 +46,28 @@ def get_inference_service():
 async def lifespan(app: FastAPI):
     try:
         logger.info("🚀 Starting up application...")
-        app.state.inference_service = get_inference_service()
+        service = get_inference_service()
+        service.warm_up()
+        batcher = MicroBatcher.from_env(service)
+        batcher.start()
+        app.state.inference_service = batcher
+        # Admitted requests must never wait for a thread, and health checks
+        # and /metrics still need one when every pool slot is taken.
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        limiter.total_tokens = max(limiter.total_tokens, _admission.thread_demand + 8)
         logger.info("✅ Application startup complete")
     except Exception as e:
         logger.critical(f"💥 STARTUP FAILED: {e}", exc_info=True)
         raise
     yield
     logger.info("🛑 Shutting down application...")
+    batcher.close()
+    service.close()
 
 app = FastAPI(title="Dark Pattern Detection API", lifespan=lifespan)
+app.state.admission = _admission
 
+app.add_middleware(AdmissionMiddleware, controller=_admission)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -57,8 +79,10 @@ app.add_middleware(
 try:
     from routes.analyze_route import router as analyze_router
     from routes.url_route import router as url_router
+    from routes.crawl_route import router as crawl_router
     app.include_router(analyze_router)
     app.include_router(url_router)
+    app.include_router(crawl_router)
     logger.info("✅ Routers loaded successfully")
 except ImportError as e:
     logger.error(f"❌ Error importing routers: {e}", exc_info=True)
@@ -68,6 +92,7 @@ except ImportError as e:
 async def request_validation_exception_handler(_: Request, exc: RequestValidationError):
     first_error = exc.errors()[0] if exc.errors() else None
     message = first_error.get("msg", "Invalid request payload") if first_error else "Invalid request payload"
+    metrics.inc("errors_total", type="http_422")
     return JSONResponse(
         status_code=422,
         content={"status": "error", "message": message},
@@ -76,24 +101,125 @@ async def request_validation_exception_handler(_: Request, exc: RequestValidatio
 @app.exception_handler(HTTPException)
 async def http_exception_handler(_: Request, exc: HTTPException):
     detail = exc.detail if isinstance(exc.detail, str) else "Request failed"
+    metrics.inc("errors_total", type=f"http_{exc.status_code}")
     return JSONResponse(
         status_code=exc.status_code,
         content={"status": "error", "message": detail},
     )
 
+@app.exception_handler(InferencePoolSaturated)
+async def inference_pool_saturated_handler(_: Request, exc: InferencePoolSaturated):
+    metrics.inc("errors_total", type="inference_pool_saturated")
+    return JSONResponse(
+        status_code=503,
+        content={"status": "error", "message": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(Rejected)
+async def rejected_handler(_: Request, exc: Rejected):
+    # Raised when a fetch route cannot get an inference slot.
+    logger.warning(f"Rejected inference ({exc.reason})")
+    return rejection_response(exc)
+
+@app.exception_handler(TraceDisabled)
+async def trace_disabled_handler(_: Request, exc: TraceDisabled):
+    metrics.inc("errors_total", type="http_403")
+    return JSONResponse(
+        status_code=403,
+        content={"status": "error", "message": str(exc)},
+    )
+
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(_: Request, exc: Exception):
     logger.exception("❌ Unhandled server error: %s", exc)
+    metrics.inc("errors_total", type=type(exc).__name__)
     return JSONResponse(
         status_code=500,
         content={"status": "error", "message": "Internal server error"},
     )
 
 @app.get("/")
-def health_check() -> dict:
+def health_check(request: Request) -> dict:
     service_status = "loaded" if _inference_service is not None else "not loaded"
+    cache = _inference_service.cache if _inference_service is not None else None
+    batcher = getattr(request.app.state, "inference_service", None)
     return {
         "message": "Dark Pattern Detection API",
         "status": "running",
         "inference_service": service_status,
-    }
\ No newline at end of file
+        "prediction_cache": cache.stats() if cache is not None else None,
+        "batching": batcher.stats() if isinstance(batcher, MicroBatcher) else None,
+        "worker_pool": _inference_service.pool.stats() if _inference_service is not None and _inference_service.pool else None,
+        "near_duplicates": (
+            _inference_service.near_duplicates.stats()
+            if _inference_service is not None and _inference_service.near_duplicates
+            else None
+        ),
+        "admission": _admission.stats(),
+        "http_session": session_stats(),
+    }
+
+def _component_metrics():
+    """Expose counters the caches, batcher and worker pool already keep."""
+    cache = _inference_service.cache if _inference_service is not None else None
+    if cache is not None:
+        stats = cache.stats()
+        yield "prediction_cache_requests_total", "counter", "Verdict cache lookups by result.", [
+            ({"result": "hit"}, stats["hits"]),
+            ({"result": "miss"}, stats["misses"]),
+        ]
+        yield "prediction_cache_bytes", "gauge", "Approximate size of the in-memory verdict cache.", [({}, stats["bytes"])]
+
+    page_cache = get_shared_page_cache()
+    if page_cache is not None:
+        stats = page_cache.stats()
+        yield "page_cache_requests_total", "counter", "Page cache lookups by result.", [
+            ({"result": "hit"}, stats["hits"]),
+            ({"result": "revalidated"}, stats["revalidations"]),
+            ({"result": "miss"}, stats["misses"]),
+        ]
+
+    session = session_stats()
+    yield "http_host_pools", "gauge", "Per-host connection pools kept by the shared fetch session.", [({}, session["host_pools"])]
+    yield "dns_cache_entries", "gauge", "Hosts with a cached DNS answer.", [({}, session["dns_entries"])]
+
+    batcher = getattr(app.state, "inference_service", None)
+    if isinstance(batcher, MicroBatcher) and batcher.running:
+        yield "batch_size", "histogram", "Texts per micro-batched predict_many call.", [({}, batcher.batch_sizes)]
+        yield "batch_queue_depth", "histogram", "Queued texts when a micro-batch is dispatched.", [({}, batcher.queue_depths)]
+
+    pool = _inference_service.pool if _inference_service is not None else None
+    if pool is not None:
+        stats = pool.stats()
+        yield "inference_pool_in_flight", "gauge", "Slices currently scored by worker processes.", [({}, stats["in_flight"])]
+        yield "inference_pool_restarts_total", "counter", "Worker pool rebuilds after a crash.", [({}, stats["restarts"])]
+        yield "inference_pool_rejected_total", "counter", "Batches rejected by a saturated worker pool.", [({}, stats["rejected"])]
+
+    near_duplicates = _inference_service.near_duplicates if _inference_service is not None else None
+    if near_duplicates is not None:
+        stats = near_duplicates.stats()
+        yield "near_duplicate_lookups_total", "counter", "Chunks looked up in the near-duplicate index by result.", [
+            ({"result": "match"}, stats["matches"]),
+            ({"result": "miss"}, stats["lookups"] - stats["matches"]),
+        ]
+        yield "near_duplicate_audited_total", "counter", "Audited near-duplicate matches by outcome.", [
+            ({"outcome": "agree"}, stats["audited"] - stats["disagreements"]),
+            ({"outcome": "disagree"}, stats["disagreements"]),
+        ]
+        yield "near_duplicate_entries", "gauge", "Signatures held by the near-duplicate index.", [({}, stats["entries"])]
+
+    pools = _admission.pools.values()
+    if pools:
+        yield "admission_queue_depth", "gauge", "Requests waiting for an admission slot.", [
+            ({"pool": pool.name}, pool.queue_depth) for pool in pools
+        ]
+        yield "admission_in_flight", "gauge", "Requests holding an admission slot.", [
+            ({"pool": pool.name}, pool.in_flight) for pool in pools
+        ]
+
+metrics.add_collector(_component_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
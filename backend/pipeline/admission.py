@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Deque, Dict, Iterator, Optional, Tuple
+
+import anyio.from_thread
+from starlette.responses import JSONResponse
+
+from pipeline.metrics import STAGE_SECONDS_BUCKETS, metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("admission_rejected_total", "counter", "Requests rejected before running, by pool and reason.")
+metrics.describe("admission_wait_seconds", "histogram", "Time admitted requests waited for a slot.", STAGE_SECONDS_BUCKETS)
+
+MAX_RETRY_AFTER = 60
+# Weight of the latest request in the moving average of slot hold times.
+HOLD_TIME_SMOOTHING = 0.2
+
+FETCH_ROUTES = frozenset({"/detect-from-url", "/detect-from-url/stream", "/detect-from-urls", "/crawl"})
+INFERENCE_ROUTES = frozenset({"/analyze", "/detect-from-text", "/analyze-batch"})
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, reason: str, message: str, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def rejection_response(rejected: Rejected) -> JSONResponse:
+    """The API's error body for a rejected request, with a Retry-After header."""
+    return JSONResponse(
+        status_code=rejected.status_code,
+        content={"status": "error", "message": str(rejected)},
+        headers={"Retry-After": str(rejected.retry_after)},
+    )
+
+
+class AdmissionPool:
+    """
+    Bounds how many requests of one kind run at once, with a bounded FIFO wait queue.
+
+    Waiting happens on the event loop, so queued requests hold no threadpool
+    thread. A request is rejected when the queue is full, when the expected
+    wait (queued requests times the average hold time, spread over the
+    slots) already exceeds max_wait, or when it has waited max_wait without
+    getting a slot. Not thread-safe: acquire() and release() run on the
+    event loop.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+        self.hold_seconds: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._wait_seconds = metrics.histogram("admission_wait_seconds", pool=name)
+
+    @classmethod
+    def from_env(cls, name: str, concurrency: int, max_queue: int, max_wait_ms: float) -> Optional["AdmissionPool"]:
+        prefix = f"ADMISSION_{name.upper()}"
+        concurrency = int(os.environ.get(f"{prefix}_CONCURRENCY", concurrency))
+        if concurrency <= 0:
+            return None
+        return cls(
+            name,
+            concurrency,
+            max_queue=int(os.environ.get(f"{prefix}_QUEUE", max_queue)),
+            max_wait=float(os.environ.get(f"{prefix}_MAX_WAIT_MS", max_wait_ms)) / 1000.0,
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        if self.hold_seconds is None:
+            return 0.0
+        return (len(self._waiters) + 1) * self.hold_seconds / self.concurrency
+
+    def _reject(self, reason: str) -> Rejected:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        metrics.inc("admission_rejected_total", pool=self.name, reason=reason)
+        retry_after = min(MAX_RETRY_AFTER, max(1, math.ceil(self.expected_wait())))
+        cause = "queue is full" if reason == "queue_full" else f"queue wait exceeds {self.max_wait:g}s"
+        return Rejected(503, reason, f"Server busy ({self.name} {cause}), retry later", retry_after)
+
+    async def acquire(self) -> None:
+        """
+        Wait for a slot.
+
+        Raises:
+            Rejected: If the queue is full or the wait would pass max_wait
+        """
+        if self.in_flight < self.concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            self._wait_seconds.observe(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        if self.expected_wait() > self.max_wait:
+            raise self._reject("deadline")
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as the wait ended; pass it on.
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject("deadline") from None
+        self.admitted += 1
+        self._wait_seconds.observe(time.monotonic() - started)
+
+    def release(self, held: Optional[float] = None) -> None:
+        if held is not None:
+            self.hold_seconds = (
+                held
+                if self.hold_seconds is None
+                else self.hold_seconds + HOLD_TIME_SMOOTHING * (held - self.hold_seconds)
+            )
+        # The slot moves straight to the oldest live waiter.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Hold a slot around work on a threadpool thread, e.g. the inference
+        step of a fetch route or of a streamed response body.
+
+        acquire() and release() still run on the event loop.
+
+        Raises:
+            Rejected: As acquire()
+        """
+        anyio.from_thread.run(self.acquire)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            anyio.from_thread.run_sync(self.release, time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "hold_ms": self.hold_seconds * 1000.0 if self.hold_seconds is not None else None,
+        }
+
+
+class ClientRateLimiter:
+    """
+    Per-client token buckets: rate requests per second with bursts of up to burst.
+
+    Clients are identified by a request header (e.g. an API key) or, without
+    one, by the peer address. At most max_clients buckets are kept; the least
+    recently seen client is forgotten first, which only makes it start over
+    with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, client_header: Optional[str] = None, max_clients: int = 10_000):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.client_header = client_header.lower().encode("latin-1") if client_header else None
+        self.max_clients = max_clients
+        self.limited = 0
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> Optional["ClientRateLimiter"]:
+        rate = float(os.environ.get("CLIENT_RATE_LIMIT_PER_SECOND", 0))
+        if rate <= 0:
+            return None
+        return cls(
+            rate,
+            burst=float(os.environ.get("CLIENT_RATE_LIMIT_BURST", 10)),
+            client_header=os.environ.get("CLIENT_ID_HEADER") or None,
+        )
+
+    def client_id(self, scope: Dict[str, Any]) -> str:
+        if self.client_header is not None:
+            for name, value in scope.get("headers", ()):
+                if name == self.client_header:
+                    return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def take(self, client: str, pool: str) -> None:
+        """
+        Take one token from the client's bucket.
+
+        Raises:
+            Rejected: If the bucket is empty
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1.0:
+            self._buckets[client] = (tokens, now)
+            self.limited += 1
+            metrics.inc("admission_rejected_total", pool=pool, reason="rate_limited")
+            retry_after = min(MAX_RETRY_AFTER, max(1, math.ceil((1.0 - tokens) / self.rate)))
+            raise Rejected(429, "rate_limited", "Rate limit exceeded, retry later", retry_after)
+        self._buckets[client] = (tokens - 1.0, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "limited": self.limited,
+        }
+
+
+class AdmissionController:
+    """Maps request paths to their admission pool and the optional rate limiter."""
+
+    def __init__(
+        self,
+        fetch: Optional[AdmissionPool],
+        inference: Optional[AdmissionPool],
+        rate_limiter: Optional[ClientRateLimiter] = None,
+    ):
+        self.fetch = fetch
+        self.inference = inference
+        self.rate_limiter = rate_limiter
+        self.routes: Dict[str, AdmissionPool] = {}
+        if fetch is not None:
+            self.routes.update(dict.fromkeys(FETCH_ROUTES, fetch))
+        if inference is not None:
+            self.routes.update(dict.fromkeys(INFERENCE_ROUTES, inference))
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            fetch=AdmissionPool.from_env("fetch", concurrency=16, max_queue=32, max_wait_ms=5000),
+            inference=AdmissionPool.from_env("inference", concurrency=16, max_queue=256, max_wait_ms=1000),
+            rate_limiter=ClientRateLimiter.from_env(),
+        )
+
+    @property
+    def pools(self) -> Dict[str, AdmissionPool]:
+        return {pool.name: pool for pool in (self.fetch, self.inference) if pool is not None}
+
+    @property
+    def thread_demand(self) -> int:
+        """Threadpool threads the admitted requests can occupy at once."""
+        return sum(pool.concurrency for pool in self.pools.values())
+
+    def inference_slot(self) -> ContextManager[None]:
+        """
+        An inference pool slot for scoring done by a fetch route.
+
+        Fetch routes are admitted through the fetch pool, so their model
+        calls take an inference slot as well and CPU work stays bounded by
+        the inference pool whichever route it comes from.
+        """
+        return self.inference.slot() if self.inference is not None else nullcontext()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pools": {name: pool.stats() for name, pool in self.pools.items()},
+            "rate_limit": self.rate_limiter.stats() if self.rate_limiter is not None else None,
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that admits fetch and inference requests through their pools.
+
+    A slot is held until the response is fully sent, so streamed scans and
+    crawls count against the fetch pool for as long as they run. Rejections
+    are answered here with the API's error body and a Retry-After header.
+    """
+
+    def __init__(self, app: Any, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        pool = self.controller.routes.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if pool is None or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            limiter = self.controller.rate_limiter
+            if limiter is not None:
+                limiter.take(limiter.client_id(scope), pool.name)
+            await pool.acquire()
+        except Rejected as e:
+            logger.warning(f"Rejected {scope.get('path')} ({e.reason})")
+            await rejection_response(e)(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.release(time.monotonic() - started)
@@ -0,0 +1,246 @@
+"""Compact, memory-mappable export of the TF-IDF vectorizer + linear model.
+
+Layout (native byte order, recorded in the header)::
+
+    b"DPMA" | uint16 version | uint16 reserved | uint32 header length
+    header JSON (padded to 8 bytes)
+    float64 idf[n] | float64 weights[n] | uint32 term_offsets[n + 1] | UTF-8 terms
+
+Terms are stored sorted; ``weights`` holds ``idf * coef`` per term so scoring
+needs no other model state. The file is opened with ``mmap`` read-only, so
+every worker process maps the same page-cache copy of the arrays, and terms
+are looked up by binary search in the mapped table rather than through a
+per-process dictionary.
+
+Export from the backend directory with::
+
+    python -m pipeline.artifact ../Model/model.pkl ../Model/vectorizer.pkl -o ../Model/model.artifact
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ARTIFACT_MAGIC = b"DPMA"
+ARTIFACT_VERSION = 1
+ARTIFACT_SUFFIX = ".artifact"
+
+_PREAMBLE = struct.Struct("<4sHHI")
+_ALIGNMENT = 8
+# Term lookups memoized per process; hot tokens skip the binary search.
+LOOKUP_CACHE_SIZE = 16_384
+
+
+class ArtifactError(RuntimeError):
+    pass
+
+
+def _pad(length: int) -> int:
+    return -length % _ALIGNMENT
+
+
+def _checksum(meta: Dict[str, Any], payload: bytes) -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps(meta, sort_keys=True).encode("utf-8"))
+    digest.update(payload)
+    return digest.hexdigest()
+
+
+def _check_exportable(vectorizer: Any, model: Any) -> None:
+    from pipeline.scoring import CompiledLinearScorer, UnsupportedModelError
+
+    CompiledLinearScorer._check_supported(vectorizer, model)
+    if getattr(vectorizer, "analyzer", None) != "word":
+        raise UnsupportedModelError("Only word analyzers can be exported")
+    if vectorizer.preprocessor is not None or vectorizer.tokenizer is not None:
+        raise UnsupportedModelError("Custom preprocessors and tokenizers cannot be exported")
+    if vectorizer.strip_accents is not None:
+        raise UnsupportedModelError("strip_accents cannot be exported")
+    if re.compile(vectorizer.token_pattern).groups > 1:
+        raise UnsupportedModelError("token_pattern has more than one capturing group")
+
+
+def export_artifact(vectorizer: Any, model: Any, path: Path, source_fingerprint: Optional[str] = None) -> str:
+    """Write the artifact for a fitted vectorizer/model pair and return its checksum."""
+    _check_exportable(vectorizer, model)
+
+    coef = model.coef_[0]
+    idf_values = vectorizer.idf_ if vectorizer.use_idf else None
+    terms = sorted(vectorizer.vocabulary_)
+    idf = array("d")
+    weights = array("d")
+    offsets = array("I", [0])
+    encoded: List[bytes] = []
+    for term in terms:
+        column = vectorizer.vocabulary_[term]
+        term_idf = float(idf_values[column]) if idf_values is not None else 1.0
+        idf.append(term_idf)
+        weights.append(term_idf * float(coef[column]))
+        encoded.append(term.encode("utf-8"))
+        offsets.append(offsets[-1] + len(encoded[-1]))
+
+    stop_words = vectorizer.get_stop_words()
+    meta = {
+        "features": len(terms),
+        "byteorder": sys.byteorder,
+        "lowercase": bool(vectorizer.lowercase),
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "stop_words": sorted(stop_words) if stop_words else None,
+        "binary": bool(vectorizer.binary),
+        "sublinear_tf": bool(getattr(vectorizer, "sublinear_tf", False)),
+        "norm": vectorizer.norm,
+        "intercept": float(model.intercept_[0]) if len(model.intercept_) else 0.0,
+        "labels": [int(model.classes_[0]), int(model.classes_[1])],
+        "source_fingerprint": source_fingerprint,
+    }
+    payload = idf.tobytes() + weights.tobytes() + offsets.tobytes() + b"".join(encoded)
+    checksum = _checksum(meta, payload)
+
+    header = json.dumps({"meta": meta, "checksum": checksum}).encode("utf-8")
+    header += b" " * _pad(_PREAMBLE.size + len(header))
+
+    path = Path(path)
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as handle:
+        handle.write(_PREAMBLE.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, 0, len(header)))
+        handle.write(header)
+        handle.write(payload)
+    os.replace(temporary, path)
+    return checksum
+
+
+class ModelArtifact:
+    """Read-only, memory-mapped view of an exported model artifact."""
+
+    def __init__(self, path: Path, verify: bool = True):
+        self.path = Path(path).resolve()
+        with open(self.path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, _, header_length = _PREAMBLE.unpack_from(self._mmap, 0)
+        except struct.error:
+            raise ArtifactError(f"Truncated model artifact: {self.path}")
+        if magic != ARTIFACT_MAGIC:
+            raise ArtifactError(f"Not a model artifact: {self.path}")
+        if version != ARTIFACT_VERSION:
+            raise ArtifactError(f"Unsupported model artifact version {version}: {self.path}")
+
+        data_start = _PREAMBLE.size + header_length
+        header = json.loads(bytes(self._mmap[_PREAMBLE.size:data_start]))
+        self.meta: Dict[str, Any] = header["meta"]
+        self.checksum: str = header["checksum"]
+        if self.meta["byteorder"] != sys.byteorder:
+            raise ArtifactError(f"Model artifact was written on a {self.meta['byteorder']}-endian host")
+
+        view = memoryview(self._mmap)[data_start:]
+        if verify and _checksum(self.meta, view) != self.checksum:
+            view.release()
+            raise ArtifactError(f"Model artifact checksum mismatch: {self.path}")
+
+        n = self.meta["features"]
+        self.idf = view[: 8 * n].cast("d")
+        self.weights = view[8 * n: 16 * n].cast("d")
+        self._offsets = view[16 * n: 16 * n + 4 * (n + 1)].cast("I")
+        self._terms_start = data_start + 16 * n + 4 * (n + 1)
+        if len(self._mmap) - self._terms_start != self._offsets[n]:
+            raise ArtifactError(f"Truncated model artifact: {self.path}")
+        self.lookup = functools.lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._search)
+
+    def __len__(self) -> int:
+        return self.meta["features"]
+
+    def __getitem__(self, index: int) -> str:
+        return self.term(index)
+
+    def _term_bytes(self, index: int) -> bytes:
+        start = self._terms_start
+        return self._mmap[start + self._offsets[index]: start + self._offsets[index + 1]]
+
+    def term(self, index: int) -> str:
+        """The term of row ``index`` of ``idf`` / ``weights``."""
+        return self._term_bytes(index).decode("utf-8")
+
+    def _search(self, term: str) -> Optional[int]:
+        # Terms were sorted as str, which for UTF-8 is the same as sorting the bytes.
+        key = term.encode("utf-8", "surrogatepass")
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            probe = self._term_bytes(middle)
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return middle
+        return None
+
+    # lookup(term) -> Optional[int], set per instance in __init__: the row of
+    # a term in ``idf`` / ``weights``, or None if it is not in the vocabulary.
+
+    def analyzer(self) -> Callable[[str], List[str]]:
+        """Rebuild the vectorizer's word analyzer (lowercase, tokenize, stop words, n-grams)."""
+        token_pattern = re.compile(self.meta["token_pattern"])
+        lowercase = self.meta["lowercase"]
+        stop_words = frozenset(self.meta["stop_words"] or ())
+        min_n, max_n = self.meta["ngram_range"]
+
+        def analyze(text: str) -> List[str]:
+            if lowercase:
+                text = text.lower()
+            tokens = token_pattern.findall(text)
+            if stop_words:
+                tokens = [token for token in tokens if token not in stop_words]
+            if max_n == 1:
+                return tokens
+
+            # Same ordering as sklearn's _word_ngrams.
+            original = tokens
+            first_n = min_n
+            if min_n == 1:
+                tokens = list(original)
+                first_n += 1
+            else:
+                tokens = []
+            for n in range(first_n, min(max_n + 1, len(original) + 1)):
+                for start in range(len(original) - n + 1):
+                    tokens.append(" ".join(original[start: start + n]))
+            return tokens
+
+        return analyze
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export model.pkl + vectorizer.pkl to a memory-mappable artifact.")
+    parser.add_argument("model", type=Path, help="Path to model.pkl")
+    parser.add_argument("vectorizer", type=Path, help="Path to vectorizer.pkl")
+    parser.add_argument("-o", "--output", type=Path, help="Artifact path (default: model.artifact next to model.pkl)")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    from pipeline.cache import fingerprint_files
+
+    output = args.output or args.model.with_name("model" + ARTIFACT_SUFFIX)
+    checksum = export_artifact(
+        joblib.load(args.vectorizer),
+        joblib.load(args.model),
+        output,
+        source_fingerprint=fingerprint_files(args.model.resolve(), args.vectorizer.resolve()),
+    )
+    print(f"Wrote {output} ({output.stat().st_size} bytes, sha256 {checksum})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from pipeline.metrics import BucketHistogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-text predictions into one ``predict_many`` call.
+
+    Sync routes run on separate threadpool threads; each ``predict`` call is
+    queued and blocks on a future while a dispatcher thread gathers requests
+    for up to ``max_wait`` seconds or ``max_batch_items`` texts and scores
+    them together. Every other attribute is delegated to the wrapped service,
+    so routes use the batcher exactly like an ``InferenceService``.
+    """
+
+    def __init__(self, service: Any, max_batch_items: int = 64, max_wait: float = 0.002):
+        self.service = service
+        self.max_batch_items = max(1, max_batch_items)
+        self.max_wait = max(0.0, max_wait)
+        self.batch_sizes = BucketHistogram(BATCH_SIZE_BUCKETS)
+        self.queue_depths = BucketHistogram(QUEUE_DEPTH_BUCKETS)
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        # Guards _accepting so no request is queued after close() queued _STOP.
+        self._lock = threading.Lock()
+        self._accepting = False
+
+    @classmethod
+    def from_env(cls, service: Any) -> "MicroBatcher":
+        # Batching pays off when each call has a fixed cost (sklearn's
+        # transform/predict_proba); compiled scoring is per-text already and
+        # only gains queueing overhead, so it defaults to unbatched.
+        default_items = 64 if getattr(service, "scoring_mode", None) == "sklearn" else 1
+        return cls(
+            service,
+            max_batch_items=int(os.environ.get("INFERENCE_BATCH_MAX_ITEMS", default_items)),
+            max_wait=float(os.environ.get("INFERENCE_BATCH_MAX_WAIT_MS", 2)) / 1000.0,
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.service, name)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        # A one-item cap means batching is off: predict() calls the service directly.
+        if self.running or self.max_batch_items == 1:
+            return
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+        with self._lock:
+            self._accepting = True
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._accepting:
+                return
+            self._accepting = False
+            self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def predict(self, text: str) -> dict:
+        future: Optional[Future] = None
+        with self._lock:
+            if self._accepting:
+                future = Future()
+                self._queue.put((text, future))
+        if future is None:
+            return self.service.predict(text)
+        return future.result()
+
+    def _gather(self, first: Tuple[str, Future]) -> Tuple[List[Tuple[str, Future]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_items:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            self.queue_depths.observe(self._queue.qsize() + 1)
+            batch, stopping = self._gather(item)
+            self.batch_sizes.observe(len(batch))
+
+            try:
+                predictions = self.service.predict_many([text for text, _ in batch])
+            except Exception as e:
+                logger.exception("Batched prediction failed")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
+
+        # Requests still queued behind _STOP are served directly.
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                text, future = item
+                try:
+                    future.set_result(self.service.predict(text))
+                except Exception as e:
+                    future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_batch_items": self.max_batch_items,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_depth_at_dispatch": self.queue_depths.snapshot(),
+        }
@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (prediction, confidence), or None when the chunk is empty after preprocessing.
+Verdict = Optional[Tuple[int, float]]
+
+# Rough per-entry footprint of an OrderedDict slot holding a 16-byte key and a
+# small tuple; used for byte-budget accounting rather than exact measurement.
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+def fingerprint_files(*paths: Path) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_for_key(text: str) -> str:
+    return " ".join(str(text).split())
+
+
+def verdict_key(fingerprint: str, text: str) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(fingerprint.encode("ascii"))
+    digest.update(b"\0")
+    digest.update(normalize_for_key(text).encode("utf-8", "surrogatepass"))
+    return digest.digest()
+
+
+class SQLiteVerdictStore:
+    """On-disk verdict store shared by every worker pointed at the same file."""
+
+    def __init__(self, path: str, max_entries: int = 1_000_000):
+        self.path = str(Path(path).resolve())
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "key BLOB PRIMARY KEY, prediction INTEGER, confidence REAL, stored_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS verdicts_stored_at ON verdicts(stored_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get_many(self, keys: Iterable[bytes]) -> Dict[bytes, Verdict]:
+        keys = list(keys)
+        found: Dict[bytes, Verdict] = {}
+        if not keys:
+            return found
+        connection = self._connection()
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = connection.execute(
+                f"SELECT key, prediction, confidence FROM verdicts WHERE key IN ({placeholders})",
+                batch,
+            ).fetchall()
+            for key, prediction, confidence in rows:
+                found[bytes(key)] = None if prediction is None else (int(prediction), float(confidence))
+        return found
+
+    def set_many(self, items: Mapping[bytes, Verdict]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (key, None, None, now) if verdict is None else (key, verdict[0], verdict[1], now)
+            for key, verdict in items.items()
+        ]
+        with self._connection() as connection:
+            connection.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?)", rows)
+        self._writes += len(rows)
+        if self._writes >= 10_000:
+            self._writes = 0
+            self._trim()
+
+    def _trim(self) -> None:
+        with self._connection() as connection:
+            connection.execute(
+                "DELETE FROM verdicts WHERE key IN ("
+                "SELECT key FROM verdicts ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+
+class VerdictCache:
+    """Bounded in-process LRU of chunk verdicts, optionally backed by a shared store."""
+
+    def __init__(self, max_bytes: int, store: Optional[SQLiteVerdictStore] = None):
+        self.max_bytes = max_bytes
+        self.store = store
+        self._entries: "OrderedDict[bytes, Verdict]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(key: bytes) -> int:
+        return len(key) + _ENTRY_OVERHEAD_BYTES
+
+    def get_many(self, keys: Iterable[bytes]) -> Dict[bytes, Verdict]:
+        found: Dict[bytes, Verdict] = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+                else:
+                    missing.append(key)
+
+        if missing and self.store is not None:
+            try:
+                shared = self.store.get_many(missing)
+            except sqlite3.Error as e:
+                logger.warning("Verdict store read failed: %s", e)
+                shared = {}
+            if shared:
+                self._remember(shared)
+                found.update(shared)
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(set(missing) - found.keys())
+        return found
+
+    def set_many(self, items: Mapping[bytes, Verdict]) -> None:
+        if not items:
+            return
+        self._remember(items)
+        if self.store is not None:
+            try:
+                self.store.set_many(items)
+            except sqlite3.Error as e:
+                logger.warning("Verdict store write failed: %s", e)
+
+    def _remember(self, items: Mapping[bytes, Verdict]) -> None:
+        with self._lock:
+            for key, verdict in items.items():
+                if key not in self._entries:
+                    self._bytes += self._entry_size(key)
+                self._entries[key] = verdict
+                self._entries.move_to_end(key)
+            while self._bytes > self.max_bytes and self._entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(evicted)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
@@ -0,0 +1,29 @@
+from typing import Any, Dict, List, Sequence
+
+
+def top_contributions(contributions: Any, terms: Sequence[str], top_k: int) -> List[List[Dict[str, Any]]]:
+    """
+    Top-k positive entries of each row of a sparse contribution matrix,
+    largest first, as [{"token", "weight"}] lists.
+
+    Selection runs over all rows at once: entries are sorted by (row,
+    -weight, column) and each row keeps its first top_k. Ties go to the
+    lower column, so the order does not depend on how the matrix was built.
+    """
+    import numpy as np
+
+    matrix = contributions.tocsr()
+    row_count = matrix.shape[0]
+    rows = np.repeat(np.arange(row_count), np.diff(matrix.indptr))
+    positive = matrix.data > 0
+    rows, columns, weights = rows[positive], matrix.indices[positive], matrix.data[positive]
+
+    order = np.lexsort((columns, -weights, rows))
+    rows, columns, weights = rows[order], columns[order], weights[order]
+    starts = np.searchsorted(rows, np.arange(row_count))
+    keep = np.arange(len(rows)) - starts[rows] < top_k
+
+    explanations: List[List[Dict[str, Any]]] = [[] for _ in range(row_count)]
+    for row, column, weight in zip(rows[keep].tolist(), columns[keep].tolist(), weights[keep].tolist()):
+        explanations[row].append({"token": terms[column], "weight": weight})
+    return explanations
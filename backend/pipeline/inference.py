@@ -1,14 +1,45 @@
+import logging
 import os
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-import joblib
+from pipeline.artifact import ARTIFACT_SUFFIX, ArtifactError, ModelArtifact
+from pipeline.explain import top_contributions
+from pipeline.cache import SQLiteVerdictStore, Verdict, VerdictCache, fingerprint_files, verdict_key
+from pipeline.lexicon import LEXICON_FILENAME, Lexicon
+from pipeline.metrics import metrics
+from pipeline.preprocess import preprocess_many, warm_up
+from pipeline.scoring import CompiledLinearScorer, UnsupportedModelError
+from pipeline.tracing import add_stage_time
+from pipeline.worker_pool import InferenceWorkerPool
 
-from pipeline.preprocess import preprocess_text
+if TYPE_CHECKING:
+    from pipeline.near_duplicates import NearDuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+SCORING_MODES = {"compiled", "sklearn"}
+INFERENCE_BACKENDS = {"inline", "process"}
+
+# Resolved once: these are observed on every scored batch.
+_PREPROCESS_SECONDS = metrics.histogram("stage_seconds", stage="preprocess")
+_SCORE_SECONDS = metrics.histogram("stage_seconds", stage="score")
+_VECTORIZE_SECONDS = metrics.histogram("stage_seconds", stage="vectorize")
+_PREDICT_SECONDS = metrics.histogram("stage_seconds", stage="predict")
+_EXPLAIN_SECONDS = metrics.histogram("stage_seconds", stage="explain")
 
 
 class InferenceService:
-    def __init__(self, model_path: Optional[str] = None, vectorizer_path: Optional[str] = None):
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        vectorizer_path: Optional[str] = None,
+        scoring_mode: Optional[str] = None,
+        cache: Optional[VerdictCache] = None,
+        artifact_path: Optional[str] = None,
+        backend: Optional[str] = None,
+    ):
         self.model_path = Path(model_path).resolve() if model_path else self._default_model_path()
         self.vectorizer_path = (
             Path(vectorizer_path).resolve() if vectorizer_path else self._default_vectorizer_path()
@@ -19,8 +50,113 @@ class InferenceService:
         if not self.vectorizer_path.exists():
             raise RuntimeError(f"Vectorizer file not found: {self.vectorizer_path}")
 
+        self.scoring_mode = (scoring_mode or os.environ.get("INFERENCE_SCORING_MODE", "compiled")).lower()
+        if self.scoring_mode not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode: {self.scoring_mode}")
+
+        self.fingerprint = fingerprint_files(self.model_path, self.vectorizer_path)
+        self.model: Any = None
+        self.vectorizer: Any = None
+        self.artifact: Optional[ModelArtifact] = None
+        self._scorer: Optional[CompiledLinearScorer] = None
+        self._feature_names: Any = None
+
+        if self.scoring_mode == "compiled":
+            self.artifact = self._load_artifact(artifact_path)
+            if self.artifact is not None:
+                self._scorer = CompiledLinearScorer.from_artifact(self.artifact)
+
+        if self._scorer is None:
+            self._load_pickles()
+
+        self.lexicon = self._load_lexicon()
+        self.cache = cache if cache is not None else self._default_cache()
+        self.near_duplicates = self._load_near_duplicates()
+
+        self.backend = (backend or os.environ.get("INFERENCE_BACKEND", "inline")).lower()
+        if self.backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"Unknown inference backend: {self.backend}")
+        self.pool: Optional[InferenceWorkerPool] = None
+        if self.backend == "process":
+            self.pool = InferenceWorkerPool.from_env(
+                {
+                    "model_path": str(self.model_path),
+                    "vectorizer_path": str(self.vectorizer_path),
+                    "scoring_mode": self.scoring_mode,
+                    "artifact_path": str(self.artifact.path) if self.artifact is not None else None,
+                }
+            )
+
+    def _load_artifact(self, artifact_path: Optional[str]) -> Optional[ModelArtifact]:
+        configured = artifact_path or os.environ.get("MODEL_ARTIFACT_PATH")
+        path = Path(configured) if configured else self.model_path.with_name("model" + ARTIFACT_SUFFIX)
+        if not path.exists():
+            if configured:
+                raise RuntimeError(f"Model artifact not found: {path}")
+            return None
+        try:
+            artifact = ModelArtifact(path)
+        except (ArtifactError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable model artifact: %s", e)
+            return None
+        if artifact.meta.get("source_fingerprint") != self.fingerprint:
+            logger.warning("Ignoring model artifact %s: it was not exported from the current pickles", path)
+            return None
+        return artifact
+
+    def _load_lexicon(self) -> Optional[Lexicon]:
+        configured = os.environ.get("PREPROCESS_LEXICON_PATH")
+        path = Path(configured) if configured else self.vectorizer_path.with_name(LEXICON_FILENAME)
+        if not path.exists():
+            if configured:
+                raise RuntimeError(f"Preprocessing lexicon not found: {path}")
+            logger.warning("No preprocessing lexicon at %s; falling back to NLTK corpora", path)
+            return None
+        try:
+            lexicon = Lexicon.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable preprocessing lexicon: %s", e)
+            return None
+        if lexicon.source_fingerprint != self.fingerprint:
+            logger.warning("Ignoring preprocessing lexicon %s: it was not built for the current model", path)
+            return None
+        return lexicon
+
+    def _load_near_duplicates(self) -> Optional["NearDuplicateIndex"]:
+        if os.environ.get("NEAR_DUP_MODE", "off").lower() == "off":
+            return None
+        # numpy is only imported when the index is enabled.
+        from pipeline.near_duplicates import NearDuplicateIndex
+
+        return NearDuplicateIndex.from_env(self.fingerprint)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+        if self.near_duplicates is not None:
+            try:
+                self.near_duplicates.close()
+            except OSError as e:
+                logger.error(f"Could not save the near-duplicate index: {e}")
+
+    def warm_up(self) -> None:
+        """Load preprocessing data and run one prediction outside any request."""
+        warm_up(self.lexicon)
+        self._score([""])
+        if self.pool is not None:
+            self.pool.warm_up()
+
+    def _load_pickles(self) -> None:
+        import joblib
+
         self.model = joblib.load(self.model_path)
         self.vectorizer = joblib.load(self.vectorizer_path)
+        if self.scoring_mode == "compiled":
+            try:
+                self._scorer = CompiledLinearScorer(self.vectorizer, self.model)
+            except UnsupportedModelError as e:
+                logger.warning("Falling back to sklearn scoring: %s", e)
+                self.scoring_mode = "sklearn"
 
     @staticmethod
     def _project_root() -> Path:
@@ -40,58 +176,195 @@ class InferenceService:
         fallback = project_root / "Model" / "vectorizer.pkl"
         return preferred if preferred.exists() else fallback
 
-    def predict(self, text: str) -> dict:
-        processed_text = preprocess_text(text)
-        features = self.vectorizer.transform([processed_text])
-
-        prediction = int(self.model.predict(features)[0])
-
-        if hasattr(self.model, "predict_proba"):
-            probabilities = self.model.predict_proba(features)[0]
-            confidence = float(probabilities[prediction])
-        else:
-            confidence = 1.0
-
-        return {
-            "prediction": prediction,
-            "confidence": confidence,
-        }
-
-    def predict_chunks(self, chunks: List[str]) -> List[Dict[str, Any]]:
-        if not chunks:
-            return []
-
-        indexed_processed = []
-        for index, chunk in enumerate(chunks):
-            processed = preprocess_text(chunk)
-            if processed.strip():
-                indexed_processed.append((index, chunk, processed))
+    @staticmethod
+    def _default_cache() -> Optional[VerdictCache]:
+        max_bytes = int(os.environ.get("PREDICTION_CACHE_BYTES", 32 * 1024 * 1024))
+        if max_bytes <= 0:
+            return None
+        store_path = os.environ.get("PREDICTION_CACHE_PATH")
+        store = SQLiteVerdictStore(store_path) if store_path else None
+        return VerdictCache(max_bytes, store=store)
 
-        if not indexed_processed:
-            return []
+    def _score(
+        self, processed_texts: List[str], trace: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[int, float]]:
+        if self._scorer is not None:
+            # The compiled scorer fuses vectorization and prediction.
+            started = time.perf_counter()
+            scored = self._scorer.score_many(processed_texts)
+            elapsed = time.perf_counter() - started
+            _SCORE_SECONDS.observe(elapsed)
+            add_stage_time(trace, "score", elapsed)
+            return scored
 
-        processed_chunks = [item[2] for item in indexed_processed]
-        features = self.vectorizer.transform(processed_chunks)
+        started = time.perf_counter()
+        features = self.vectorizer.transform(processed_texts)
+        vectorized = time.perf_counter()
+        _VECTORIZE_SECONDS.observe(vectorized - started)
+        add_stage_time(trace, "vectorize", vectorized - started)
         predictions = self.model.predict(features)
 
         probabilities = None
         if hasattr(self.model, "predict_proba"):
             probabilities = self.model.predict_proba(features)
+        elapsed = time.perf_counter() - vectorized
+        _PREDICT_SECONDS.observe(elapsed)
+        add_stage_time(trace, "predict", elapsed)
 
-        results: List[Dict[str, Any]] = []
-        for prediction_index, (index, chunk, _) in enumerate(indexed_processed):
-            prediction = int(predictions[prediction_index])
+        scored: List[Tuple[int, float]] = []
+        for row, raw_prediction in enumerate(predictions):
+            prediction = int(raw_prediction)
             confidence = (
-                float(probabilities[prediction_index][prediction])
+                float(probabilities[row][prediction])
                 if probabilities is not None
                 else 1.0
             )
+            scored.append((prediction, confidence))
+        return scored
+
+    def _compute_verdicts(self, texts: List[str], trace: Optional[Dict[str, Any]] = None) -> List[Verdict]:
+        verdicts: List[Verdict] = [None] * len(texts)
+        started = time.perf_counter()
+        processed_texts = preprocess_many(texts, lexicon=self.lexicon)
+        elapsed = time.perf_counter() - started
+        _PREPROCESS_SECONDS.observe(elapsed)
+        add_stage_time(trace, "preprocess", elapsed)
+        indexed_processed = [
+            (position, processed)
+            for position, processed in enumerate(processed_texts)
+            if processed.strip()
+        ]
+        if indexed_processed:
+            scored = self._score([processed for _, processed in indexed_processed], trace)
+            for (position, _), verdict in zip(indexed_processed, scored):
+                verdicts[position] = verdict
+        return verdicts
+
+    def _verdicts(
+        self, texts: List[str], trace: Optional[Dict[str, Any]] = None, near_duplicates: bool = False
+    ) -> List[Verdict]:
+        keys = [verdict_key(self.fingerprint, text) for text in texts]
+        known: Dict[bytes, Verdict] = self.cache.get_many(keys) if self.cache else {}
+
+        pending: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in known and key not in pending:
+                pending[key] = text
+
+        # Near-duplicate verdicts are approximate, so they never enter the exact cache.
+        index = self.near_duplicates if near_duplicates and pending else None
+        reused: Dict[bytes, Verdict] = {}
+        if index is not None:
+            signatures, matches = index.lookup(list(pending.values()))
+            if not index.audit:
+                reused = {key: match for key, match in zip(pending, matches) if match is not None}
+        to_score = {key: text for key, text in pending.items() if key not in reused}
+
+        if trace is not None:
+            trace["texts"] = trace.get("texts", 0) + len(texts)
+            trace["cache_hits"] = trace.get("cache_hits", 0) + len(known)
+            if index is not None:
+                trace["near_duplicates_reused"] = trace.get("near_duplicates_reused", 0) + len(reused)
+            trace["scored"] = trace.get("scored", 0) + len(to_score)
+
+        computed: Dict[bytes, Verdict] = {}
+        if to_score:
+            texts_to_score = list(to_score.values())
+            if self.pool is not None and len(texts_to_score) >= self.pool.min_slice:
+                # Stage timings inside the workers stay in their processes.
+                started = time.perf_counter()
+                verdicts = self.pool.compute(texts_to_score)
+                elapsed = time.perf_counter() - started
+                metrics.observe("stage_seconds", elapsed, stage="worker_pool")
+                add_stage_time(trace, "worker_pool", elapsed)
+            else:
+                verdicts = self._compute_verdicts(texts_to_score, trace)
+            computed = dict(zip(to_score, verdicts))
+            if self.cache:
+                self.cache.set_many(computed)
+            known.update(computed)
+
+        if index is not None:
+            scored = [computed.get(key) for key in pending]
+            index.add_many(signatures, scored)
+            if index.audit:
+                index.record_audit(matches, scored)
+            known.update(reused)
+
+        return [known[key] for key in keys]
+
+    def predict(self, text: str) -> dict:
+        return self.predict_many([text])[0]
+
+    def predict_many(self, texts: List[str], trace: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Score texts in one batch; trace, if given, collects cache counts and stage times."""
+        verdicts = self._verdicts(texts, trace)
+
+        empty_verdict = None
+        if any(verdict is None for verdict in verdicts):
+            # Texts that preprocess to nothing still get the model's base score.
+            empty_verdict = self._score([""])[0]
+
+        results: List[Dict[str, Any]] = []
+        for verdict in verdicts:
+            prediction, confidence = verdict if verdict is not None else empty_verdict
+            results.append(
+                {
+                    "prediction": prediction,
+                    "confidence": confidence,
+                }
+            )
+
+        return results
+
+    def explain(
+        self, predictions: List[Dict[str, Any]], top_k: int, trace: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Add an "explanation" to each detection in predictions: its top_k
+        preprocessed tokens by contribution to the decision (TF-IDF value
+        times coefficient), computed for all detections in one sparse product.
+        """
+        detections = [prediction for prediction in predictions if prediction["prediction"] == 1]
+        if not detections or top_k <= 0:
+            return
+        started = time.perf_counter()
+        processed_texts = preprocess_many([prediction["text"] for prediction in detections], lexicon=self.lexicon)
+        if self._scorer is not None:
+            contributions = self._scorer.contributions(processed_texts)
+            terms = self._scorer.terms
+        else:
+            contributions = self.vectorizer.transform(processed_texts).multiply(self.model.coef_[0])
+            if self._feature_names is None:
+                self._feature_names = self.vectorizer.get_feature_names_out()
+            terms = self._feature_names
+        for prediction, explanation in zip(detections, top_contributions(contributions, terms, top_k)):
+            prediction["explanation"] = explanation
+        elapsed = time.perf_counter() - started
+        _EXPLAIN_SECONDS.observe(elapsed)
+        add_stage_time(trace, "explain", elapsed)
+
+    def predict_chunks(
+        self, chunks: List[str], trace: Optional[Dict[str, Any]] = None, explain: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Score page chunks; with explain > 0, detections carry their top contributing tokens."""
+        if not chunks:
+            return []
+
+        results: List[Dict[str, Any]] = []
+        for index, (chunk, verdict) in enumerate(zip(chunks, self._verdicts(chunks, trace, near_duplicates=True))):
+            if verdict is None:
+                continue
+            prediction, confidence = verdict
             results.append(
                 {
+                    "index": index,
                     "text": chunk,
                     "prediction": prediction,
                     "confidence": confidence,
                 }
             )
 
+        if explain:
+            self.explain(results, explain, trace)
         return results
@@ -0,0 +1,128 @@
+"""Precompiled stopwords and lemma table for ``pipeline.preprocess``.
+
+Built once from NLTK's corpora so the service never downloads or loads
+WordNet at runtime. WordNet's noun lemmatizer only rewrites a word that is
+in its exception list or that matches one of its suffix rules against a
+noun lemma, so every word it would change can be enumerated. The table
+keeps the rewrites that can affect the model: those where the word or its
+lemma occurs in the vocabulary, or where either one would not survive the
+vectorizer's tokenizer as a single token. Any other rewrite swaps one
+out-of-vocabulary token for another and cannot change a score. Words that
+preprocessing can never produce (punctuation, digits, spaces) are skipped.
+
+Build from the backend directory with::
+
+    python -m pipeline.lexicon ../Model/model.pkl ../Model/vectorizer.pkl
+"""
+
+import argparse
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+LEXICON_FILENAME = "lexicon.json"
+LEXICON_VERSION = 1
+
+
+class Lexicon:
+    """Stopword set and ``word -> lemma`` table loaded from a JSON file."""
+
+    def __init__(self, stop_words: Iterable[str], lemmas: Dict[str, str], source_fingerprint: Optional[str] = None):
+        self.stop_words = frozenset(stop_words)
+        self.lemmas = lemmas
+        self.source_fingerprint = source_fingerprint
+
+    @classmethod
+    def load(cls, path: Path) -> "Lexicon":
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        if data.get("version") != LEXICON_VERSION:
+            raise ValueError(f"Unsupported lexicon version {data.get('version')}: {path}")
+        return cls(data["stop_words"], data["lemmas"], data.get("source_fingerprint"))
+
+    def save(self, path: Path) -> None:
+        data = {
+            "version": LEXICON_VERSION,
+            "source_fingerprint": self.source_fingerprint,
+            "stop_words": sorted(self.stop_words),
+            "lemmas": dict(sorted(self.lemmas.items())),
+        }
+        path = Path(path)
+        temporary = path.with_name(path.name + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary, path)
+
+    def lemmatize(self, word: str) -> str:
+        return self.lemmas.get(word, word)
+
+
+def _inflected_forms(wordnet) -> Iterator[str]:
+    yield from wordnet._exception_map["n"]
+    substitutions = wordnet.MORPHOLOGICAL_SUBSTITUTIONS["n"]
+    for lemma in wordnet.all_lemma_names(pos="n"):
+        for old, new in substitutions:
+            if lemma.endswith(new):
+                yield lemma[: len(lemma) - len(new)] + old
+
+
+def build_lexicon(vocabulary: Iterable[str], token_pattern: str, source_fingerprint: Optional[str] = None) -> Lexicon:
+    """Compile the stopwords and the vocabulary-relevant lemma table with NLTK."""
+    from pipeline.preprocess import _ensure_nltk_data, _lemmatizer, _nltk_stop_words, _strip_table
+
+    _ensure_nltk_data()
+    from nltk.corpus import wordnet
+
+    lemmatizer = _lemmatizer()
+    pattern = re.compile(token_pattern)
+    vocabulary_words = {word for term in vocabulary for word in term.split()}
+
+    def single_token(word: str) -> bool:
+        return pattern.findall(word) == [word]
+
+    def reachable(word: str) -> bool:
+        # preprocess_text strips punctuation and digits and splits on whitespace.
+        return word.translate(_strip_table) == word and word.split() == [word]
+
+    lemmas: Dict[str, str] = {}
+    for form in _inflected_forms(wordnet):
+        if form in lemmas or not reachable(form):
+            continue
+        lemma = lemmatizer.lemmatize(form)
+        if lemma == form:
+            continue
+        if (
+            form in vocabulary_words
+            or lemma in vocabulary_words
+            or not single_token(form)
+            or not single_token(lemma)
+        ):
+            lemmas[form] = lemma
+
+    return Lexicon(_nltk_stop_words(), lemmas, source_fingerprint)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compile the preprocessing lexicon for a vectorizer.")
+    parser.add_argument("model", type=Path, help="Path to model.pkl")
+    parser.add_argument("vectorizer", type=Path, help="Path to vectorizer.pkl")
+    parser.add_argument("-o", "--output", type=Path, help=f"Output path (default: {LEXICON_FILENAME} next to the vectorizer)")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    from pipeline.cache import fingerprint_files
+
+    vectorizer = joblib.load(args.vectorizer)
+    fingerprint = fingerprint_files(args.model.resolve(), args.vectorizer.resolve())
+    lexicon = build_lexicon(vectorizer.vocabulary_, vectorizer.token_pattern, fingerprint)
+
+    output = args.output or args.vectorizer.with_name(LEXICON_FILENAME)
+    lexicon.save(output)
+    print(f"Wrote {output} ({len(lexicon.stop_words)} stopwords, {len(lexicon.lemmas)} lemmas, {output.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
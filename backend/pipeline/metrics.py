@@ -0,0 +1,148 @@
+import bisect
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+METRIC_PREFIX = "darkpattern_"
+
+STAGE_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CHUNKS_PER_PAGE_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 200, 300, 500)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+# (name, type, help, samples); a sample is (labels, value or BucketHistogram).
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], Any]]]
+
+
+class BucketHistogram:
+    """Cumulative-bucket histogram in the Prometheus style (``le`` upper bounds)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, value_sum = self.count, self.sum
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {"count": total, "sum": value_sum, "buckets": cumulative}
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    if not labels:
+        return ()
+    if len(labels) == 1:
+        return tuple(labels.items())
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms rendered in Prometheus text format.
+
+    Metrics are declared once with describe(); observe() and inc() then cost
+    a dict lookup and a short lock (about a microsecond), and label values
+    must be strings. Values that other components already track (cache
+    stats, pool stats) are pulled at render time by collectors.
+    """
+
+    def __init__(self, prefix: str = METRIC_PREFIX):
+        self.prefix = prefix
+        self._descriptions: Dict[str, Tuple[str, str, Optional[Sequence[float]]]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, BucketHistogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, help_text: str, buckets: Optional[Sequence[float]] = None) -> None:
+        if kind not in {"counter", "histogram"}:
+            raise ValueError(f"Unsupported metric type: {kind}")
+        self._descriptions[name] = (kind, help_text, buckets)
+        (self._histograms if kind == "histogram" else self._counters).setdefault(name, {})
+
+    def _histogram(self, name: str, key: LabelKey) -> BucketHistogram:
+        series = self._histograms[name]
+        histogram = series.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = series.setdefault(key, BucketHistogram(self._descriptions[name][2]))
+        return histogram
+
+    def histogram(self, name: str, **labels: str) -> BucketHistogram:
+        """Return one labelled series, for hot paths that observe it directly."""
+        return self._histogram(name, _label_key(labels))
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        self._histogram(name, _label_key(labels)).observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        series = self._counters[name]
+        key = _label_key(labels)
+        with self._lock:
+            series[key] = series.get(key, 0.0) + amount
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        self._collectors.append(collector)
+
+    def _families(self) -> Iterator[MetricFamily]:
+        for name, (kind, help_text, _) in self._descriptions.items():
+            store = self._histograms[name] if kind == "histogram" else self._counters[name]
+            with self._lock:
+                samples = [(dict(key), value) for key, value in store.items()]
+            yield name, kind, help_text, samples
+        for collector in self._collectors:
+            yield from collector()
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, kind, help_text, samples in self._families():
+            full_name = self.prefix + name
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in samples:
+                if isinstance(value, BucketHistogram):
+                    snapshot = value.snapshot()
+                    for bound, count in snapshot["buckets"].items():
+                        bucket_labels = {**labels, "le": bound}
+                        lines.append(f"{full_name}_bucket{_format_labels(bucket_labels)} {count}")
+                    lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+                    lines.append(f"{full_name}_count{_format_labels(labels)} {snapshot['count']}")
+                else:
+                    lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.describe("stage_seconds", "histogram", "Time spent per pipeline stage.", STAGE_SECONDS_BUCKETS)
+metrics.describe("chunks_per_page", "histogram", "Text chunks extracted per fetched page.", CHUNKS_PER_PAGE_BUCKETS)
+metrics.describe("fetched_bytes_total", "counter", "Response body bytes received on the wire.")
+metrics.describe("errors_total", "counter", "Errors by type.")
@@ -0,0 +1,297 @@
+import hashlib
+import logging
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NEAR_DUPLICATE_MODES = {"off", "on", "audit"}
+SIMHASH_BITS = 64
+
+_INDEX_MAGIC = b"DPND"
+_INDEX_VERSION = 1
+_HEADER = struct.Struct("<4sH64sQ")  # magic, version, model fingerprint, count
+_RECORD = struct.Struct("<QBd")  # simhash, prediction, confidence
+
+_TOKEN = re.compile(r"\w+")
+_DIGITS = re.compile(r"\d+")
+
+# (prediction, confidence)
+Scored = Tuple[int, float]
+
+
+@lru_cache(maxsize=1 << 16)
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _features(text: str) -> List[str]:
+    # Numbers collapse to one token, so "Only 2 left" and "Only 5 left" agree.
+    tokens = _TOKEN.findall(_DIGITS.sub("0", text.lower()))
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def simhash_many(texts: Sequence[str]) -> List[Optional[int]]:
+    """
+    64-bit SimHash of each text over word unigrams and bigrams, or None for
+    texts without words. All texts are hashed in one vectorized pass.
+    """
+    counts: List[int] = []
+    hashes: List[int] = []
+    for text in texts:
+        features = _features(text)
+        counts.append(len(features))
+        hashes.extend(_feature_hash(feature) for feature in features)
+    if not hashes:
+        return [None] * len(texts)
+
+    bits = np.unpackbits(np.array(hashes, dtype="<u8").view(np.uint8)).reshape(-1, SIMHASH_BITS)
+    signed = bits.astype(np.int32) * 2 - 1
+    lengths = np.array(counts)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    present = lengths > 0
+    sums = np.add.reduceat(signed, starts[present], axis=0)
+    packed = np.packbits(sums > 0, axis=1).view("<u8").ravel()
+
+    signatures: List[Optional[int]] = [None] * len(texts)
+    for position, signature in zip(np.flatnonzero(present), packed):
+        signatures[position] = int(signature)
+    return signatures
+
+
+class NearDuplicateIndex:
+    """
+    SimHash index of scored chunks, consulted for chunks missing from the
+    exact verdict cache.
+
+    A chunk whose signature is within max_distance bits of a stored one
+    reuses that verdict. Candidates are found by LSH: the 64 bits are split
+    into max_distance + 1 bands, so any signature within the distance
+    shares at least one band exactly. In audit mode verdicts are never
+    reused; every match is compared with the freshly scored verdict to
+    measure how often reuse would have been wrong. At most max_entries
+    signatures are kept (least recently matched first out), and the index
+    can be saved to and reloaded from a file tied to the model fingerprint.
+    With a path, a background thread also saves it every save_interval
+    seconds while it has unsaved additions, so a crash loses at most that
+    much.
+    """
+
+    def __init__(
+        self,
+        fingerprint: str,
+        max_distance: int = 3,
+        max_entries: int = 100_000,
+        audit: bool = False,
+        path: Optional[str] = None,
+        save_interval: float = 300.0,
+    ):
+        if not 0 <= max_distance < SIMHASH_BITS // 2:
+            raise ValueError(f"max_distance must be between 0 and {SIMHASH_BITS // 2 - 1}")
+        self.fingerprint = fingerprint
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.audit = audit
+        self.path = Path(path) if path else None
+        self.save_interval = save_interval
+
+        band_count = max_distance + 1
+        widths = [SIMHASH_BITS // band_count + (band < SIMHASH_BITS % band_count) for band in range(band_count)]
+        self._bands: List[Tuple[int, int]] = []
+        shift = 0
+        for width in widths:
+            self._bands.append((shift, (1 << width) - 1))
+            shift += width
+
+        self._entries: "OrderedDict[int, Scored]" = OrderedDict()
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in self._bands]
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.matches = 0
+        self.audited = 0
+        self.disagreements = 0
+        self.evictions = 0
+        self._unsaved = 0
+        self._closed = threading.Event()
+        self._saver: Optional[threading.Thread] = None
+
+        if self.path is not None and self.path.exists():
+            self.load()
+        if self.path is not None and self.save_interval > 0:
+            self._saver = threading.Thread(target=self._save_periodically, name="near-duplicate-saver", daemon=True)
+            self._saver.start()
+
+    @classmethod
+    def from_env(cls, fingerprint: str) -> Optional["NearDuplicateIndex"]:
+        mode = os.environ.get("NEAR_DUP_MODE", "off").lower()
+        if mode not in NEAR_DUPLICATE_MODES:
+            raise ValueError(f"Unknown near-duplicate mode: {mode}")
+        if mode == "off":
+            return None
+        return cls(
+            fingerprint,
+            max_distance=int(os.environ.get("NEAR_DUP_MAX_DISTANCE", 3)),
+            max_entries=int(os.environ.get("NEAR_DUP_MAX_ENTRIES", 100_000)),
+            audit=mode == "audit",
+            path=os.environ.get("NEAR_DUP_INDEX_PATH"),
+            save_interval=float(os.environ.get("NEAR_DUP_SAVE_INTERVAL", 300)),
+        )
+
+    def _band_values(self, signature: int) -> List[int]:
+        return [(signature >> shift) & mask for shift, mask in self._bands]
+
+    def _nearest(self, signature: int) -> Optional[int]:
+        if signature in self._entries:
+            return signature
+        best, best_distance = None, self.max_distance + 1
+        for buckets, value in zip(self._buckets, self._band_values(signature)):
+            for candidate in buckets.get(value, ()):
+                distance = (candidate ^ signature).bit_count()
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        return best
+
+    def lookup(self, texts: Sequence[str]) -> Tuple[List[Optional[int]], List[Optional[Scored]]]:
+        """
+        Return each text's signature and the verdict of the nearest stored
+        signature within max_distance (None if there is none).
+        """
+        signatures = simhash_many(texts)
+        return signatures, self.match_many(signatures)
+
+    def match_many(self, signatures: Sequence[Optional[int]]) -> List[Optional[Scored]]:
+        found: List[Optional[Scored]] = []
+        with self._lock:
+            for signature in signatures:
+                nearest = self._nearest(signature) if signature is not None else None
+                if nearest is None:
+                    found.append(None)
+                    continue
+                self._entries.move_to_end(nearest)
+                found.append(self._entries[nearest])
+            self.lookups += len(signatures)
+            self.matches += sum(verdict is not None for verdict in found)
+        return found
+
+    def record_audit(self, matched: Sequence[Optional[Scored]], scored: Sequence[Optional[Scored]]) -> None:
+        """Count matches whose reused prediction would have differed from the scored one."""
+        compared = [(reused, actual) for reused, actual in zip(matched, scored) if reused is not None and actual is not None]
+        with self._lock:
+            self.audited += len(compared)
+            self.disagreements += sum(reused[0] != actual[0] for reused, actual in compared)
+
+    def add_many(self, signatures: Sequence[Optional[int]], verdicts: Sequence[Optional[Scored]]) -> None:
+        with self._lock:
+            for signature, verdict in zip(signatures, verdicts):
+                if signature is None or verdict is None:
+                    continue
+                if signature not in self._entries:
+                    for buckets, value in zip(self._buckets, self._band_values(signature)):
+                        buckets.setdefault(value, set()).add(signature)
+                    self._unsaved += 1
+                self._entries[signature] = verdict
+                self._entries.move_to_end(signature)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._remove_from_buckets(evicted)
+                self.evictions += 1
+
+    def _remove_from_buckets(self, signature: int) -> None:
+        for buckets, value in zip(self._buckets, self._band_values(signature)):
+            bucket = buckets.get(value)
+            if bucket is not None:
+                bucket.discard(signature)
+                if not bucket:
+                    del buckets[value]
+
+    def save(self) -> None:
+        """Write the index to path atomically (a no-op without a path)."""
+        if self.path is None:
+            return
+        with self._lock:
+            records = list(self._entries.items())
+            unsaved, self._unsaved = self._unsaved, 0
+        try:
+            self._write(records)
+        except OSError:
+            with self._lock:
+                self._unsaved += unsaved
+            raise
+
+    def _write(self, records: List[Tuple[int, Scored]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary, "wb") as handle:
+            handle.write(
+                _HEADER.pack(_INDEX_MAGIC, _INDEX_VERSION, self.fingerprint.encode("ascii"), len(records))
+            )
+            for signature, (prediction, confidence) in records:
+                handle.write(_RECORD.pack(signature, prediction, confidence))
+        os.replace(temporary, self.path)
+        logger.info(f"Saved {len(records)} near-duplicate signatures to {self.path}")
+
+    def load(self) -> None:
+        """Load a saved index; files from another model or of another format are ignored."""
+        with open(self.path, "rb") as handle:
+            data = handle.read()
+        if len(data) < _HEADER.size:
+            logger.warning(f"Ignoring truncated near-duplicate index {self.path}")
+            return
+        magic, version, fingerprint, count = _HEADER.unpack_from(data)
+        if magic != _INDEX_MAGIC or version != _INDEX_VERSION:
+            logger.warning(f"Ignoring near-duplicate index {self.path}: unknown format")
+            return
+        if fingerprint.decode("ascii") != self.fingerprint:
+            logger.info(f"Ignoring near-duplicate index {self.path}: built for another model")
+            return
+        if len(data) != _HEADER.size + count * _RECORD.size:
+            logger.warning(f"Ignoring truncated near-duplicate index {self.path}")
+            return
+        signatures: List[int] = []
+        verdicts: List[Scored] = []
+        for signature, prediction, confidence in _RECORD.iter_unpack(memoryview(data)[_HEADER.size:]):
+            signatures.append(signature)
+            verdicts.append((prediction, confidence))
+        self.add_many(signatures, verdicts)
+        with self._lock:
+            self._unsaved = 0
+        logger.info(f"Loaded {len(self._entries)} near-duplicate signatures from {self.path}")
+
+    def _save_periodically(self) -> None:
+        while not self._closed.wait(self.save_interval):
+            if not self._unsaved:
+                continue
+            try:
+                self.save()
+            except OSError as e:
+                logger.error(f"Could not save the near-duplicate index: {e}")
+
+    def close(self) -> None:
+        """Stop the periodic saver and save what is not saved yet."""
+        self._closed.set()
+        if self._saver is not None:
+            self._saver.join()
+            self._saver = None
+        if self._unsaved:
+            self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": "audit" if self.audit else "on",
+                "max_distance": self.max_distance,
+                "entries": len(self._entries),
+                "lookups": self.lookups,
+                "matches": self.matches,
+                "audited": self.audited,
+                "disagreements": self.disagreements,
+                "evictions": self.evictions,
+            }
@@ -1,50 +1,100 @@
 import os
 import string
 from functools import lru_cache
+from typing import TYPE_CHECKING, FrozenSet, Iterable, List, Optional
 
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+if TYPE_CHECKING:
+    from pipeline.lexicon import Lexicon
 
 _nltk_data_dir = os.environ.get("NLTK_DATA", "/tmp/nltk_data")
-if _nltk_data_dir not in nltk.data.path:
-    nltk.data.path.insert(0, _nltk_data_dir)
 
+_NLTK_RESOURCES = (
+    ("corpora/stopwords", "stopwords"),
+    ("corpora/wordnet", "wordnet"),
+    ("corpora/omw-1.4", "omw-1.4"),
+)
 
-def _ensure_nltk_resource(resource_path: str, download_name: str) -> None:
-    try:
-        nltk.data.find(resource_path)
-    except LookupError:
-        nltk.download(download_name, quiet=True, download_dir=_nltk_data_dir)
 
+@lru_cache(maxsize=1)
+def _ensure_nltk_data() -> None:
+    # Only reached without a compiled lexicon; see pipeline.lexicon.
+    import nltk
 
-_ensure_nltk_resource("corpora/stopwords", "stopwords")
-_ensure_nltk_resource("corpora/wordnet", "wordnet")
-_ensure_nltk_resource("corpora/omw-1.4", "omw-1.4")
+    if _nltk_data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, _nltk_data_dir)
+    for resource_path, download_name in _NLTK_RESOURCES:
+        try:
+            nltk.data.find(resource_path)
+        except LookupError:
+            nltk.download(download_name, quiet=True, download_dir=_nltk_data_dir)
 
 
 @lru_cache(maxsize=1)
-def _stop_words() -> set[str]:
-    return set(stopwords.words("english"))
+def _nltk_stop_words() -> FrozenSet[str]:
+    _ensure_nltk_data()
+    from nltk.corpus import stopwords
+
+    return frozenset(stopwords.words("english"))
 
 
 @lru_cache(maxsize=1)
-def _lemmatizer() -> WordNetLemmatizer:
+def _lemmatizer():
+    _ensure_nltk_data()
+    from nltk.stem import WordNetLemmatizer
+
     return WordNetLemmatizer()
 
 
-def preprocess_text(text: str, lemmatize: bool = True) -> str:
-    text = str(text)
+_LEMMA_CACHE_SIZE = 50_000
+# Code points the strip table remembers; rarer ones are resolved on each use.
+_STRIP_TABLE_SIZE = 8_192
+
+
+@lru_cache(maxsize=_LEMMA_CACHE_SIZE)
+def _lemmatize(word: str) -> str:
+    return _lemmatizer().lemmatize(word)
+
+
+class _StripTable(dict):
+    """``str.translate`` table that drops ASCII punctuation and any character
+    for which ``str.isdigit`` is true, resolving each code point on first use.
+
+    At most ``_STRIP_TABLE_SIZE`` code points are remembered, so text that
+    sweeps through Unicode cannot grow the table without bound."""
 
-    text = text.lower()
-    text = text.translate(str.maketrans("", "", string.punctuation))
-    text = "".join([char for char in text if not char.isdigit()])
+    def __init__(self) -> None:
+        super().__init__({ord(char): None for char in string.punctuation})
 
-    stop_words = _stop_words()
-    text = " ".join([word for word in text.split() if word not in stop_words])
+    def __missing__(self, codepoint: int):
+        value = None if chr(codepoint).isdigit() else codepoint
+        if len(self) < _STRIP_TABLE_SIZE:
+            self[codepoint] = value
+        return value
 
+
+_strip_table = _StripTable()
+
+
+def preprocess_text(text: str, lemmatize: bool = True, lexicon: Optional["Lexicon"] = None) -> str:
+    words = str(text).lower().translate(_strip_table).split()
+
+    stop_words = lexicon.stop_words if lexicon is not None else _nltk_stop_words()
     if lemmatize:
-        lemmatizer = _lemmatizer()
-        text = " ".join([lemmatizer.lemmatize(word) for word in text.split()])
+        lemma = lexicon.lemmatize if lexicon is not None else _lemmatize
+        return " ".join([lemma(word) for word in words if word not in stop_words])
+    return " ".join([word for word in words if word not in stop_words])
+
+
+def preprocess_many(
+    texts: Iterable[str], lemmatize: bool = True, lexicon: Optional["Lexicon"] = None
+) -> List[str]:
+    return [preprocess_text(text, lemmatize=lemmatize, lexicon=lexicon) for text in texts]
+
 
-    return text
+def warm_up(lexicon: Optional["Lexicon"] = None) -> None:
+    """Load everything preprocessing needs, so no request pays for it."""
+    if lexicon is None:
+        _nltk_stop_words()
+        # WordNetLemmatizer reads WordNet on its first lemmatize() call.
+        _lemmatizer().lemmatize("warnings")
+    preprocess_text("Preprocessing warm-up", lexicon=lexicon)
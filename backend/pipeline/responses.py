@@ -0,0 +1,128 @@
+import gzip
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from pipeline.metrics import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESSION_MIN_BYTES", 1024))
+RESPONSE_GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", 5))
+RESPONSE_BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", 4))
+
+metrics.describe("response_bytes_total", "counter", "JSON response body bytes sent, by content encoding.")
+
+_SERIALIZE_SECONDS = metrics.histogram("stage_seconds", stage="serialize")
+_COMPRESS_SECONDS = metrics.histogram("stage_seconds", stage="compress")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            # Types orjson does not know (e.g. pydantic models) take the FastAPI path.
+            content = jsonable_encoder(content)
+            return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick "br" or "gzip" from an Accept-Encoding header, or None for identity.
+
+    The client's q-values decide; on a tie brotli wins when it is installed.
+    """
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if coding:
+            weights[coding] = weight
+    best, best_weight = None, 0.0
+    for coding in available:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def json_response(content: Any, request: Request, status_code: int = 200) -> Response:
+    """
+    Encode content as a JSON response, compressed when the client accepts it
+    and the body reaches RESPONSE_COMPRESSION_MIN_BYTES.
+
+    Routes return this instead of a dict so FastAPI's jsonable_encoder and
+    response-model validation are skipped for large payloads.
+    """
+    started = time.perf_counter()
+    body = dumps(content)
+    _SERIALIZE_SECONDS.observe(time.perf_counter() - started)
+
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = None
+    if 0 < RESPONSE_COMPRESSION_MIN_BYTES <= len(body):
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is not None:
+        started = time.perf_counter()
+        if encoding == "br":
+            body = brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+        else:
+            body = gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+        _COMPRESS_SECONDS.observe(time.perf_counter() - started)
+        headers["Content-Encoding"] = encoding
+    metrics.inc("response_bytes_total", len(body), encoding=encoding or "identity")
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+class ChunkTable:
+    """
+    Distinct detected texts of a response, each stored once.
+
+    Detections become [chunk index, confidence] pairs into the table (with
+    the explanation as a third element when present), so text repeated
+    across the pages of a batch is sent only once.
+    """
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self._positions: Dict[str, int] = {}
+
+    def index(self, text: str) -> int:
+        position = self._positions.get(text)
+        if position is None:
+            position = self._positions[text] = len(self.texts)
+            self.texts.append(text)
+        return position
+
+    def compact(self, detections: List[Dict[str, Any]]) -> List[List[Any]]:
+        compacted = []
+        for item in detections:
+            entry = [self.index(item["text"]), item["confidence"]]
+            if "explanation" in item:
+                entry.append(item["explanation"])
+            compacted.append(entry)
+        return compacted
@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pipeline.cache import Verdict, verdict_key
+from pipeline.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("scan_index_chunks_total", "counter", "Chunks of re-scanned pages by whether their verdict was reused.")
+
+# One stored chunk: (verdict, text). Text is kept only for detections, so
+# removed detections can still be reported after the chunk disappears.
+IndexEntry = Tuple[Verdict, Optional[str]]
+
+
+def _detections_missing_from(entries: Dict[bytes, IndexEntry], other: Dict[bytes, IndexEntry]) -> List[Dict[str, Any]]:
+    return [
+        {"text": text, "confidence": verdict[1]}
+        for key, (verdict, text) in entries.items()
+        if text is not None and other.get(key, (None, None))[1] is None
+    ]
+
+
+class ScanIndex:
+    """
+    Per-URL record of the last scan's chunk verdicts, for incremental re-scans.
+
+    Chunks are identified by their verdict key, which covers the model
+    fingerprint and the normalized text. A re-scan scores only chunks that
+    were not in the previous scan of the URL, and reports detections that
+    appeared or disappeared since then. A scan stored under a different
+    model fingerprint is ignored. The least recently scanned URLs are
+    dropped beyond max_urls.
+    """
+
+    def __init__(self, path: str, max_urls: int = 10_000):
+        self.path = str(Path(path).resolve())
+        self.max_urls = max_urls
+        self._local = threading.local()
+        self._writes = 0
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS scans ("
+                "url TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, entries BLOB NOT NULL, scanned_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS scans_scanned_at ON scans(scanned_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, url: str, fingerprint: str) -> Optional[Tuple[float, Dict[bytes, IndexEntry]]]:
+        """Return (scanned_at, entries) of the URL's last scan under this model, if any."""
+        try:
+            row = self._connection().execute(
+                "SELECT fingerprint, entries, scanned_at FROM scans WHERE url = ?", (url,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Scan index read failed for {url}: {e}")
+            return None
+        if row is None or row[0] != fingerprint:
+            return None
+        entries: Dict[bytes, IndexEntry] = {}
+        for key, prediction, confidence, text in json.loads(zlib.decompress(row[1])):
+            verdict = None if prediction is None else (prediction, confidence)
+            entries[bytes.fromhex(key)] = (verdict, text)
+        return row[2], entries
+
+    def put(self, url: str, fingerprint: str, entries: Dict[bytes, IndexEntry]) -> None:
+        rows = [
+            [key.hex(), None, None, None] if verdict is None else [key.hex(), verdict[0], verdict[1], text]
+            for key, (verdict, text) in entries.items()
+        ]
+        stored = zlib.compress(json.dumps(rows, ensure_ascii=False).encode("utf-8"))
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO scans VALUES (?, ?, ?, ?)", (url, fingerprint, stored, time.time())
+                )
+            self._writes += 1
+            if self._writes >= 100:
+                self._writes = 0
+                self._trim()
+        except sqlite3.Error as e:
+            logger.warning(f"Scan index write failed for {url}: {e}")
+
+    def _trim(self) -> None:
+        with self._connection() as connection:
+            connection.execute(
+                "DELETE FROM scans WHERE url IN ("
+                "SELECT url FROM scans ORDER BY scanned_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_urls,),
+            )
+
+    def scan(
+        self,
+        url: str,
+        fingerprint: str,
+        chunks: List[str],
+        predict_chunks: Callable[[List[str]], List[Dict[str, Any]]],
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Score a page's chunks, reusing verdicts from the URL's previous scan.
+
+        Args:
+            url: The scanned URL
+            fingerprint: Fingerprint of the model producing the verdicts
+            chunks: Chunks extracted from the page
+            predict_chunks: Scores chunks, with InferenceService.predict_chunks semantics
+
+        Returns:
+            (predictions, diff): predictions as predict_chunks would return them
+            for all chunks, and a diff against the previous scan
+        """
+        previous = self.get(url, fingerprint)
+        scanned_at, known = previous if previous is not None else (None, {})
+
+        keys = [verdict_key(fingerprint, chunk) for chunk in chunks]
+        fresh = [position for position, key in enumerate(keys) if key not in known]
+        fresh_chunks = [chunks[position] for position in fresh]
+        scored: Dict[int, Verdict] = {position: None for position in fresh}
+        for prediction in predict_chunks(fresh_chunks) if fresh_chunks else []:
+            scored[fresh[prediction["index"]]] = (prediction["prediction"], prediction["confidence"])
+
+        current: Dict[bytes, IndexEntry] = {}
+        predictions: List[Dict[str, Any]] = []
+        for position, (chunk, key) in enumerate(zip(chunks, keys)):
+            verdict = scored[position] if position in scored else known[key][0]
+            current[key] = (verdict, chunk if verdict is not None and verdict[0] == 1 else None)
+            if verdict is not None:
+                predictions.append(
+                    {"index": position, "text": chunk, "prediction": verdict[0], "confidence": verdict[1]}
+                )
+        self.put(url, fingerprint, current)
+
+        metrics.inc("scan_index_chunks_total", len(chunks) - len(fresh), result="reused")
+        metrics.inc("scan_index_chunks_total", len(fresh), result="scored")
+
+        diff = {
+            "previous_scan_at": (
+                time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(scanned_at)) if scanned_at is not None else None
+            ),
+            "chunks_reused": len(chunks) - len(fresh),
+            "chunks_scored": len(fresh),
+            "new_detections": _detections_missing_from(current, known),
+            "removed_detections": _detections_missing_from(known, current),
+        }
+        return predictions, diff
+
+
+_shared_scan_index: Optional[ScanIndex] = None
+_shared_scan_index_lock = threading.Lock()
+
+
+def get_shared_scan_index() -> Optional[ScanIndex]:
+    """Return the process-wide scan index, or None if SCAN_INDEX_PATH is unset."""
+    global _shared_scan_index
+    path = os.environ.get("SCAN_INDEX_PATH")
+    if not path:
+        return None
+    if _shared_scan_index is None:
+        with _shared_scan_index_lock:
+            if _shared_scan_index is None:
+                _shared_scan_index = ScanIndex(path, max_urls=int(os.environ.get("SCAN_INDEX_MAX_URLS", 10_000)))
+    return _shared_scan_index
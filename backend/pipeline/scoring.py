@@ -0,0 +1,200 @@
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class UnsupportedModelError(ValueError):
+    pass
+
+
+class CompiledLinearScorer:
+    """Scores text against a fitted TF-IDF vectorizer + binary linear model
+    without going through sklearn's per-call validation.
+
+    The IDF weights and coefficients are folded into flat ``idf`` and
+    ``idf * coef`` arrays indexed through a ``term -> row`` lookup at
+    construction time, so scoring is one pass over the analyzer's tokens
+    followed by a sigmoid.
+    """
+
+    def __init__(self, vectorizer: Any, model: Any):
+        self._check_supported(vectorizer, model)
+
+        coef = model.coef_[0]
+        use_idf = getattr(vectorizer, "use_idf", False)
+        idf = vectorizer.idf_ if use_idf else None
+
+        columns: Dict[str, int] = {}
+        terms: List[str] = []
+        idf_values: List[float] = []
+        weights: List[float] = []
+        for term, column in vectorizer.vocabulary_.items():
+            term_idf = float(idf[column]) if idf is not None else 1.0
+            columns[term] = len(idf_values)
+            terms.append(term)
+            idf_values.append(term_idf)
+            weights.append(term_idf * float(coef[column]))
+
+        self._setup(
+            analyzer=vectorizer.build_analyzer(),
+            lookup=columns.get,
+            terms=terms,
+            idf=idf_values,
+            weights=weights,
+            binary=bool(vectorizer.binary),
+            sublinear_tf=bool(getattr(vectorizer, "sublinear_tf", False)),
+            l2_norm=getattr(vectorizer, "norm", None) == "l2",
+            intercept=float(model.intercept_[0]) if len(model.intercept_) else 0.0,
+            labels=(int(model.classes_[0]), int(model.classes_[1])),
+        )
+
+    @classmethod
+    def from_artifact(cls, artifact: Any) -> "CompiledLinearScorer":
+        """Build a scorer over a ``pipeline.artifact.ModelArtifact`` without
+        sklearn; the IDF and weight arrays and the term table stay
+        memory-mapped."""
+        meta = artifact.meta
+        if meta["norm"] not in {"l2", None}:
+            raise UnsupportedModelError(f"Unsupported vectorizer norm: {meta['norm']!r}")
+        scorer = cls.__new__(cls)
+        scorer._setup(
+            analyzer=artifact.analyzer(),
+            lookup=artifact.lookup,
+            terms=artifact,
+            idf=artifact.idf,
+            weights=artifact.weights,
+            binary=meta["binary"],
+            sublinear_tf=meta["sublinear_tf"],
+            l2_norm=meta["norm"] == "l2",
+            intercept=meta["intercept"],
+            labels=tuple(meta["labels"]),
+        )
+        return scorer
+
+    def _setup(
+        self,
+        analyzer: Callable[[str], List[str]],
+        lookup: Callable[[str], Optional[int]],
+        terms: Sequence[str],
+        idf: Sequence[float],
+        weights: Sequence[float],
+        binary: bool,
+        sublinear_tf: bool,
+        l2_norm: bool,
+        intercept: float,
+        labels: Tuple[int, int],
+    ) -> None:
+        self._analyzer = analyzer
+        self._lookup = lookup
+        self._idf = idf
+        self._weights = weights
+        self._binary = binary
+        self._sublinear_tf = sublinear_tf
+        self._l2_norm = l2_norm
+        self._intercept = intercept
+        self._negative_label, self._positive_label = labels
+        self._terms = terms
+
+    @staticmethod
+    def _check_supported(vectorizer: Any, model: Any) -> None:
+        if not hasattr(vectorizer, "vocabulary_") or not hasattr(vectorizer, "build_analyzer"):
+            raise UnsupportedModelError("Vectorizer is not a fitted sklearn text vectorizer")
+        if getattr(vectorizer, "norm", None) not in {"l2", None}:
+            raise UnsupportedModelError(f"Unsupported vectorizer norm: {vectorizer.norm!r}")
+        if not hasattr(model, "coef_") or not hasattr(model, "intercept_"):
+            raise UnsupportedModelError("Model is not a fitted linear model")
+        if model.coef_.shape[0] != 1 or len(model.classes_) != 2:
+            raise UnsupportedModelError("Only binary linear models can be compiled")
+        if model.coef_.shape[1] != len(vectorizer.vocabulary_):
+            raise UnsupportedModelError("Model and vectorizer feature counts do not match")
+        if not hasattr(model, "predict_proba"):
+            raise UnsupportedModelError("Model does not expose probabilities")
+
+    def decision(self, text: str) -> float:
+        counts: Dict[int, int] = {}
+        lookup = self._lookup
+        for token in self._analyzer(text):
+            column = lookup(token)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+
+        if not counts:
+            return self._intercept
+
+        dot = 0.0
+        squared = 0.0
+        idf_values = self._idf
+        weights = self._weights
+        for column, count in counts.items():
+            idf = idf_values[column]
+            weight = weights[column]
+            if self._binary:
+                tf = 1.0
+            elif self._sublinear_tf:
+                tf = 1.0 + math.log(count)
+            else:
+                tf = float(count)
+            dot += tf * weight
+            squared += (tf * idf) ** 2
+
+        if self._l2_norm and squared > 0.0:
+            dot /= math.sqrt(squared)
+        return dot + self._intercept
+
+    def score(self, text: str) -> Tuple[int, float]:
+        decision = self.decision(text)
+        if decision >= 0:
+            positive = 1.0 / (1.0 + math.exp(-decision))
+        else:
+            exp_decision = math.exp(decision)
+            positive = exp_decision / (1.0 + exp_decision)
+
+        if decision > 0:
+            return self._positive_label, positive
+        return self._negative_label, 1.0 - positive
+
+    def score_many(self, texts: List[str]) -> List[Tuple[int, float]]:
+        return [self.score(text) for text in texts]
+
+    @property
+    def terms(self) -> Sequence[str]:
+        """Term of each row of the weight arrays."""
+        return self._terms
+
+    def contributions(self, texts: List[str]) -> Any:
+        """Per-term contributions to each text's decision as a sparse
+        (texts x terms) matrix; each row sums to ``decision - intercept``.
+
+        Tokenization is the same pass as ``decision``; weighting and
+        normalization run over the whole batch at once.
+        """
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[int] = []
+        lookup = self._lookup
+        for text in texts:
+            row: Dict[int, int] = {}
+            for token in self._analyzer(text):
+                column = lookup(token)
+                if column is not None:
+                    row[column] = row.get(column, 0) + 1
+            indices.extend(row)
+            counts.extend(row.values())
+            indptr.append(len(indices))
+
+        index_array = np.asarray(indices, dtype=np.int64)
+        tf = np.asarray(counts, dtype=np.float64)
+        if self._binary:
+            tf = np.ones_like(tf)
+        elif self._sublinear_tf:
+            tf = 1.0 + np.log(tf)
+        data = tf * np.asarray(self._weights)[index_array]
+        if self._l2_norm and len(data):
+            lengths = np.diff(indptr)
+            squared = (tf * np.asarray(self._idf)[index_array]) ** 2
+            row_ids = np.repeat(np.arange(len(texts)), lengths)
+            norms = np.sqrt(np.bincount(row_ids, weights=squared, minlength=len(texts)))
+            data /= norms[row_ids]
+        return csr_matrix((data, index_array, np.asarray(indptr)), shape=(len(texts), len(self._weights)))
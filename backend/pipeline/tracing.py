@@ -0,0 +1,139 @@
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEBUG_TRACE_ENABLED = os.environ.get("DEBUG_TRACE_ENABLED", "").lower() in {"1", "true", "yes"}
+DEBUG_PROFILE_DIR = os.environ.get("DEBUG_PROFILE_DIR")
+DEBUG_PROFILE_INTERVAL_MS = float(os.environ.get("DEBUG_PROFILE_INTERVAL_MS", 5))
+
+
+class TraceDisabled(RuntimeError):
+    pass
+
+
+def add_stage_time(trace: Optional[Dict[str, Any]], stage: str, seconds: float) -> None:
+    """Accumulate a stage duration into trace as "<stage>_ms", if tracing."""
+    if trace is not None:
+        key = f"{stage}_ms"
+        trace[key] = trace.get(key, 0.0) + seconds * 1000
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval.
+
+    Samples are aggregated as folded stacks ("outer;inner count" per line),
+    which flamegraph.pl and speedscope read directly. The sampler needs the
+    GIL, so long stretches inside C code are attributed to the frame that
+    called into it once control returns.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                stack = ";".join(reversed(frames))
+                self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def write(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in sorted(self.samples.items()):
+                handle.write(f"{stack} {count}\n")
+
+
+class RequestTrace:
+    """
+    Stage-by-stage breakdown of one request, returned as its "debug" field.
+
+    Routes hand fetch and inference to the scraper and the inference service,
+    which fill them in; an optional StackSampler profiles the calling thread
+    into DEBUG_PROFILE_DIR. Used as a context manager so the sampler stops
+    even when the request fails before finish().
+    """
+
+    def __init__(self, name: str, profile: bool = False):
+        self.name = name
+        self.fetch: Dict[str, Any] = {}
+        self.inference: Dict[str, Any] = {}
+        self._started = time.perf_counter()
+        self._sampler: Optional[StackSampler] = None
+        if profile:
+            self._sampler = StackSampler(threading.get_ident(), DEBUG_PROFILE_INTERVAL_MS / 1000.0)
+            self._sampler.start()
+
+    def __enter__(self) -> "RequestTrace":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._sampler is not None and self._sampler.running:
+            self._sampler.stop()
+
+    def _write_profile(self) -> Optional[str]:
+        self._sampler.stop()
+        directory = Path(DEBUG_PROFILE_DIR)
+        path = directory / f"{time.strftime('%Y%m%dT%H%M%S')}-{self.name}-{threading.get_ident()}.folded"
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._sampler.write(path)
+        except OSError as e:
+            logger.error(f"Could not write profile {path}: {e}")
+            return None
+        return str(path)
+
+    def finish(self) -> Dict[str, Any]:
+        total_ms = (time.perf_counter() - self._started) * 1000
+        result: Dict[str, Any] = {"total_ms": total_ms}
+        if self.fetch:
+            result["fetch"] = self.fetch
+        result["inference"] = self.inference
+        if self._sampler is not None:
+            result["profile"] = self._write_profile()
+            result["profile_samples"] = sum(self._sampler.samples.values())
+        return result
+
+
+def start_trace(name: str, debug: bool, profile: bool = False) -> ContextManager[Optional[RequestTrace]]:
+    """
+    Return a RequestTrace context for a request that asked for one, else a
+    context yielding None.
+
+    Raises:
+        TraceDisabled: If tracing (or, for profile, DEBUG_PROFILE_DIR) is not configured
+    """
+    if not debug and not profile:
+        return nullcontext(None)
+    if not DEBUG_TRACE_ENABLED:
+        raise TraceDisabled("Debug traces are disabled (set DEBUG_TRACE_ENABLED)")
+    if profile and not DEBUG_PROFILE_DIR:
+        raise TraceDisabled("Profiling is disabled (set DEBUG_PROFILE_DIR)")
+    return RequestTrace(name, profile=profile)
@@ -0,0 +1,190 @@
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from pipeline.cache import Verdict
+
+logger = logging.getLogger(__name__)
+
+_worker_service = None
+
+
+class InferencePoolSaturated(RuntimeError):
+    pass
+
+
+def _init_worker(service_kwargs: Dict[str, Any]) -> None:
+    global _worker_service
+    # Workers score uncached texts only; caching and pooling stay in the parent.
+    os.environ["PREDICTION_CACHE_BYTES"] = "0"
+    os.environ["INFERENCE_BACKEND"] = "inline"
+    os.environ["NEAR_DUP_MODE"] = "off"
+    from pipeline.inference import InferenceService
+
+    _worker_service = InferenceService(**service_kwargs)
+    _worker_service.warm_up()
+
+
+def _compute(texts: List[str]) -> List[Verdict]:
+    return _worker_service._compute_verdicts(texts)
+
+
+class InferenceWorkerPool:
+    """
+    Scores batches on a pool of worker processes.
+
+    Each worker builds its own InferenceService; with a model artifact the
+    IDF/weight arrays are memory-mapped, so all workers share one page-cache
+    copy. A batch is split into at most one slice per worker (and never more
+    than max_pending), at most max_pending slices are in flight, and a call
+    takes the slots for all its slices at once, so concurrent callers never
+    hold part of what they need while waiting for the rest. Callers wait up
+    to queue_timeout, then get InferencePoolSaturated. A crashed worker causes
+    the pool to be rebuilt and the affected slices to be retried once.
+    """
+
+    def __init__(
+        self,
+        service_kwargs: Dict[str, Any],
+        workers: int,
+        max_pending: Optional[int] = None,
+        queue_timeout: float = 10.0,
+        min_slice: int = 32,
+        start_method: str = "spawn",
+    ):
+        """
+        Initialize the InferenceWorkerPool.
+
+        Args:
+            service_kwargs: Keyword arguments for each worker's InferenceService
+            workers: Number of worker processes
+            max_pending: Maximum slices in flight (default: 2 per worker)
+            queue_timeout: Seconds a caller waits for a free slot before giving up
+            min_slice: Smallest slice worth sending to a separate worker
+            start_method: multiprocessing start method for the workers
+        """
+        self.service_kwargs = service_kwargs
+        self.workers = max(1, workers)
+        self.max_pending = max_pending or self.workers * 2
+        self.queue_timeout = queue_timeout
+        self.min_slice = max(1, min_slice)
+        self._context = multiprocessing.get_context(start_method)
+        self._lock = threading.Lock()
+        self._slots_freed = threading.Condition(self._lock)
+        self._executor = self._new_executor()
+        self.restarts = 0
+        self.rejected = 0
+        self.in_flight = 0
+
+    @classmethod
+    def from_env(cls, service_kwargs: Dict[str, Any]) -> "InferenceWorkerPool":
+        pending = int(os.environ.get("INFERENCE_POOL_MAX_PENDING", 0))
+        return cls(
+            service_kwargs,
+            workers=int(os.environ.get("INFERENCE_WORKERS", 0)) or os.cpu_count() or 1,
+            max_pending=pending or None,
+            queue_timeout=float(os.environ.get("INFERENCE_POOL_QUEUE_TIMEOUT", 10)),
+            min_slice=int(os.environ.get("INFERENCE_POOL_MIN_SLICE", 32)),
+            start_method=os.environ.get("INFERENCE_POOL_START_METHOD", "spawn"),
+        )
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            self.workers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self.service_kwargs,),
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is not broken:
+                return
+            logger.warning("Inference worker died; restarting the pool")
+            self.restarts += 1
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+    def _slices(self, texts: List[str]) -> List[List[str]]:
+        parts = max(1, min(self.workers, self.max_pending, len(texts) // self.min_slice))
+        size = math.ceil(len(texts) / parts)
+        return [texts[start:start + size] for start in range(0, len(texts), size)]
+
+    @staticmethod
+    def _submit(executor: ProcessPoolExecutor, texts: List[str]) -> Optional[Future]:
+        try:
+            return executor.submit(_compute, texts)
+        except (BrokenProcessPool, RuntimeError):
+            # Broken, or shut down by a concurrent restart.
+            return None
+
+    def _acquire(self, count: int) -> None:
+        deadline = time.monotonic() + self.queue_timeout
+        with self._slots_freed:
+            while self.in_flight + count > self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise InferencePoolSaturated("Inference workers are saturated")
+                self._slots_freed.wait(remaining)
+            self.in_flight += count
+
+    def _release(self, count: int) -> None:
+        with self._slots_freed:
+            self.in_flight -= count
+            self._slots_freed.notify_all()
+
+    def compute(self, texts: List[str]) -> List[Verdict]:
+        """
+        Preprocess and score texts on the workers.
+
+        Returns:
+            One verdict per text, in order
+
+        Raises:
+            InferencePoolSaturated: If no slot frees up within queue_timeout
+        """
+        if not texts:
+            return []
+        slices = self._slices(texts)
+        self._acquire(len(slices))
+        try:
+            executor = self._executor
+            futures = [self._submit(executor, part) for part in slices]
+
+            verdicts: List[Verdict] = []
+            for part, future in zip(slices, futures):
+                try:
+                    if future is None:
+                        raise BrokenProcessPool("Inference pool was not accepting work")
+                    verdicts.extend(future.result())
+                except (BrokenProcessPool, CancelledError):
+                    # Retried once on a fresh pool; a second crash propagates.
+                    self._restart(executor)
+                    verdicts.extend(self._executor.submit(_compute, part).result())
+            return verdicts
+        finally:
+            self._release(len(slices))
+
+    def warm_up(self) -> None:
+        """Start every worker (and load its model) before the first request."""
+        for future in [self._executor.submit(_compute, []) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "restarts": self.restarts,
+            "rejected": self.rejected,
+        }
@@ -1,10 +1,21 @@
+import json
+import os
+from typing import Any
+
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 from pydantic import BaseModel
 
 from pipeline.inference import InferenceService
+from pipeline.responses import json_response
+from pipeline.tracing import start_trace
 
 router = APIRouter()
 
+ANALYZE_BATCH_MAX_ITEMS = int(os.environ.get("ANALYZE_BATCH_MAX_ITEMS", 10_000))
+ANALYZE_BATCH_MAX_BYTES = int(os.environ.get("ANALYZE_BATCH_MAX_BYTES", 10 * 1024 * 1024))
+
 
 class AnalyzeRequest(BaseModel):
     text: str
@@ -19,13 +30,18 @@ def _resolve_risk_level(dark_ratio: float) -> str:
 
 
 @router.post("/analyze")
-def analyze_text(payload: AnalyzeRequest, request: Request) -> dict:
+def analyze_text(payload: AnalyzeRequest, request: Request, debug: bool = False, profile: bool = False) -> dict:
     text = payload.text.strip()
     if not text:
         raise HTTPException(status_code=400, detail="Text cannot be empty")
 
     service: InferenceService = request.app.state.inference_service
-    return service.predict(text)
+    with start_trace("analyze", debug, profile) as trace:
+        if trace is None:
+            return service.predict(text)
+        # predict_many bypasses micro-batching, so the timings are this request's own.
+        result = service.predict_many([text], trace=trace.inference)[0]
+        return {**result, "debug": trace.finish()}
 
 
 @router.post("/detect-from-text")
@@ -57,3 +73,87 @@ def detect_from_text(payload: AnalyzeRequest, request: Request) -> dict:
         "risk_level": _resolve_risk_level(dark_ratio),
         "detected_texts": detected_texts,
     }
+
+
+async def _read_body(request: Request, limit: int) -> bytes:
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+
+    body = bytearray()
+    async for block in request.stream():
+        body.extend(block)
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+    return bytes(body)
+
+
+def _parse_batch_items(body: bytes, content_type: str) -> list[Any]:
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        payload = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    if isinstance(payload, dict):
+        payload = payload.get("items")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of {id, text} items")
+    return payload
+
+
+def _score_batch(items: list[Any], service: InferenceService) -> dict:
+    results: list[dict] = []
+    scored_positions: list[int] = []
+    texts: list[str] = []
+    for item in items:
+        item_id = item.get("id") if isinstance(item, dict) else None
+        text = item.get("text") if isinstance(item, dict) else None
+        if not isinstance(text, str):
+            results.append({"id": item_id, "status": "error", "message": "Item must have a string text field"})
+            continue
+        text = text.strip()
+        if not text:
+            results.append({"id": item_id, "status": "error", "message": "Text cannot be empty"})
+            continue
+        scored_positions.append(len(results))
+        results.append({"id": item_id, "status": "ok"})
+        texts.append(text)
+
+    for position, prediction in zip(scored_positions, service.predict_many(texts)):
+        results[position].update(prediction)
+
+    total_contents_scanned = len(texts)
+    total_dark_patterns_detected = sum(
+        1 for position in scored_positions if results[position]["prediction"] == 1
+    )
+    dark_ratio = (
+        round((total_dark_patterns_detected / total_contents_scanned) * 100, 2)
+        if total_contents_scanned > 0
+        else 0.0
+    )
+
+    return {
+        "total_items": len(results),
+        "items_failed": len(results) - total_contents_scanned,
+        "total_contents_scanned": total_contents_scanned,
+        "total_dark_patterns_detected": total_dark_patterns_detected,
+        "dark_ratio": dark_ratio,
+        "risk_level": _resolve_risk_level(dark_ratio),
+        "results": results,
+    }
+
+
+@router.post("/analyze-batch")
+async def analyze_batch(request: Request) -> Response:
+    body = await _read_body(request, ANALYZE_BATCH_MAX_BYTES)
+    items = _parse_batch_items(body, request.headers.get("content-type", "").lower())
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+    if len(items) > ANALYZE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {ANALYZE_BATCH_MAX_ITEMS})")
+
+    service: InferenceService = request.app.state.inference_service
+    # Encoding a large batch stays off the event loop too.
+    return await run_in_threadpool(lambda: json_response(_score_batch(items, service), request))
@@ -0,0 +1,118 @@
+import os
+from contextlib import nullcontext
+from functools import partial
+from typing import Callable, ContextManager, Iterator, Optional
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from pipeline.admission import Rejected
+from pipeline.inference import InferenceService
+from pipeline.metrics import metrics
+from routes.url_route import (
+    _inference_slot,
+    _ndjson,
+    _new_scraper,
+    _resolve_risk_level,
+    _summarize,
+    _validated_explain,
+    _validated_url,
+)
+from webscraper.crawler import HostRateLimiter, SiteCrawler
+
+router = APIRouter()
+
+CRAWL_MAX_PAGES = int(os.environ.get("CRAWL_MAX_PAGES", 200))
+CRAWL_MAX_DEPTH = int(os.environ.get("CRAWL_MAX_DEPTH", 5))
+CRAWL_MIN_INTERVAL = float(os.environ.get("CRAWL_MIN_INTERVAL", 1.0))
+CRAWL_MAX_DELAY = float(os.environ.get("CRAWL_MAX_DELAY", 30.0))
+
+# Shared by all crawls, so concurrent crawls of one host are spaced out together.
+_host_rate_limiter = HostRateLimiter(CRAWL_MIN_INTERVAL)
+
+
+class CrawlRequest(BaseModel):
+    url: str
+    max_pages: Optional[int] = None
+    max_depth: Optional[int] = None
+
+
+def _crawl_events(
+    crawler: SiteCrawler,
+    seed: str,
+    service: InferenceService,
+    explain: int = 0,
+    inference_slot: Callable[[], ContextManager[None]] = nullcontext,
+) -> Iterator[str]:
+    pages_scanned = 0
+    pages_failed = 0
+    total_contents_scanned = 0
+    total_dark_patterns_detected = 0
+
+    for page in crawler.crawl(seed):
+        message = page.get("error")
+        if message is None:
+            metrics.observe("chunks_per_page", len(page["chunks"]))
+            if not page["chunks"]:
+                message = "No usable visible text chunks found on page"
+        if message is not None:
+            pages_failed += 1
+            yield _ndjson(
+                {"type": "page", "url": page["url"], "depth": page["depth"], "status": "error", "message": message}
+            )
+            continue
+
+        try:
+            with inference_slot():
+                predictions = service.predict_chunks(page["chunks"], explain=explain)
+        except Rejected as e:
+            # The server is overloaded; stop rather than keep fetching pages.
+            pages_failed += 1
+            yield _ndjson(
+                {"type": "page", "url": page["url"], "depth": page["depth"], "status": "error", "message": str(e)}
+            )
+            break
+        summary = _summarize(predictions)
+        pages_scanned += 1
+        total_contents_scanned += summary["total_contents_scanned"]
+        total_dark_patterns_detected += summary["total_dark_patterns_detected"]
+        yield _ndjson({"type": "page", "url": page["url"], "depth": page["depth"], "status": "ok", **summary})
+
+    dark_ratio = (
+        round((total_dark_patterns_detected / total_contents_scanned) * 100, 2)
+        if total_contents_scanned > 0
+        else 0.0
+    )
+    yield _ndjson(
+        {
+            "type": "summary",
+            "pages_scanned": pages_scanned,
+            "pages_failed": pages_failed,
+            "total_contents_scanned": total_contents_scanned,
+            "total_dark_patterns_detected": total_dark_patterns_detected,
+            "dark_ratio": dark_ratio,
+            "risk_level": _resolve_risk_level(dark_ratio),
+        }
+    )
+
+
+@router.post("/crawl")
+def crawl_site(payload: CrawlRequest, request: Request, explain: int = 0) -> StreamingResponse:
+    seed = _validated_url(payload.url)
+    explain = _validated_explain(explain)
+    max_pages = min(payload.max_pages or CRAWL_MAX_PAGES, CRAWL_MAX_PAGES)
+    max_depth = min(payload.max_depth if payload.max_depth is not None else 2, CRAWL_MAX_DEPTH)
+
+    crawler = SiteCrawler(
+        _new_scraper(),
+        max_pages=max(max_pages, 1),
+        max_depth=max(max_depth, 0),
+        max_crawl_delay=CRAWL_MAX_DELAY,
+        rate_limiter=_host_rate_limiter,
+    )
+    service: InferenceService = request.app.state.inference_service
+    return StreamingResponse(
+        _crawl_events(crawler, seed, service, explain, partial(_inference_slot, request)),
+        media_type="application/x-ndjson",
+    )
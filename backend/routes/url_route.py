@@ -1,26 +1,60 @@
+import json
+import logging
+import os
 import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
+from queue import Queue
 import re
+from typing import Any, Callable, ContextManager, Iterator, Optional
 from urllib.parse import urlparse
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
+from pipeline.admission import Rejected
 from pipeline.inference import InferenceService
+from pipeline.metrics import metrics
+from pipeline.responses import ChunkTable, json_response
+from pipeline.scan_index import get_shared_scan_index
+from pipeline.tracing import start_trace
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
+from webscraper.page_cache import get_shared_page_cache
 from webscraper.scraper import WebScraper
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
+URL_BATCH_MAX_URLS = int(os.environ.get("URL_BATCH_MAX_URLS", 100))
+URL_FETCH_CONCURRENCY = int(os.environ.get("URL_FETCH_CONCURRENCY", 16))
+URL_FETCH_PER_HOST = int(os.environ.get("URL_FETCH_PER_HOST", 2))
+PREDICT_BATCH_CHUNKS = int(os.environ.get("PREDICT_BATCH_CHUNKS", 2048))
+STREAM_BATCH_CHUNKS = int(os.environ.get("STREAM_BATCH_CHUNKS", 25))
+EXPLAIN_MAX_TOKENS = int(os.environ.get("EXPLAIN_MAX_TOKENS", 20))
+
+_url_executor: Optional[ThreadPoolExecutor] = None
+_url_executor_lock = threading.Lock()
+
+
 class URLRequest(BaseModel):
     url: str
 
 
+class URLBatchRequest(BaseModel):
+    urls: list[str]
+
+
 def _is_valid_url(url: str) -> bool:
     parsed = urlparse(url)
     host = (parsed.hostname or "").strip()
@@ -45,88 +79,57 @@ def _normalize_chunk(text: str) -> str:
     return " ".join(text.split()).strip()
 
 
-def _extract_chunks(scraper: WebScraper, url: str) -> list[str]:
-    html = scraper.fetch(url)
-    if html is None:
+def _extract_chunks(scraper: WebScraper, url: str, trace: Optional[dict[str, Any]] = None) -> list[str]:
+    chunks = scraper.extract_chunks(url, max_chunks=300, trace=trace)
+    if chunks is None:
         raise HTTPException(status_code=400, detail="Failed to fetch URL content")
 
-    soup = scraper.parse(html)
-    if soup is None:
-        raise HTTPException(status_code=400, detail="Failed to parse URL content")
-
-    for node in soup(["script", "style"]):
-        node.decompose()
-
-    raw_chunks: list[str] = []
-
-    for paragraph in soup.find_all("p"):
-        text = _normalize_chunk(paragraph.get_text(" ", strip=True))
-        if text:
-            raw_chunks.append(text)
-
-    for button in soup.find_all("button"):
-        text = _normalize_chunk(button.get_text(" ", strip=True))
-        if text:
-            raw_chunks.append(text)
-
-    for input_button in soup.find_all("input"):
-        input_type = (input_button.get("type") or "").strip().lower()
-        if input_type in {"button", "submit"}:
-            value = _normalize_chunk(input_button.get("value") or "")
-            if value:
-                raw_chunks.append(value)
-
-    if not raw_chunks:
-        text = _normalize_chunk(soup.get_text(" ", strip=True))
-        if text:
-            raw_chunks.extend(re.split(r"(?<=[.!?])\s+", text))
-
-    filtered_chunks: list[str] = []
-    seen = set()
-    for chunk in raw_chunks:
-        cleaned = _normalize_chunk(chunk)
-        if len(cleaned) < 15:
-            continue
-        if len(cleaned.split()) < 3:
-            continue
-        if len(cleaned) > 1200:
-            cleaned = cleaned[:1200]
-        if cleaned in seen:
-            continue
-        seen.add(cleaned)
-        filtered_chunks.append(cleaned)
+    metrics.observe("chunks_per_page", len(chunks))
+    return chunks
 
-    if len(filtered_chunks) > 300:
-        filtered_chunks = filtered_chunks[:300]
 
-    return filtered_chunks
+def _validated_explain(explain: int) -> int:
+    if not 0 <= explain <= EXPLAIN_MAX_TOKENS:
+        raise HTTPException(status_code=400, detail=f"explain must be between 0 and {EXPLAIN_MAX_TOKENS}")
+    return explain
 
 
-@router.post("/detect-from-url")
-def detect_from_url(payload: URLRequest, request: Request) -> dict:
-    url = _normalize_chunk(payload.url)
+def _validated_url(raw_url: str) -> str:
+    url = _normalize_chunk(raw_url)
     if not url:
         raise HTTPException(status_code=400, detail="URL cannot be empty")
     if not _is_valid_url(url):
         raise HTTPException(status_code=400, detail="Invalid URL. Use http:// or https://")
+    return url
+
 
-    scraper = WebScraper(timeout=15)
-    chunks = _extract_chunks(scraper, url)
+def _new_scraper() -> WebScraper:
+    return WebScraper(timeout=15, connect_timeout=5, page_cache=get_shared_page_cache(), metrics=metrics)
+
+
+def _inference_slot(request: Request) -> ContextManager[None]:
+    """Inference pool slot to hold while this request scores chunks."""
+    admission = getattr(request.app.state, "admission", None)
+    return admission.inference_slot() if admission is not None else nullcontext()
+
+
+def _scan_chunks(scraper: WebScraper, url: str, trace: Optional[dict[str, Any]] = None) -> list[str]:
+    chunks = _extract_chunks(scraper, url, trace)
     if not chunks:
         raise HTTPException(status_code=400, detail="No usable visible text chunks found on page")
+    return chunks
 
-    service: InferenceService = request.app.state.inference_service
-    predictions = service.predict_chunks(chunks)
 
+def _detection(item: dict) -> dict:
+    detection = {"text": item["text"], "confidence": item["confidence"]}
+    if "explanation" in item:
+        detection["explanation"] = item["explanation"]
+    return detection
+
+
+def _summarize(predictions: list[dict]) -> dict:
     total_contents_scanned = len(predictions)
-    detected = [
-        {
-            "text": item["text"],
-            "confidence": item["confidence"],
-        }
-        for item in predictions
-        if item["prediction"] == 1
-    ]
+    detected = [_detection(item) for item in predictions if item["prediction"] == 1]
 
     total_dark_patterns_detected = len(detected)
     dark_ratio = (
@@ -142,3 +145,256 @@ def detect_from_url(payload: URLRequest, request: Request) -> dict:
         "risk_level": _resolve_risk_level(dark_ratio),
         "detected_texts": detected,
     }
+
+
+def _compact(result: dict, table: ChunkTable) -> None:
+    """Replace detected texts (and diff detections) with indices into table."""
+    result["detected_chunks"] = table.compact(result.pop("detected_texts"))
+    diff = result.get("diff")
+    if diff is not None:
+        diff["new_detections"] = table.compact(diff["new_detections"])
+        diff["removed_detections"] = table.compact(diff["removed_detections"])
+
+
+@router.post("/detect-from-url")
+def detect_from_url(
+    payload: URLRequest,
+    request: Request,
+    debug: bool = False,
+    profile: bool = False,
+    compact: bool = False,
+    explain: int = 0,
+) -> Response:
+    url = _validated_url(payload.url)
+    explain = _validated_explain(explain)
+    with start_trace("detect-from-url", debug, profile) as trace:
+        chunks = _scan_chunks(_new_scraper(), url, trace.fetch if trace else None)
+
+        service: InferenceService = request.app.state.inference_service
+        inference_trace = trace.inference if trace else None
+        scan_index = get_shared_scan_index()
+        with _inference_slot(request):
+            if scan_index is None:
+                result = _summarize(service.predict_chunks(chunks, trace=inference_trace, explain=explain))
+            else:
+                predictions, diff = scan_index.scan(
+                    url, service.fingerprint, chunks, lambda fresh: service.predict_chunks(fresh, trace=inference_trace)
+                )
+                # Reused verdicts come without text features, so detections are explained afterwards.
+                service.explain(predictions, explain, inference_trace)
+                result = {**_summarize(predictions), "diff": diff}
+        if compact:
+            table = ChunkTable()
+            _compact(result, table)
+            result["chunks"] = table.texts
+        if trace is not None:
+            result["debug"] = trace.finish()
+        return json_response(result, request)
+
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def _stream_detections(
+    url: str,
+    chunks: list[str],
+    service: InferenceService,
+    encode,
+    explain: int = 0,
+    inference_slot: Callable[[], ContextManager[None]] = nullcontext,
+) -> Iterator[str]:
+    yield encode({"type": "page", "url": url, "total_chunks": len(chunks)})
+
+    predictions: list[dict] = []
+    for batch_index, start in enumerate(range(0, len(chunks), STREAM_BATCH_CHUNKS)):
+        # One slot per batch, so a long page does not keep other requests out.
+        try:
+            with inference_slot():
+                batch = service.predict_chunks(chunks[start:start + STREAM_BATCH_CHUNKS], explain=explain)
+        except Rejected as e:
+            yield encode({"type": "error", "message": str(e)})
+            return
+        predictions.extend(batch)
+        yield encode(
+            {
+                "type": "detections",
+                "batch": batch_index,
+                "contents_scanned": len(batch),
+                "detected_texts": [_detection(item) for item in batch if item["prediction"] == 1],
+            }
+        )
+
+    summary = _summarize(predictions)
+    del summary["detected_texts"]
+    yield encode({"type": "summary", **summary})
+
+
+@router.post("/detect-from-url/stream")
+def detect_from_url_stream(payload: URLRequest, request: Request, explain: int = 0) -> StreamingResponse:
+    url = _validated_url(payload.url)
+    explain = _validated_explain(explain)
+    chunks = _scan_chunks(_new_scraper(), url)
+
+    service: InferenceService = request.app.state.inference_service
+    inference_slot = partial(_inference_slot, request)
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _stream_detections(url, chunks, service, _sse, explain, inference_slot),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return StreamingResponse(
+        _stream_detections(url, chunks, service, _ndjson, explain, inference_slot),
+        media_type="application/x-ndjson",
+    )
+
+
+def _fetch_executor() -> ThreadPoolExecutor:
+    global _url_executor
+    if _url_executor is None:
+        with _url_executor_lock:
+            if _url_executor is None:
+                _url_executor = ThreadPoolExecutor(
+                    max_workers=URL_FETCH_CONCURRENCY, thread_name_prefix="url-fetch"
+                )
+    return _url_executor
+
+
+class HostLanes:
+    """
+    Process-wide per-host fetch limit on the shared fetch executor.
+
+    Work for a host is queued, and at most per_host lanes (executor tasks)
+    drain a host's queue at once, whichever requests the work came from. A
+    lane only exists while its host has queued work, so no executor thread
+    ever waits on another host's limit.
+    """
+
+    def __init__(self, per_host: int):
+        self.per_host = max(1, per_host)
+        self._queued: dict[str, deque] = {}
+        self._lanes: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, executor: ThreadPoolExecutor, host: str, job: Callable[[], None]) -> None:
+        with self._lock:
+            self._queued.setdefault(host, deque()).append(job)
+            lanes = self._lanes.get(host, 0)
+            if lanes >= self.per_host:
+                return
+            self._lanes[host] = lanes + 1
+        executor.submit(self._drain, host)
+
+    def _drain(self, host: str) -> None:
+        while True:
+            with self._lock:
+                queued = self._queued.get(host)
+                if not queued:
+                    self._queued.pop(host, None)
+                    self._lanes[host] -= 1
+                    if not self._lanes[host]:
+                        del self._lanes[host]
+                    return
+                job = queued.popleft()
+            job()
+
+
+_host_lanes = HostLanes(URL_FETCH_PER_HOST)
+
+
+def _scan_url(scraper: WebScraper, position: int, url: str, done: Queue) -> None:
+    try:
+        done.put((position, _scan_chunks(scraper, url), None))
+    except HTTPException as e:
+        done.put((position, None, e.detail))
+    except Exception as e:
+        logger.exception("Unexpected error scanning %s: %s", url, e)
+        done.put((position, None, "Failed to fetch URL content"))
+
+
+@router.post("/detect-from-urls")
+def detect_from_urls(payload: URLBatchRequest, request: Request, compact: bool = False, explain: int = 0) -> Response:
+    explain = _validated_explain(explain)
+    if not payload.urls:
+        raise HTTPException(status_code=400, detail="URL list cannot be empty")
+    if len(payload.urls) > URL_BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"Too many URLs (max {URL_BATCH_MAX_URLS})")
+
+    results: list[dict] = [{} for _ in payload.urls]
+    pending_urls: list[tuple[int, str]] = []
+    for position, raw_url in enumerate(payload.urls):
+        try:
+            url = _validated_url(raw_url)
+        except HTTPException as e:
+            results[position] = {"url": raw_url, "status": "error", "message": e.detail}
+            continue
+        results[position] = {"url": url}
+        pending_urls.append((position, url))
+
+    service: InferenceService = request.app.state.inference_service
+    scraper = _new_scraper()
+    done: Queue = Queue()
+    executor = _fetch_executor()
+    for position, url in pending_urls:
+        host = (urlparse(url).hostname or "").lower()
+        _host_lanes.submit(executor, host, partial(_scan_url, scraper, position, url, done))
+
+    # Score pages in pooled batches on this thread while the rest still download.
+    batch: list[tuple[int, list[str]]] = []
+    batch_size = 0
+
+    def score_batch() -> None:
+        pooled = [chunk for _, chunks in batch for chunk in chunks]
+        owners = [position for position, chunks in batch for _ in chunks]
+        per_page: dict[int, list[dict]] = {position: [] for position, _ in batch}
+        with _inference_slot(request):
+            scored = service.predict_chunks(pooled, explain=explain)
+        for prediction in scored:
+            per_page[owners[prediction["index"]]].append(prediction)
+        for position, predictions in per_page.items():
+            results[position].update({"status": "ok", **_summarize(predictions)})
+
+    for _ in pending_urls:
+        position, chunks, error = done.get()
+        if error is not None:
+            results[position].update({"status": "error", "message": error})
+            continue
+        batch.append((position, chunks))
+        batch_size += len(chunks)
+        if batch_size >= PREDICT_BATCH_CHUNKS:
+            score_batch()
+            batch, batch_size = [], 0
+    if batch:
+        score_batch()
+
+    scanned = [result for result in results if result["status"] == "ok"]
+    total_contents_scanned = sum(result["total_contents_scanned"] for result in scanned)
+    total_dark_patterns_detected = sum(result["total_dark_patterns_detected"] for result in scanned)
+    dark_ratio = (
+        round((total_dark_patterns_detected / total_contents_scanned) * 100, 2)
+        if total_contents_scanned > 0
+        else 0.0
+    )
+
+    response = {
+        "total_urls": len(results),
+        "urls_scanned": len(scanned),
+        "urls_failed": len(results) - len(scanned),
+        "total_contents_scanned": total_contents_scanned,
+        "total_dark_patterns_detected": total_dark_patterns_detected,
+        "dark_ratio": dark_ratio,
+        "risk_level": _resolve_risk_level(dark_ratio),
+        "results": results,
+    }
+    if compact:
+        # One table for the whole batch, so boilerplate shared by pages is sent once.
+        table = ChunkTable()
+        for result in scanned:
+            _compact(result, table)
+        response["chunks"] = table.texts
+    return json_response(response, request)
@@ -0,0 +1,265 @@
+"""Score a text corpus offline with the dark pattern model.
+
+Reads CSV, JSONL or XLSX in bounded batches, scores them on a pool of
+worker processes (each loads the model once) and appends predictions to
+a JSONL or CSV file as batches finish. A ``<output>.progress`` file
+records how far the output got, so an interrupted run can be resumed
+with ``--resume``.
+
+Example:
+    python score_corpus.py ../Model/dataset.xlsx -o scored.jsonl --workers 4
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+logger = logging.getLogger("score_corpus")
+
+TEXT_COLUMN_CANDIDATES = ("text", "Pattern String")
+
+Row = Tuple[Any, str]
+
+_worker_service = None
+
+
+def _detect_text_column(header: List[str], text_column: Optional[str]) -> int:
+    if text_column is not None:
+        if text_column not in header:
+            raise SystemExit(f"Column {text_column!r} not found; available: {header}")
+        return header.index(text_column)
+    for candidate in TEXT_COLUMN_CANDIDATES:
+        if candidate in header:
+            return header.index(candidate)
+    return 0
+
+
+def _iter_table(rows: Iterator[List[Any]], text_column: Optional[str], id_column: Optional[str]) -> Iterator[Row]:
+    header = [str(name) if name is not None else "" for name in next(rows, [])]
+    text_index = _detect_text_column(header, text_column)
+    id_index = header.index(id_column) if id_column in header else None
+    for number, row in enumerate(rows):
+        text = row[text_index] if text_index < len(row) else None
+        row_id = row[id_index] if id_index is not None and id_index < len(row) else number
+        yield row_id, "" if text is None else str(text)
+
+
+def iter_csv(path: Path, text_column: Optional[str], id_column: Optional[str]) -> Iterator[Row]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        yield from _iter_table(csv.reader(handle), text_column, id_column)
+
+
+def iter_xlsx(path: Path, text_column: Optional[str], id_column: Optional[str]) -> Iterator[Row]:
+    try:
+        import openpyxl
+    except ImportError:
+        raise SystemExit("Reading .xlsx files requires openpyxl (pip install openpyxl)")
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        rows = (list(row) for row in workbook.worksheets[0].iter_rows(values_only=True))
+        yield from _iter_table(rows, text_column, id_column)
+    finally:
+        workbook.close()
+
+
+def iter_jsonl(path: Path, text_column: Optional[str], id_column: Optional[str]) -> Iterator[Row]:
+    text_key = text_column or "text"
+    id_key = id_column or "id"
+    with open(path, encoding="utf-8") as handle:
+        for number, line in enumerate(handle):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = record.get(text_key)
+            yield record.get(id_key, number), "" if text is None else str(text)
+
+
+READERS = {".csv": iter_csv, ".jsonl": iter_jsonl, ".ndjson": iter_jsonl, ".xlsx": iter_xlsx}
+
+
+def _init_worker(model_path: Optional[str], vectorizer_path: Optional[str]) -> None:
+    global _worker_service
+    # Each corpus worker is already one process; it must not start its own pool.
+    os.environ["INFERENCE_BACKEND"] = "inline"
+    from pipeline.inference import InferenceService
+
+    _worker_service = InferenceService(model_path=model_path, vectorizer_path=vectorizer_path)
+    _worker_service.warm_up()
+
+
+def _score_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    return _worker_service.predict_many(texts)
+
+
+class ProgressFile:
+    """Tracks rows written and the output size after the last complete batch."""
+
+    def __init__(self, output_path: Path):
+        self.path = output_path.with_name(output_path.name + ".progress")
+
+    def load(self) -> Dict[str, int]:
+        if not self.path.exists():
+            return {"rows": 0, "bytes": 0}
+        return json.loads(self.path.read_text())
+
+    def save(self, rows: int, size: int) -> None:
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(json.dumps({"rows": rows, "bytes": size}))
+        os.replace(temporary, self.path)
+
+
+class PredictionWriter:
+    """Appends scored rows to a JSONL or CSV file."""
+
+    def __init__(self, path: Path, output_format: str, include_text: bool, resume_bytes: int):
+        self.format = output_format
+        self.include_text = include_text
+        exists = path.exists() and resume_bytes > 0
+        self.handle = open(path, "r+" if exists else "w", newline="", encoding="utf-8")
+        if exists:
+            # Drop anything written after the last recorded batch.
+            self.handle.seek(resume_bytes)
+            self.handle.truncate()
+        self.fields = ["id", "prediction", "confidence"] + (["text"] if include_text else [])
+        if self.format == "csv":
+            self.csv = csv.writer(self.handle, lineterminator="\n")
+            if not exists:
+                self.csv.writerow(self.fields)
+
+    def write(self, rows: List[Row], predictions: List[Dict[str, Any]]) -> int:
+        for (row_id, text), prediction in zip(rows, predictions):
+            record = {"id": row_id, **prediction}
+            if self.include_text:
+                record["text"] = text
+            if self.format == "csv":
+                self.csv.writerow([record[field] for field in self.fields])
+            else:
+                self.handle.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.handle.flush()
+        return self.handle.tell()
+
+    def close(self) -> None:
+        self.handle.close()
+
+
+def _batches(rows: Iterator[Row], batch_size: int) -> Iterator[List[Row]]:
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def score_corpus(
+    input_path: Path,
+    output_path: Path,
+    output_format: str,
+    text_column: Optional[str] = None,
+    id_column: Optional[str] = None,
+    batch_size: int = 2048,
+    workers: int = 0,
+    resume: bool = False,
+    start_offset: int = 0,
+    include_text: bool = False,
+    model_path: Optional[str] = None,
+    vectorizer_path: Optional[str] = None,
+) -> int:
+    reader = READERS.get(input_path.suffix.lower())
+    if reader is None:
+        raise SystemExit(f"Unsupported input format: {input_path.suffix} (use {', '.join(READERS)})")
+
+    progress = ProgressFile(output_path)
+    state = progress.load() if resume else {"rows": 0, "bytes": 0}
+    skip = max(state["rows"], start_offset)
+    if skip:
+        logger.info("Skipping the first %d rows", skip)
+
+    rows = islice(reader(input_path, text_column, id_column), skip, None)
+    writer = PredictionWriter(output_path, output_format, include_text, state["bytes"])
+    # Progress counts input rows, so skipped rows count as done either way.
+    done = skip
+
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_path, vectorizer_path)) if workers > 0 else None
+    if executor is None:
+        _init_worker(model_path, vectorizer_path)
+
+    # Keep only a few batches in flight so memory stays flat on huge inputs.
+    in_flight: Deque[Tuple[List[Row], Future]] = deque()
+    max_in_flight = max(workers, 1) * 2
+    try:
+        for batch in _batches(rows, batch_size):
+            texts = [text for _, text in batch]
+            if executor is None:
+                predictions = _score_batch(texts)
+                done += len(batch)
+                progress.save(done, writer.write(batch, predictions))
+                continue
+
+            in_flight.append((batch, executor.submit(_score_batch, texts)))
+            while len(in_flight) >= max_in_flight:
+                finished, future = in_flight.popleft()
+                done += len(finished)
+                progress.save(done, writer.write(finished, future.result()))
+
+        while in_flight:
+            finished, future = in_flight.popleft()
+            done += len(finished)
+            progress.save(done, writer.write(finished, future.result()))
+    finally:
+        writer.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    logger.info("Scored %d rows into %s", done, output_path)
+    return done
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score a corpus with the dark pattern model.")
+    parser.add_argument("input", type=Path, help="CSV, JSONL or XLSX file")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL or CSV output file")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Output format (default: from output extension)")
+    parser.add_argument("--text-column", help="Column/key holding the text (default: auto-detect)")
+    parser.add_argument("--id-column", help="Column/key holding a row id (default: row number)")
+    parser.add_argument("--batch-size", type=int, default=2048)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (0: score in-process)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the output's progress file")
+    parser.add_argument("--start-offset", type=int, default=0, help="Skip this many input rows")
+    parser.add_argument("--include-text", action="store_true", help="Copy the input text into the output")
+    parser.add_argument("--model", help="Path to model.pkl")
+    parser.add_argument("--vectorizer", help="Path to vectorizer.pkl")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    output_format = args.format or ("csv" if args.output.suffix.lower() == ".csv" else "jsonl")
+    score_corpus(
+        args.input,
+        args.output,
+        output_format,
+        text_column=args.text_column,
+        id_column=args.id_column,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        resume=args.resume,
+        start_offset=args.start_offset,
+        include_text=args.include_text,
+        model_path=args.model,
+        vectorizer_path=args.vectorizer,
+    )
+
+
+if __name__ == "__main__":
+    main()
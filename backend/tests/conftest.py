@@ -0,0 +1,162 @@
+import http.server
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PROJECT_ROOT = BACKEND_DIR.parent
+MODEL_DIR = PROJECT_ROOT / "Model"
+for path in (BACKEND_DIR, PROJECT_ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+Reply = Tuple[int, Dict[str, str], bytes]
+Route = Union[Reply, Callable[[Any], Reply]]
+
+
+class StubServer:
+    """
+    Local HTTP/1.1 server answering GETs from a route table.
+
+    A route is a (status, headers, body) tuple or a callable taking the
+    request headers and returning one. A "Transfer-Encoding: chunked"
+    header sends the body in chunks without a Content-Length. Accepted
+    connections and requests are counted so tests can check keep-alive
+    reuse and conditional headers.
+    """
+
+    def __init__(self):
+        self.routes: Dict[str, Route] = {}
+        self.connections = 0
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append((self.path, dict(self.headers)))
+                route = stub.routes.get(self.path, (404, {}, b""))
+                status, headers, body = route(self.headers) if callable(route) else route
+                self.send_response(status)
+                headers = {"Content-Type": "text/html; charset=utf-8", **headers}
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                chunked = headers.get("Transfer-Encoding") == "chunked"
+                if not chunked:
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if not chunked:
+                    self.wfile.write(body)
+                    return
+                try:
+                    for start in range(0, len(body), 16 * 1024):
+                        block = body[start:start + 16 * 1024]
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(block), block))
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading, as an aborted fetch does.
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, path: str, host: str = "127.0.0.1") -> str:
+        return f"http://{host}:{self.port}{path}"
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture(scope="session")
+def dataset_strings() -> List[str]:
+    """The training corpus strings from Model/dataset.xlsx."""
+    pytest.importorskip("openpyxl")
+    from benchmarks.make_fixtures import _dataset_strings
+
+    return _dataset_strings()
+
+
+@pytest.fixture(scope="session")
+def model_pickles() -> Tuple[Any, Any]:
+    """The fitted (vectorizer, model) pair the service loads by default."""
+    joblib = pytest.importorskip("joblib")
+    return joblib.load(MODEL_DIR / "vectorizer.pkl"), joblib.load(MODEL_DIR / "model.pkl")
+
+
+class FakeService:
+    """
+    Stand-in for InferenceService in route tests.
+
+    A text is a detection when it mentions "hurry". Every predict_chunks
+    call is recorded, so tests can check what was scored.
+    """
+
+    fingerprint = "f" * 64
+
+    def __init__(self):
+        self.chunk_calls: List[List[str]] = []
+
+    @staticmethod
+    def _verdict(text: str) -> Dict[str, Any]:
+        detected = "hurry" in text.lower()
+        return {"prediction": int(detected), "confidence": 0.9 if detected else 0.8}
+
+    def predict(self, text: str) -> Dict[str, Any]:
+        return self._verdict(text)
+
+    def predict_many(self, texts: List[str], trace: Any = None) -> List[Dict[str, Any]]:
+        return [self._verdict(text) for text in texts]
+
+    def predict_chunks(self, chunks: List[str], trace: Any = None, explain: int = 0) -> List[Dict[str, Any]]:
+        self.chunk_calls.append(list(chunks))
+        results = [{"index": index, "text": chunk, **self._verdict(chunk)} for index, chunk in enumerate(chunks)]
+        self.explain(results, explain)
+        return results
+
+    def explain(self, predictions: List[Dict[str, Any]], top_k: int, trace: Any = None) -> None:
+        for prediction in predictions:
+            if top_k > 0 and prediction["prediction"] == 1:
+                prediction["explanation"] = [{"token": "hurry", "weight": 1.0}]
+
+
+@pytest.fixture
+def fake_service() -> FakeService:
+    return FakeService()
+
+
+@pytest.fixture
+def api(fake_service):
+    """A TestClient for the app, serving with fake_service and no lifespan."""
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    previous = getattr(app.state, "inference_service", None)
+    app.state.inference_service = fake_service
+    yield TestClient(app)
+    app.state.inference_service = previous
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
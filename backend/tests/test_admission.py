@@ -0,0 +1,243 @@
+import asyncio
+import json
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from pipeline import admission
+from pipeline.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionPool,
+    ClientRateLimiter,
+    Rejected,
+)
+
+PAGE = b"<html><body><p>Hurry, only 2 left in stock</p><p>Free shipping on all orders</p></body></html>"
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_acquire_is_immediate_while_slots_are_free():
+    pool = AdmissionPool("test", concurrency=2, max_queue=0, max_wait=1.0)
+
+    async def scenario():
+        await pool.acquire()
+        await pool.acquire()
+
+    run(scenario())
+    assert pool.in_flight == 2
+    assert pool.admitted == 2
+
+
+def test_full_queue_is_rejected():
+    pool = AdmissionPool("test", concurrency=1, max_queue=0, max_wait=1.0)
+
+    async def scenario():
+        await pool.acquire()
+        with pytest.raises(Rejected) as rejected:
+            await pool.acquire()
+        return rejected.value
+
+    rejected = run(scenario())
+    assert (rejected.status_code, rejected.reason) == (503, "queue_full")
+    assert pool.rejected == {"queue_full": 1}
+    assert pool.in_flight == 1
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    pool = AdmissionPool("test", concurrency=1, max_queue=4, max_wait=5.0)
+    admitted = []
+
+    async def waiter(name):
+        await pool.acquire()
+        admitted.append(name)
+
+    async def scenario():
+        await pool.acquire()
+        tasks = [asyncio.create_task(waiter(name)) for name in ("first", "second")]
+        await asyncio.sleep(0.01)
+        assert pool.queue_depth == 2
+
+        pool.release(held=0.1)
+        await asyncio.sleep(0.01)
+        # The slot moved to a waiter rather than being freed.
+        assert admitted == ["first"]
+        assert pool.in_flight == 1
+
+        pool.release(held=0.1)
+        await asyncio.gather(*tasks)
+        pool.release(held=0.1)
+
+    run(scenario())
+    assert admitted == ["first", "second"]
+    assert pool.in_flight == 0
+    assert pool.queue_depth == 0
+    assert pool.hold_seconds == pytest.approx(0.1)
+
+
+def test_waiter_is_rejected_at_its_deadline():
+    pool = AdmissionPool("test", concurrency=1, max_queue=4, max_wait=0.05)
+
+    async def scenario():
+        await pool.acquire()
+        with pytest.raises(Rejected) as rejected:
+            await pool.acquire()
+        return rejected.value
+
+    assert run(scenario()).reason == "deadline"
+    assert pool.queue_depth == 0
+    assert pool.in_flight == 1
+
+
+def test_expected_wait_rejects_without_queueing():
+    pool = AdmissionPool("test", concurrency=1, max_queue=4, max_wait=1.0)
+    pool.hold_seconds = 10.0
+
+    async def scenario():
+        await pool.acquire()
+        with pytest.raises(Rejected) as rejected:
+            await pool.acquire()
+        return rejected.value
+
+    rejected = run(scenario())
+    assert rejected.reason == "deadline"
+    assert rejected.retry_after == 10
+    assert pool.queue_depth == 0
+
+
+def test_cancelled_waiter_does_not_take_a_slot():
+    pool = AdmissionPool("test", concurrency=1, max_queue=4, max_wait=5.0)
+
+    async def scenario():
+        await pool.acquire()
+        task = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        pool.release()
+
+    run(scenario())
+    assert pool.in_flight == 0
+    assert pool.queue_depth == 0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_rate_limiter_allows_a_burst_then_refills(clock):
+    limiter = ClientRateLimiter(rate=1.0, burst=2)
+    limiter.take("client", "fetch")
+    limiter.take("client", "fetch")
+    with pytest.raises(Rejected) as rejected:
+        limiter.take("client", "fetch")
+    assert (rejected.value.status_code, rejected.value.retry_after) == (429, 1)
+    assert limiter.limited == 1
+
+    # Other clients have their own bucket.
+    limiter.take("other", "fetch")
+
+    clock[0] += 1.0
+    limiter.take("client", "fetch")
+
+
+def test_rate_limiter_forgets_the_least_recent_client(clock):
+    limiter = ClientRateLimiter(rate=1.0, burst=1, max_clients=2)
+    for client in ("a", "b", "c"):
+        limiter.take(client, "fetch")
+    assert limiter.stats()["clients"] == 2
+    # "a" was forgotten and starts over with a full bucket.
+    limiter.take("a", "fetch")
+    with pytest.raises(Rejected):
+        limiter.take("c", "fetch")
+
+
+def test_rate_limiter_identifies_clients_by_header_or_peer():
+    limiter = ClientRateLimiter(rate=1.0, burst=1, client_header="X-Api-Key")
+    scope = {"headers": [(b"x-api-key", b"key-1")], "client": ("10.0.0.1", 1234)}
+    assert limiter.client_id(scope) == "key-1"
+    assert limiter.client_id({"headers": [], "client": ("10.0.0.1", 1234)}) == "10.0.0.1"
+
+
+def _client(controller: AdmissionController) -> TestClient:
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/analyze", ok, methods=["POST"]), Route("/", ok)])
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return TestClient(app)
+
+
+def test_middleware_answers_503_when_the_pool_is_full():
+    pool = AdmissionPool("inference", concurrency=1, max_queue=0, max_wait=1.0)
+    pool.in_flight = 1
+    client = _client(AdmissionController(fetch=None, inference=pool))
+
+    response = client.post("/analyze")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json() == {"status": "error", "message": "Server busy (inference queue is full), retry later"}
+    # Paths without a pool are not admitted.
+    assert client.get("/").status_code == 200
+
+
+def test_middleware_answers_429_when_rate_limited():
+    pool = AdmissionPool("inference", concurrency=4, max_queue=0, max_wait=1.0)
+    limiter = ClientRateLimiter(rate=0.5, burst=1)
+    client = _client(AdmissionController(fetch=None, inference=pool, rate_limiter=limiter))
+
+    assert client.post("/analyze").status_code == 200
+    response = client.post("/analyze")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+    assert response.json()["status"] == "error"
+    assert pool.in_flight == 0
+
+
+@pytest.fixture
+def inference_pool(api):
+    pool = AdmissionPool("inference", concurrency=1, max_queue=0, max_wait=1.0)
+    previous = api.app.state.admission
+    api.app.state.admission = AdmissionController(fetch=None, inference=pool)
+    yield pool
+    api.app.state.admission = previous
+
+
+def test_url_scan_scores_under_an_inference_slot(api, fake_service, inference_pool, stub_server):
+    stub_server.routes["/page"] = (200, {}, PAGE)
+    response = api.post("/detect-from-url", json={"url": stub_server.url("/page")})
+
+    assert response.status_code == 200
+    assert response.json()["total_dark_patterns_detected"] == 1
+    assert inference_pool.admitted == 1
+    assert inference_pool.in_flight == 0
+
+
+def test_url_scan_is_rejected_when_the_inference_pool_is_full(api, fake_service, inference_pool, stub_server):
+    stub_server.routes["/page"] = (200, {}, PAGE)
+    inference_pool.in_flight = 1
+    response = api.post("/detect-from-url", json={"url": stub_server.url("/page")})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert fake_service.chunk_calls == []
+
+
+def test_stream_reports_a_rejected_batch(api, fake_service, inference_pool, stub_server):
+    stub_server.routes["/page"] = (200, {}, PAGE)
+    inference_pool.in_flight = 1
+    response = api.post("/detect-from-url/stream", json={"url": stub_server.url("/page")})
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["type"] for event in events] == ["page", "error"]
+    assert fake_service.chunk_calls == []
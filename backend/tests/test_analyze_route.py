@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from routes import analyze_route
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def test_json_batch_scores_each_item_in_order(api):
+    items = [
+        {"id": 1, "text": "Hurry, only 2 left"},
+        {"id": 2, "text": "  "},
+        {"id": 3},
+        "not an object",
+        {"id": 4, "text": "Free shipping"},
+    ]
+    body = api.post("/analyze-batch", json=items).json()
+
+    assert [(result["id"], result["status"]) for result in body["results"]] == [
+        (1, "ok"), (2, "error"), (3, "error"), (None, "error"), (4, "ok"),
+    ]
+    assert body["results"][0]["prediction"] == 1
+    assert body["results"][1]["message"] == "Text cannot be empty"
+    assert body["results"][2]["message"] == "Item must have a string text field"
+    assert (body["total_items"], body["items_failed"], body["total_contents_scanned"]) == (5, 3, 2)
+    assert (body["total_dark_patterns_detected"], body["dark_ratio"], body["risk_level"]) == (1, 50.0, "Medium")
+
+
+def test_items_may_be_wrapped_in_an_object(api):
+    body = api.post("/analyze-batch", json={"items": [{"id": "a", "text": "Hurry"}]}).json()
+    assert body["results"] == [{"id": "a", "status": "ok", "prediction": 1, "confidence": 0.9}]
+
+
+def test_ndjson_batch_skips_blank_lines(api):
+    lines = [json.dumps({"id": 1, "text": "Hurry"}), "", "   ", json.dumps({"id": 2, "text": "Calm"}), "42"]
+    response = api.post("/analyze-batch", content="\n".join(lines) + "\n", headers=NDJSON)
+
+    assert [(result["id"], result["status"]) for result in response.json()["results"]] == [
+        (1, "ok"), (2, "ok"), (None, "error"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "content, headers, message",
+    [
+        ('{"id": 1, "text": "Hurry"}\n{"id": 2, "text": \n', NDJSON, "Invalid JSON payload"),
+        (b'{"id": 1, "text": "\xff"}\n', NDJSON, "Invalid JSON payload"),
+        ('[{"id": 1, "text": "Hurry"}', {"Content-Type": "application/json"}, "Invalid JSON payload"),
+        ('{"text": "Hurry"}', {"Content-Type": "application/json"}, "Expected a JSON array of {id, text} items"),
+        ("[]", {"Content-Type": "application/json"}, "Batch cannot be empty"),
+        ("\n\n", NDJSON, "Batch cannot be empty"),
+    ],
+)
+def test_malformed_batches_are_rejected(api, content, headers, message):
+    response = api.post("/analyze-batch", content=content, headers=headers)
+    assert response.status_code == 400
+    assert response.json() == {"status": "error", "message": message}
+
+
+def test_item_count_is_limited(api, monkeypatch):
+    monkeypatch.setattr(analyze_route, "ANALYZE_BATCH_MAX_ITEMS", 2)
+    response = api.post("/analyze-batch", json=[{"text": "a"}] * 3)
+    assert response.status_code == 400
+    assert response.json()["message"] == "Too many items (max 2)"
+
+
+def test_declared_oversized_body_is_rejected(api, monkeypatch):
+    monkeypatch.setattr(analyze_route, "ANALYZE_BATCH_MAX_BYTES", 100)
+    response = api.post("/analyze-batch", json=[{"text": "x" * 200}])
+    assert response.status_code == 413
+    assert response.json()["message"] == "Request body exceeds 100 bytes"
+
+
+def test_streamed_body_is_cut_off_at_the_limit(api, monkeypatch):
+    monkeypatch.setattr(analyze_route, "ANALYZE_BATCH_MAX_BYTES", 100)
+    # A generator body is sent chunked, without a Content-Length to check up front.
+    blocks = iter([b'[{"text": "' + b"x" * 60, b"x" * 60 + b'"}]'])
+    response = api.post("/analyze-batch", content=blocks, headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+
+
+def test_body_at_the_limit_is_accepted(api, monkeypatch):
+    content = json.dumps([{"text": "Hurry"}]).encode()
+    monkeypatch.setattr(analyze_route, "ANALYZE_BATCH_MAX_BYTES", len(content))
+    response = api.post("/analyze-batch", content=content, headers={"Content-Type": "application/json"})
+    assert response.status_code == 200
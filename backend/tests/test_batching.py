@@ -0,0 +1,118 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline.batching import MicroBatcher
+
+
+class RecordingService:
+    scoring_mode = "sklearn"
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.direct = []
+        self.fail = fail
+
+    def predict(self, text):
+        self.direct.append(text)
+        return {"text": text}
+
+    def predict_many(self, texts):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise ValueError("model exploded")
+        return [{"text": text} for text in texts]
+
+
+@pytest.fixture
+def service():
+    return RecordingService()
+
+
+def _predict_concurrently(batcher, texts):
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        return list(executor.map(batcher.predict, texts))
+
+
+def test_concurrent_requests_are_coalesced(service):
+    batcher = MicroBatcher(service, max_batch_items=8, max_wait=1.0)
+    batcher.start()
+    try:
+        texts = [f"text {index}" for index in range(8)]
+        started = time.monotonic()
+        results = _predict_concurrently(batcher, texts)
+    finally:
+        batcher.close()
+
+    assert results == [{"text": text} for text in texts]
+    assert len(service.batches) == 1
+    assert sorted(service.batches[0]) == texts
+    # A full batch is dispatched without waiting out max_wait.
+    assert time.monotonic() - started < 1.0
+    assert service.direct == []
+
+
+def test_partial_batch_is_flushed_after_max_wait(service):
+    batcher = MicroBatcher(service, max_batch_items=64, max_wait=0.05)
+    batcher.start()
+    try:
+        started = time.monotonic()
+        assert batcher.predict("alone") == {"text": "alone"}
+        elapsed = time.monotonic() - started
+    finally:
+        batcher.close()
+
+    assert service.batches == [["alone"]]
+    assert 0.04 <= elapsed < 1.0
+    assert batcher.batch_sizes.snapshot()["count"] == 1
+
+
+def test_batch_errors_reach_every_caller_and_the_batcher_keeps_running():
+    service = RecordingService(fail=True)
+    batcher = MicroBatcher(service, max_batch_items=4, max_wait=1.0)
+    batcher.start()
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(batcher.predict, f"text {index}") for index in range(4)]
+            for future in futures:
+                with pytest.raises(ValueError, match="model exploded"):
+                    future.result()
+
+        service.fail = False
+        assert batcher.running
+        assert _predict_concurrently(batcher, ["a", "b", "c", "d"]) == [{"text": text} for text in "abcd"]
+    finally:
+        batcher.close()
+
+
+def test_one_item_batches_call_the_service_directly(service):
+    batcher = MicroBatcher(service, max_batch_items=1)
+    batcher.start()
+    assert not batcher.running
+    assert batcher.predict("text") == {"text": "text"}
+    assert service.direct == ["text"]
+    assert service.batches == []
+
+
+def test_requests_after_close_are_served_directly(service):
+    batcher = MicroBatcher(service, max_batch_items=8, max_wait=0.01)
+    batcher.start()
+    batcher.close()
+    assert not batcher.running
+    assert batcher.predict("late") == {"text": "late"}
+    assert service.direct == ["late"]
+
+
+def test_batching_defaults_follow_the_scoring_mode(service, monkeypatch):
+    monkeypatch.delenv("INFERENCE_BATCH_MAX_ITEMS", raising=False)
+    assert MicroBatcher.from_env(service).max_batch_items == 64
+    service.scoring_mode = "compiled"
+    assert MicroBatcher.from_env(service).max_batch_items == 1
+    monkeypatch.setenv("INFERENCE_BATCH_MAX_ITEMS", "16")
+    assert MicroBatcher.from_env(service).max_batch_items == 16
+
+
+def test_other_attributes_are_delegated(service):
+    assert MicroBatcher(service).scoring_mode == "sklearn"
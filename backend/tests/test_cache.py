@@ -0,0 +1,113 @@
+import sqlite3
+
+import pytest
+
+from pipeline import cache as cache_module
+from pipeline.cache import SQLiteVerdictStore, VerdictCache, verdict_key
+
+FINGERPRINT = "a" * 64
+ENTRY_BYTES = VerdictCache._entry_size(verdict_key(FINGERPRINT, "x"))
+
+
+def _key(text: str, fingerprint: str = FINGERPRINT) -> bytes:
+    return verdict_key(fingerprint, text)
+
+
+def test_keys_ignore_whitespace_differences():
+    assert _key("Only 2 left  in\nstock") == _key("  Only 2 left in stock ")
+    assert _key("Only 2 left") != _key("Only 3 left")
+    assert _key("Only 2 left") != _key("only 2 left")
+
+
+def test_keys_depend_on_the_model_fingerprint():
+    assert _key("Only 2 left") != _key("Only 2 left", "b" * 64)
+
+
+def test_hits_and_misses_are_counted():
+    cache = VerdictCache(max_bytes=10 * ENTRY_BYTES)
+    cache.set_many({_key("a"): (1, 0.9), _key("b"): None})
+
+    found = cache.get_many([_key("a"), _key("b"), _key("c"), _key("a")])
+    assert found == {_key("a"): (1, 0.9), _key("b"): None}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_least_recently_used_entry_is_evicted_past_the_byte_budget():
+    cache = VerdictCache(max_bytes=3 * ENTRY_BYTES)
+    cache.set_many({_key("a"): (1, 0.9), _key("b"): (0, 0.8), _key("c"): (0, 0.7)})
+    # Reading "a" makes "b" the least recently used.
+    cache.get_many([_key("a")])
+    cache.set_many({_key("d"): (1, 0.6)})
+
+    assert set(cache.get_many([_key(text) for text in "abcd"])) == {_key("a"), _key("c"), _key("d")}
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 3
+    assert stats["bytes"] == 3 * ENTRY_BYTES
+
+
+def test_updating_an_entry_does_not_grow_the_cache():
+    cache = VerdictCache(max_bytes=3 * ENTRY_BYTES)
+    for confidence in (0.1, 0.2, 0.3):
+        cache.set_many({_key("a"): (1, confidence)})
+    assert cache.stats()["bytes"] == ENTRY_BYTES
+    assert cache.get_many([_key("a")]) == {_key("a"): (1, 0.3)}
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "verdicts.db")
+
+
+def test_store_is_read_through_and_remembered(store_path):
+    writer = VerdictCache(max_bytes=10 * ENTRY_BYTES, store=SQLiteVerdictStore(store_path))
+    writer.set_many({_key("a"): (1, 0.9), _key("empty"): None})
+
+    store = SQLiteVerdictStore(store_path)
+    reader = VerdictCache(max_bytes=10 * ENTRY_BYTES, store=store)
+    assert reader.get_many([_key("a"), _key("empty"), _key("b")]) == {_key("a"): (1, 0.9), _key("empty"): None}
+    assert reader.stats()["entries"] == 2
+
+    # Served from memory from now on.
+    def unexpected_read(keys):
+        raise AssertionError("read the store again")
+
+    store.get_many = unexpected_read
+    assert reader.get_many([_key("a")]) == {_key("a"): (1, 0.9)}
+
+
+def test_store_keeps_model_fingerprints_apart(store_path):
+    cache = VerdictCache(max_bytes=10 * ENTRY_BYTES, store=SQLiteVerdictStore(store_path))
+    cache.set_many({_key("a"): (1, 0.9)})
+
+    other = VerdictCache(max_bytes=10 * ENTRY_BYTES, store=SQLiteVerdictStore(store_path))
+    assert other.get_many([_key("a", "b" * 64)]) == {}
+
+
+def test_store_trims_to_its_newest_entries(store_path, monkeypatch):
+    store = SQLiteVerdictStore(store_path, max_entries=100)
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+
+    store.set_many({_key(f"old {index}"): (0, 0.5) for index in range(9_900)})
+    now[0] += 60
+    # The 10,000th write triggers the trim.
+    store.set_many({_key(f"new {index}"): (1, 0.5) for index in range(100)})
+
+    rows = sqlite3.connect(store_path).execute("SELECT count(*), min(stored_at) FROM verdicts").fetchone()
+    assert rows == (100, 1060.0)
+
+
+def test_store_errors_count_as_misses(store_path, caplog):
+    store = SQLiteVerdictStore(store_path)
+    cache = VerdictCache(max_bytes=10 * ENTRY_BYTES, store=store)
+
+    def broken(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    store.get_many = store.set_many = broken
+    cache.set_many({_key("a"): (1, 0.9)})
+    assert cache.get_many([_key("b")]) == {}
+    assert cache.stats()["misses"] == 1
+    assert "Verdict store" in caplog.text
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from pipeline.admission import AdmissionController, AdmissionPool
+from routes import crawl_route
+from webscraper.crawler import HostRateLimiter
+
+
+def _page(text, *links):
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return f"<html><body><p>{text}</p>{anchors}</body></html>".encode()
+
+
+SITE = {
+    "/": _page("Hurry, only 2 left in stock", "/a", "/b"),
+    "/a": _page("Free shipping on all orders", "/a/deep"),
+    "/b": _page("Hurry, sale ends tonight", "/b/deep", "/missing"),
+    "/a/deep": _page("Returns accepted within 30 days", "/deeper"),
+    "/b/deep": _page("Contact us for details"),
+    "/deeper": _page("Hurry, last chance"),
+}
+
+
+@pytest.fixture
+def site(stub_server, monkeypatch):
+    monkeypatch.setattr(crawl_route, "_host_rate_limiter", HostRateLimiter(0.0))
+    for path, body in SITE.items():
+        stub_server.routes[path] = (200, {}, body)
+    return stub_server
+
+
+def _crawl(api, site, **payload):
+    response = api.post("/crawl", json={"url": site.url("/"), **payload})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def _fetched(site):
+    return [path for path, _ in site.requests if path != "/robots.txt"]
+
+
+def test_crawl_streams_one_event_per_page_then_a_summary(api, site):
+    events = _crawl(api, site, max_depth=2)
+
+    pages = events[:-1]
+    assert all(event["type"] == "page" for event in pages)
+    assert [(event["url"], event["depth"], event["status"]) for event in pages] == [
+        (site.url("/"), 0, "ok"),
+        (site.url("/a"), 1, "ok"),
+        (site.url("/b"), 1, "ok"),
+        (site.url("/a/deep"), 2, "ok"),
+        (site.url("/b/deep"), 2, "ok"),
+        (site.url("/missing"), 2, "error"),
+    ]
+    assert pages[0]["detected_texts"] == [{"text": "Hurry, only 2 left in stock", "confidence": 0.9}]
+    assert events[-1] == {
+        "type": "summary",
+        "pages_scanned": 5,
+        "pages_failed": 1,
+        "total_contents_scanned": 5,
+        "total_dark_patterns_detected": 2,
+        "dark_ratio": 40.0,
+        "risk_level": "Medium",
+    }
+    assert "/deeper" not in _fetched(site)
+
+
+def test_crawl_stops_at_max_depth(api, site):
+    events = _crawl(api, site, max_depth=1)
+    assert [event["depth"] for event in events[:-1]] == [0, 1, 1]
+    assert sorted(_fetched(site)) == ["/", "/a", "/b"]
+
+    site.requests.clear()
+    events = _crawl(api, site, max_depth=0)
+    assert [event["url"] for event in events[:-1]] == [site.url("/")]
+    assert _fetched(site) == ["/"]
+
+
+def test_crawl_stops_at_max_pages(api, site):
+    events = _crawl(api, site, max_pages=2, max_depth=5)
+    assert [event["url"] for event in events[:-1]] == [site.url("/"), site.url("/a")]
+    assert events[-1]["pages_scanned"] == 2
+    assert _fetched(site) == ["/", "/a"]
+
+
+def test_requested_limits_are_capped_by_the_server(api, site, monkeypatch):
+    monkeypatch.setattr(crawl_route, "CRAWL_MAX_PAGES", 3)
+    monkeypatch.setattr(crawl_route, "CRAWL_MAX_DEPTH", 1)
+    events = _crawl(api, site, max_pages=100, max_depth=10)
+    assert [event["depth"] for event in events[:-1]] == [0, 1, 1]
+
+    site.requests.clear()
+    events = _crawl(api, site, max_depth=10)
+    assert max(event["depth"] for event in events[:-1]) == 1
+
+
+def test_crawl_stops_when_inference_is_rejected(api, fake_service, site):
+    pool = AdmissionPool("inference", concurrency=1, max_queue=0, max_wait=1.0)
+    pool.in_flight = 1
+    previous = api.app.state.admission
+    api.app.state.admission = AdmissionController(fetch=None, inference=pool)
+    try:
+        events = _crawl(api, site, max_depth=2)
+    finally:
+        api.app.state.admission = previous
+
+    assert [(event["type"], event.get("status")) for event in events] == [("page", "error"), ("summary", None)]
+    assert events[-1]["pages_failed"] == 1
+    assert _fetched(site) == ["/"]
+    assert fake_service.chunk_calls == []
+
+
+def test_invalid_seed_is_rejected_before_streaming(api):
+    response = api.post("/crawl", json={"url": "ftp://example.com/"})
+    assert response.status_code == 400
+    assert response.json()["message"] == "Invalid URL. Use http:// or https://"
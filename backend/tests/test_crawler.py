@@ -0,0 +1,166 @@
+import time
+
+import pytest
+
+from webscraper import crawler as crawler_module
+from webscraper.crawler import ROBOTS_MAX_BYTES, BloomFilter, HostRateLimiter, SiteCrawler, canonicalize_url
+from webscraper.scraper import WebScraper
+from webscraper.session import build_session
+
+PAGE = b"<html><body><p>Hurry, only 2 left in stock</p></body></html>"
+
+
+class RecordingLimiter(HostRateLimiter):
+    def __init__(self):
+        super().__init__(0.0)
+        self.waits = []
+
+    def wait(self, host, min_interval=None):
+        self.waits.append((host, min_interval))
+        super().wait(host, min_interval)
+
+
+def _crawler(**kwargs) -> SiteCrawler:
+    kwargs.setdefault("min_interval", 0.0)
+    return SiteCrawler(WebScraper(timeout=5, session=build_session()), **kwargs)
+
+
+def _robots(body: bytes, content_type: str = "text/plain"):
+    return (200, {"Content-Type": content_type}, body)
+
+
+@pytest.mark.parametrize(
+    "url, base, expected",
+    [
+        ("HTTP://Example.COM:80/a/./b/../c?utm_source=x&b=2&a=1#top", None, "http://example.com/a/c?a=1&b=2"),
+        ("https://example.com:8443/", None, "https://example.com:8443/"),
+        ("https://example.com", None, "https://example.com/"),
+        ("../next/?fbclid=1", "https://example.com/shop/item/", "https://example.com/shop/next/"),
+        ("//cdn.example.com/x", "https://example.com/", "https://cdn.example.com/x"),
+        ("mailto:sales@example.com", "https://example.com/", None),
+        ("javascript:void(0)", "https://example.com/", None),
+        ("http://example.com:99999/", None, None),
+    ],
+)
+def test_canonicalize_url(url, base, expected):
+    assert canonicalize_url(url, base=base) == expected
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    seen = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"https://example.com/page/{index}" for index in range(1000)]
+    # Filling to capacity, a new item is taken as seen about error_rate of the time.
+    assert sum(seen.add(item) for item in items) < 30
+    assert all(seen.add(item) for item in items)
+    assert all(item in seen for item in items)
+
+    false_positives = sum(f"https://example.com/other/{index}" in seen for index in range(10_000))
+    assert false_positives < 300
+
+
+@pytest.mark.parametrize("status", [401, 403])
+def test_robots_behind_auth_disallows_everything(stub_server, status):
+    stub_server.routes["/robots.txt"] = (status, {}, b"")
+    stub_server.routes["/"] = (200, {}, PAGE)
+    pages = list(_crawler().crawl(stub_server.url("/")))
+
+    assert [page["error"] for page in pages] == ["Disallowed by robots.txt"]
+    assert [path for path, _ in stub_server.requests] == ["/robots.txt"]
+
+
+def test_missing_or_non_text_robots_allows_everything(stub_server):
+    stub_server.routes["/robots.txt"] = _robots(b"User-agent: *\nDisallow: /\n", "application/octet-stream")
+    stub_server.routes["/"] = (200, {}, PAGE)
+    pages = list(_crawler().crawl(stub_server.url("/")))
+    assert pages[0]["chunks"] == ["Hurry, only 2 left in stock"]
+
+    del stub_server.routes["/robots.txt"]
+    pages = list(_crawler().crawl(stub_server.url("/")))
+    assert "chunks" in pages[0]
+
+
+def test_robots_past_the_size_cap_is_ignored(stub_server):
+    head = b"User-agent: *\nDisallow: /early\n"
+    # The next rule starts 12 bytes before the cap, so a cut at the cap
+    # would leave "Disallow: /c" and block every path starting with /c.
+    filler = b"#" * (ROBOTS_MAX_BYTES - 12 - len(head) - 1) + b"\n"
+    body = head + filler + b"Disallow: /cut\nDisallow: /late\n"
+    stub_server.routes["/robots.txt"] = _robots(body)
+
+    robots = _crawler()._robots(stub_server.url("").rstrip("/"))
+    agent = "*"
+    assert not robots.can_fetch(agent, stub_server.url("/early"))
+    assert robots.can_fetch(agent, stub_server.url("/cat"))
+    assert robots.can_fetch(agent, stub_server.url("/late"))
+
+
+def test_excessive_crawl_delay_stops_the_crawl(stub_server):
+    stub_server.routes["/robots.txt"] = _robots(b"User-agent: *\nCrawl-delay: 86400\n")
+    stub_server.routes["/"] = (200, {}, PAGE)
+    pages = list(_crawler(max_crawl_delay=30.0).crawl(stub_server.url("/")))
+
+    assert pages == [{"url": stub_server.url("/"), "depth": 0, "error": "robots.txt Crawl-delay exceeds 30s"}]
+    assert [path for path, _ in stub_server.requests] == ["/robots.txt"]
+
+
+def test_crawl_delay_within_the_cap_is_passed_to_the_limiter(stub_server):
+    stub_server.routes["/robots.txt"] = _robots(b"User-agent: *\nCrawl-delay: 2\n")
+    stub_server.routes["/"] = (200, {}, PAGE)
+    limiter = RecordingLimiter()
+    list(_crawler(rate_limiter=limiter).crawl(stub_server.url("/")))
+    assert limiter.waits == [(f"127.0.0.1:{stub_server.port}", 2.0)]
+
+
+def test_in_scope_redirect_is_followed_with_rate_limiting(stub_server):
+    stub_server.routes["/"] = (302, {"Location": "/landing"}, b"")
+    stub_server.routes["/landing"] = (200, {}, b'<p>Hurry, only 2 left in stock</p><a href="next">n</a>')
+    stub_server.routes["/next"] = (200, {}, PAGE)
+    limiter = RecordingLimiter()
+    pages = list(_crawler(rate_limiter=limiter).crawl(stub_server.url("/")))
+
+    assert [page["url"] for page in pages] == [stub_server.url("/"), stub_server.url("/next")]
+    assert all("chunks" in page for page in pages)
+    # The redirect hop waits like a page does: seed, redirect target, then /next.
+    assert len(limiter.waits) == 3
+
+
+def test_off_site_redirect_is_not_followed(stub_server):
+    stub_server.routes["/"] = (302, {"Location": stub_server.url("/elsewhere", host="localhost")}, b"")
+    pages = list(_crawler().crawl(stub_server.url("/")))
+
+    assert pages[0]["error"] == "Redirected off-site or to a URL disallowed by robots.txt"
+    assert "/elsewhere" not in [path for path, _ in stub_server.requests]
+
+
+def test_redirect_to_a_disallowed_path_is_not_followed(stub_server):
+    stub_server.routes["/robots.txt"] = _robots(b"User-agent: *\nDisallow: /private\n")
+    stub_server.routes["/"] = (302, {"Location": "/private/page"}, b"")
+    pages = list(_crawler().crawl(stub_server.url("/")))
+
+    assert pages[0]["error"] == "Redirected off-site or to a URL disallowed by robots.txt"
+    assert "/private/page" not in [path for path, _ in stub_server.requests]
+
+
+def test_redirect_loop_gives_up(stub_server):
+    stub_server.routes["/loop"] = (302, {"Location": "/loop"}, b"")
+    pages = list(_crawler().crawl(stub_server.url("/loop")))
+
+    assert pages[0]["error"] == "Too many redirects"
+    assert sum(path == "/loop" for path, _ in stub_server.requests) == crawler_module.MAX_REDIRECTS + 1
+
+
+def test_crawls_sharing_a_limiter_are_spaced_out_together(stub_server):
+    stub_server.routes["/"] = (200, {}, PAGE)
+    limiter = HostRateLimiter(0.2)
+    started = time.monotonic()
+    for _ in range(2):
+        list(_crawler(rate_limiter=limiter, respect_robots=False).crawl(stub_server.url("/")))
+    assert time.monotonic() - started >= 0.2
+
+
+def test_rate_limiter_forgets_idle_hosts(monkeypatch):
+    monkeypatch.setattr(crawler_module, "RATE_LIMITER_MAX_HOSTS", 10)
+    limiter = HostRateLimiter(0.0)
+    for index in range(25):
+        limiter.wait(f"host-{index}")
+    assert len(limiter._next_slot) <= 10
@@ -0,0 +1,89 @@
+import pytest
+from scipy.sparse import csr_matrix
+
+from conftest import MODEL_DIR
+from pipeline.explain import top_contributions
+from pipeline.inference import InferenceService
+from pipeline.lexicon import Lexicon
+from pipeline.preprocess import preprocess_many
+from pipeline.scoring import CompiledLinearScorer
+
+
+def test_top_contributions_keeps_the_largest_positive_entries_per_row():
+    matrix = csr_matrix([[0.5, -1.0, 2.0, 0.1], [0.0, 0.0, 0.0, 0.0], [-0.2, 0.3, 0.0, 0.0], [0.4, 0.0, 0.0, 0.4]])
+    terms = ["only", "free", "hurry", "left"]
+
+    assert top_contributions(matrix, terms, 2) == [
+        [{"token": "hurry", "weight": 2.0}, {"token": "only", "weight": 0.5}],
+        [],
+        [{"token": "free", "weight": 0.3}],
+        [{"token": "only", "weight": 0.4}, {"token": "left", "weight": 0.4}],
+    ]
+
+
+def test_top_contributions_breaks_ties_by_column():
+    # The same row with its entries stored in the opposite order.
+    forward = csr_matrix(([0.4, 0.4], [0, 3], [0, 2]), shape=(1, 4))
+    backward = csr_matrix(([0.4, 0.4], [3, 0], [0, 2]), shape=(1, 4))
+    terms = ["only", "free", "hurry", "left"]
+    assert top_contributions(forward, terms, 1) == top_contributions(backward, terms, 1) == [
+        [{"token": "only", "weight": 0.4}]
+    ]
+
+
+@pytest.fixture(scope="module")
+def processed_texts(dataset_strings):
+    return preprocess_many(dataset_strings[:500], lexicon=Lexicon.load(MODEL_DIR / "lexicon.json"))
+
+
+def test_contributions_sum_to_the_decision_minus_intercept(model_pickles, processed_texts):
+    vectorizer, model = model_pickles
+    scorer = CompiledLinearScorer(vectorizer, model)
+    sums = scorer.contributions(processed_texts).sum(axis=1).A1
+    decisions = model.decision_function(vectorizer.transform(processed_texts))
+    intercept = float(model.intercept_[0])
+    for text, total, decision in zip(processed_texts, sums, decisions):
+        assert total == pytest.approx(decision - intercept, abs=1e-9), text
+        assert scorer.decision(text) - intercept == pytest.approx(total, abs=1e-9), text
+
+
+def _ranks(explanation):
+    # Tokens grouped by weight, since the modes' float rounding can order tied tokens differently.
+    groups = {}
+    for entry in explanation:
+        groups.setdefault(round(entry["weight"], 9), set()).add(entry["token"])
+    return sorted(groups.items(), reverse=True)
+
+
+def test_scoring_modes_explain_detections_alike(dataset_strings, monkeypatch):
+    monkeypatch.setenv("PREDICTION_CACHE_BYTES", "0")
+    monkeypatch.setenv("INFERENCE_BACKEND", "inline")
+    monkeypatch.setenv("NEAR_DUP_MODE", "off")
+    chunks = dataset_strings[:1000]
+    compiled = InferenceService(scoring_mode="compiled").predict_chunks(chunks, explain=5)
+    reference = InferenceService(scoring_mode="sklearn").predict_chunks(chunks, explain=5)
+
+    explained = [item for item in compiled if "explanation" in item]
+    assert explained
+    assert [item["index"] for item in explained] == [item["index"] for item in reference if "explanation" in item]
+    for fast, slow in zip(explained, (item for item in reference if "explanation" in item)):
+        fast_ranks, slow_ranks = _ranks(fast["explanation"]), _ranks(slow["explanation"])
+        assert [weight for weight, _ in fast_ranks] == [weight for weight, _ in slow_ranks]
+        # The lowest tie group may be cut at top_k, keeping different members.
+        assert fast_ranks[:-1] == slow_ranks[:-1]
+
+
+def test_explain_skips_non_detections_and_zero_k(monkeypatch):
+    monkeypatch.setenv("PREDICTION_CACHE_BYTES", "0")
+    monkeypatch.setenv("NEAR_DUP_MODE", "off")
+    service = InferenceService(scoring_mode="compiled", backend="inline")
+    predictions = [
+        {"text": "Hurry! Only 2 left in stock, order now", "prediction": 1, "confidence": 0.9},
+        {"text": "Read our shipping policy", "prediction": 0, "confidence": 0.9},
+    ]
+    service.explain(predictions, 0)
+    assert all("explanation" not in item for item in predictions)
+
+    service.explain(predictions, 3)
+    assert 0 < len(predictions[0]["explanation"]) <= 3
+    assert "explanation" not in predictions[1]
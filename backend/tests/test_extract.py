@@ -0,0 +1,133 @@
+import re
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from webscraper.extract import ChunkExtractor, extract_chunks
+
+FIXTURES = Path(__file__).resolve().parents[1] / "benchmarks" / "fixtures"
+PAGES = sorted(path.name for path in FIXTURES.glob("page_*.html"))
+
+
+def _normalize_chunk(text: str) -> str:
+    return " ".join(text.split()).strip()
+
+
+def _reference_chunks(html: str, max_chunks: int = 300) -> list:
+    """The BeautifulSoup-based extractor ChunkExtractor replaced, kept as the oracle."""
+    soup = BeautifulSoup(html, "lxml")
+    for node in soup(["script", "style"]):
+        node.decompose()
+
+    raw_chunks = []
+    for paragraph in soup.find_all("p"):
+        text = _normalize_chunk(paragraph.get_text(" ", strip=True))
+        if text:
+            raw_chunks.append(text)
+    for button in soup.find_all("button"):
+        text = _normalize_chunk(button.get_text(" ", strip=True))
+        if text:
+            raw_chunks.append(text)
+    for input_button in soup.find_all("input"):
+        input_type = (input_button.get("type") or "").strip().lower()
+        if input_type in {"button", "submit"}:
+            value = _normalize_chunk(input_button.get("value") or "")
+            if value:
+                raw_chunks.append(value)
+
+    if not raw_chunks:
+        text = _normalize_chunk(soup.get_text(" ", strip=True))
+        if text:
+            raw_chunks.extend(re.split(r"(?<=[.!?])\s+", text))
+
+    filtered_chunks = []
+    seen = set()
+    for chunk in raw_chunks:
+        cleaned = _normalize_chunk(chunk)
+        if len(cleaned) < 15 or len(cleaned.split()) < 3:
+            continue
+        if len(cleaned) > 1200:
+            cleaned = cleaned[:1200]
+        if cleaned in seen:
+            continue
+        seen.add(cleaned)
+        filtered_chunks.append(cleaned)
+    return filtered_chunks[:max_chunks]
+
+
+def _page(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def _streamed(html: str, piece_size: int, max_chunks: int = 300):
+    extractor = ChunkExtractor(max_chunks=max_chunks)
+    consumed = 0
+    for start in range(0, len(html), piece_size):
+        consumed = start + piece_size
+        if not extractor.feed(html[start:consumed]):
+            break
+    return extractor.close(), min(consumed, len(html))
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_fixture_pages_match_the_soup_extractor(name):
+    html = _page(name)
+    assert extract_chunks(html) == _reference_chunks(html)
+
+
+@pytest.mark.parametrize("name", PAGES)
+@pytest.mark.parametrize("max_chunks", [1, 5, 40])
+def test_chunk_cap_matches_the_soup_extractor(name, max_chunks):
+    html = _page(name)
+    assert extract_chunks(html, max_chunks=max_chunks) == _reference_chunks(html, max_chunks)
+
+
+@pytest.mark.parametrize("piece_size", [1000, 64 * 1024])
+def test_streamed_feeding_matches_a_single_feed(piece_size):
+    html = _page("page_medium.html")
+    chunks, _ = _streamed(html, piece_size)
+    assert chunks == extract_chunks(html)
+
+
+def test_early_stop_at_300_paragraphs_keeps_the_result():
+    html = _page("page_large.html")
+    assert len(_reference_chunks(html)) == 300
+
+    chunks, consumed = _streamed(html, 4096)
+    assert chunks == _reference_chunks(html)
+    # Feeding stopped once 300 paragraph chunks were kept, well before the end.
+    assert consumed < len(html)
+
+
+def test_buttons_after_the_early_stop_point_are_not_needed():
+    paragraphs = "".join(f"<p>Paragraph number {index} has enough words</p>" for index in range(350))
+    html = f"<html><body>{paragraphs}<button>Buy now before it is gone</button></body></html>"
+    chunks, consumed = _streamed(html, 512)
+    assert chunks == _reference_chunks(html)
+    assert consumed < len(html)
+
+
+def test_fallback_splits_page_text_into_sentences():
+    html = _page("page_small.html")
+    stripped = re.sub(r"</?(p|button|input)\b[^>]*>", " ", html)
+    expected = _reference_chunks(stripped)
+    assert expected
+    assert extract_chunks(stripped) == expected
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        "\ufeff<p>Leading byte order mark is ignored</p>",
+        "<p>Ruby text <ruby>here<rt>not counted</rt></ruby> stays out</p>",
+        "<template><p>Template paragraph never shows</p></template><p>But this visible one does</p>",
+        "<button>Outer button <button>Nested button text</button> tail words</button>",
+        "<p>Unclosed paragraph one is fine<p>Unclosed paragraph two is fine",
+        "<input type='SUBMIT' value='Confirm your order now'><input type='text' value='Not a button value'>",
+        "<p>Comment <!-- hidden words here --> in between the words</p>",
+        "<div>No paragraphs at all. Just a sentence or two here! And another one follows?</div>",
+    ],
+)
+def test_edge_cases_match_the_soup_extractor(html):
+    assert extract_chunks(html) == _reference_chunks(html)
@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+from pipeline.near_duplicates import SIMHASH_BITS, NearDuplicateIndex, simhash_many
+
+FINGERPRINT = "a" * 64
+
+
+def _flip(signature: int, bits: int, rng: random.Random) -> int:
+    for position in rng.sample(range(SIMHASH_BITS), bits):
+        signature ^= 1 << position
+    return signature
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 3, 7, 15])
+def test_signatures_within_distance_share_a_band(max_distance):
+    index = NearDuplicateIndex(FINGERPRINT, max_distance=max_distance)
+    rng = random.Random(max_distance)
+    for _ in range(2000):
+        signature = rng.getrandbits(SIMHASH_BITS)
+        near = _flip(signature, rng.randint(0, max_distance), rng)
+        shared = [a == b for a, b in zip(index._band_values(signature), index._band_values(near))]
+        assert any(shared)
+
+
+def test_bands_cover_all_bits_once():
+    for max_distance in range(SIMHASH_BITS // 2):
+        index = NearDuplicateIndex(FINGERPRINT, max_distance=max_distance)
+        covered = 0
+        for shift, mask in index._bands:
+            assert covered & (mask << shift) == 0
+            covered |= mask << shift
+        assert covered == (1 << SIMHASH_BITS) - 1
+
+
+@pytest.mark.parametrize("max_distance", [1, 3, 7])
+def test_lookup_finds_every_signature_within_distance(max_distance):
+    index = NearDuplicateIndex(FINGERPRINT, max_distance=max_distance)
+    rng = random.Random(42)
+    stored = [rng.getrandbits(SIMHASH_BITS) for _ in range(500)]
+    index.add_many(stored, [(1, 0.9)] * len(stored))
+
+    near = [_flip(signature, max_distance, rng) for signature in stored]
+    far = [_flip(signature, max_distance + 1, rng) for signature in stored]
+    assert all(match is not None for match in index.match_many(near))
+    # Random stored signatures are far apart, so nothing else is in range either.
+    assert all(match is None for match in index.match_many(far))
+
+
+def test_digit_variants_share_a_signature():
+    first, second, other = simhash_many(["Only 2 left in stock", "Only 5 left in stock", "Free returns on all orders"])
+    assert first == second
+    assert first != other
+    assert simhash_many(["", "!!!"]) == [None, None]
+
+
+def test_eviction_drops_least_recently_matched():
+    # Pairwise 32 bits apart, far outside the distance.
+    first, second, third = 0, 0xFFFFFFFF00000000, 0x00000000FFFFFFFF
+    index = NearDuplicateIndex(FINGERPRINT, max_distance=2, max_entries=2)
+    index.add_many([first, second], [(0, 0.8), (1, 0.7)])
+    index.match_many([first])
+    index.add_many([third], [(1, 0.6)])
+    assert index.match_many([first, second, third]) == [(0, 0.8), None, (1, 0.6)]
+    assert all(second not in bucket for buckets in index._buckets for bucket in buckets.values())
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "index.bin"
+    signatures = [random.Random(7).getrandbits(SIMHASH_BITS) for _ in range(100)]
+    verdicts = [(position % 2, position / 100) for position in range(100)]
+    index = NearDuplicateIndex(FINGERPRINT, path=str(path), save_interval=0)
+    index.add_many(signatures, verdicts)
+    index.close()
+
+    reloaded = NearDuplicateIndex(FINGERPRINT, path=str(path), save_interval=0)
+    assert reloaded.stats()["entries"] == len(set(signatures))
+    assert reloaded.match_many(signatures) == [dict(zip(signatures, verdicts))[s] for s in signatures]
+
+
+def test_index_from_another_model_is_ignored(tmp_path):
+    path = tmp_path / "index.bin"
+    index = NearDuplicateIndex(FINGERPRINT, path=str(path), save_interval=0)
+    index.add_many([12345], [(1, 0.9)])
+    index.close()
+
+    other = NearDuplicateIndex("b" * 64, path=str(path), save_interval=0)
+    assert other.stats()["entries"] == 0
+
+
+def test_truncated_index_is_ignored(tmp_path):
+    path = tmp_path / "index.bin"
+    index = NearDuplicateIndex(FINGERPRINT, path=str(path), save_interval=0)
+    index.add_many([1, 2, 3], [(1, 0.9)] * 3)
+    index.close()
+    path.write_bytes(path.read_bytes()[:-5])
+
+    assert NearDuplicateIndex(FINGERPRINT, path=str(path), save_interval=0).stats()["entries"] == 0
+
+
+def test_new_entries_are_saved_in_the_background(tmp_path):
+    path = tmp_path / "index.bin"
+    index = NearDuplicateIndex(FINGERPRINT, path=str(path), save_interval=0.05)
+    try:
+        index.add_many([1, 2], [(1, 0.9), (0, 0.8)])
+        for _ in range(100):
+            if path.exists():
+                break
+            index._closed.wait(0.05)
+        # Loaded without close(): what a restart after a crash would see.
+        assert NearDuplicateIndex(FINGERPRINT, path=str(path), save_interval=0).stats()["entries"] == 2
+    finally:
+        index.close()
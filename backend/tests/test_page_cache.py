@@ -0,0 +1,147 @@
+import secrets
+import zlib
+
+import pytest
+import requests
+
+from webscraper.page_cache import PageCache
+from webscraper.scraper import WebScraper
+
+PAGE = b"<html><body><p>Only 2 left in stock, order now</p><p>Free shipping on all orders</p></body></html>"
+CHUNKS = ["Only 2 left in stock, order now", "Free shipping on all orders"]
+
+
+def _scraper(cache: PageCache) -> WebScraper:
+    # A private session, so other tests' pooled connections do not interfere.
+    return WebScraper(session=requests.Session(), page_cache=cache)
+
+
+def _validated_page(etag: str):
+    def reply(headers):
+        if headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag}, PAGE
+
+    return reply
+
+
+def test_revisit_sends_validators_and_serves_304_from_cache(stub_server, tmp_path):
+    stub_server.routes["/page"] = _validated_page('"v1"')
+    cache = PageCache(str(tmp_path / "pages.db"))
+    scraper = _scraper(cache)
+    url = stub_server.url("/page")
+
+    trace = {}
+    assert scraper.extract_chunks(url, trace=trace) == CHUNKS
+    assert trace["page_cache"] == "miss"
+    assert "If-None-Match" not in stub_server.requests[-1][1]
+
+    trace = {}
+    assert scraper.extract_chunks(url, trace=trace) == CHUNKS
+    assert trace["page_cache"] == "revalidated"
+    assert stub_server.requests[-1][1]["If-None-Match"] == '"v1"'
+    assert cache.stats() == {"hits": 0, "revalidations": 1, "misses": 1}
+
+
+def test_changed_validator_downloads_again(stub_server, tmp_path):
+    stub_server.routes["/page"] = _validated_page('"v1"')
+    cache = PageCache(str(tmp_path / "pages.db"))
+    scraper = _scraper(cache)
+    url = stub_server.url("/page")
+    scraper.extract_chunks(url)
+
+    stub_server.routes["/page"] = (200, {"ETag": '"v2"'}, b"<p>Prices changed for everyone today</p>")
+    assert scraper.extract_chunks(url) == ["Prices changed for everyone today"]
+    assert cache.get(url)["etag"] == '"v2"'
+
+
+def test_last_modified_is_sent_as_if_modified_since(stub_server, tmp_path):
+    stamp = "Wed, 21 Oct 2026 07:28:00 GMT"
+    stub_server.routes["/page"] = lambda headers: (
+        (304, {}, b"") if headers.get("If-Modified-Since") == stamp else (200, {"Last-Modified": stamp}, PAGE)
+    )
+    scraper = _scraper(PageCache(str(tmp_path / "pages.db")))
+    url = stub_server.url("/page")
+
+    assert scraper.fetch(url) == PAGE.decode()
+    assert scraper.fetch(url) == PAGE.decode()
+    assert stub_server.requests[-1][1]["If-Modified-Since"] == stamp
+
+
+def test_fresh_entry_is_served_without_a_request(stub_server, tmp_path):
+    stub_server.routes["/page"] = (200, {}, PAGE)
+    scraper = _scraper(PageCache(str(tmp_path / "pages.db"), max_age=60))
+    url = stub_server.url("/page")
+
+    scraper.extract_chunks(url)
+    trace = {}
+    assert scraper.extract_chunks(url, trace=trace) == CHUNKS
+    assert trace["page_cache"] == "hit"
+    assert len(stub_server.requests) == 1
+
+
+def test_entry_is_dropped_when_page_becomes_uncacheable(stub_server, tmp_path):
+    stub_server.routes["/page"] = _validated_page('"v1"')
+    cache = PageCache(str(tmp_path / "pages.db"))
+    scraper = _scraper(cache)
+    url = stub_server.url("/page")
+    scraper.extract_chunks(url)
+    assert cache.get(url) is not None
+
+    stub_server.routes["/page"] = (200, {"Cache-Control": "no-store"}, b"<p>Personal offer for you only today</p>")
+    assert scraper.extract_chunks(url) == ["Personal offer for you only today"]
+    assert cache.get(url) is None
+    assert cache.size() == 0
+
+
+def test_size_total_follows_writes_and_eviction(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.db"), max_bytes=10_000)
+    headers = {"ETag": '"x"'}
+    for index in range(20):
+        # Random text, so compression cannot shrink entries below the budget.
+        cache.put(f"https://example.com/{index}", headers, body=secrets.token_hex(2000), chunks=["a chunk"])
+    cache.update_chunks("https://example.com/19", ["a much longer chunk than before"], 300)
+    cache.put("https://example.com/19", headers, body="replaced", chunks=None)
+
+    connection = cache._connection()
+    actual = connection.execute("SELECT coalesce(sum(size), 0) FROM pages").fetchone()[0]
+    assert cache.size() == actual
+    assert actual <= cache.max_bytes
+    assert cache.get("https://example.com/0") is None
+    assert cache.get("https://example.com/19")["body"] == "replaced"
+
+
+def test_size_total_is_rebuilt_for_an_existing_database(tmp_path):
+    path = str(tmp_path / "pages.db")
+    cache = PageCache(path)
+    cache.put("https://example.com/", {"ETag": '"x"'}, body="hello", chunks=["hello"])
+    size = cache.size()
+    cache._connection().execute("DROP TABLE pages_size")
+
+    assert PageCache(path).size() == size
+
+
+@pytest.mark.parametrize(
+    "column, value",
+    [
+        ("body", b"not zlib data"),
+        ("body", zlib.compress(b"\xff\xfe invalid utf-8")),
+        ("chunks", "[not json"),
+    ],
+)
+def test_corrupt_entry_is_dropped_and_fetched_again(stub_server, tmp_path, column, value):
+    stub_server.routes["/page"] = (200, {"ETag": '"v1"'}, PAGE)
+    cache = PageCache(str(tmp_path / "pages.db"))
+    scraper = _scraper(cache)
+    url = stub_server.url("/page")
+    assert scraper.extract_chunks(url) == CHUNKS
+
+    with cache._connection() as connection:
+        connection.execute(f"UPDATE pages SET {column} = ? WHERE url = ?", (value, url))
+    assert cache.get(url) is None
+    assert cache._connection().execute("SELECT count(*) FROM pages").fetchone()[0] == 0
+
+    assert scraper.extract_chunks(url) == CHUNKS
+    # The entry was not revalidated, since its validators went with it.
+    assert "If-None-Match" not in stub_server.requests[-1][1]
+    assert cache.get(url)["chunks"] == CHUNKS
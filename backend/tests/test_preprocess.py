@@ -0,0 +1,87 @@
+import string
+
+import pytest
+
+from conftest import MODEL_DIR
+from pipeline import preprocess as preprocess_module
+from pipeline.lexicon import Lexicon
+from pipeline.preprocess import _lemmatizer, _nltk_stop_words, preprocess_many, preprocess_text
+
+# Unicode digits, superscripts and punctuation outside string.punctuation.
+EDGE_CASES = [
+    "Only ²3 left — order in 04:59!",
+    "Ends in ٣ days… café prices 50% off",
+    "ＦＲＥＥ shipping ①②③ today",
+    "Don't miss out!!! Limited-time offer",
+    "",
+    "   ",
+]
+
+
+def _reference_preprocess(text, lemmatize=True):
+    """The preprocessor before the single-pass rewrite, kept as the golden output."""
+    text = str(text).lower()
+    text = text.translate(str.maketrans("", "", string.punctuation))
+    text = "".join([char for char in text if not char.isdigit()])
+    stop_words = set(_nltk_stop_words())
+    text = " ".join([word for word in text.split() if word not in stop_words])
+    if lemmatize:
+        lemmatizer = _lemmatizer()
+        text = " ".join([lemmatizer.lemmatize(word) for word in text.split()])
+    return text
+
+
+@pytest.fixture(scope="module")
+def corpus(dataset_strings):
+    return dataset_strings + EDGE_CASES
+
+
+@pytest.fixture(scope="module")
+def golden(corpus):
+    return [_reference_preprocess(text) for text in corpus]
+
+
+def test_nltk_path_matches_golden_output(corpus, golden):
+    assert preprocess_many(corpus) == golden
+
+
+def test_nltk_path_without_lemmatizing_matches_golden_output(corpus):
+    expected = [_reference_preprocess(text, lemmatize=False) for text in corpus]
+    assert preprocess_many(corpus, lemmatize=False) == expected
+
+
+def test_single_text_matches_batch(corpus):
+    assert [preprocess_text(text) for text in corpus[:200]] == preprocess_many(corpus[:200])
+
+
+def test_lexicon_path_gives_the_same_features(corpus, golden, model_pickles):
+    # The lexicon only keeps rewrites that can reach the vocabulary, so the
+    # strings may differ in out-of-vocabulary tokens but never in features.
+    vectorizer, _ = model_pickles
+    lexicon = Lexicon.load(MODEL_DIR / "lexicon.json")
+    processed = preprocess_many(corpus, lexicon=lexicon)
+
+    difference = vectorizer.transform(processed) - vectorizer.transform(golden)
+    assert difference.count_nonzero() == 0
+
+
+def test_lexicon_stop_words_match_nltk():
+    lexicon = Lexicon.load(MODEL_DIR / "lexicon.json")
+    assert lexicon.stop_words == _nltk_stop_words()
+
+
+def test_lexicon_path_without_lemmatizing_matches_golden_output(corpus):
+    lexicon = Lexicon.load(MODEL_DIR / "lexicon.json")
+    expected = [_reference_preprocess(text, lemmatize=False) for text in corpus]
+    assert preprocess_many(corpus, lemmatize=False, lexicon=lexicon) == expected
+
+
+def test_strip_table_stays_bounded():
+    # Every code point, in chunks: the old table kept one entry per code point.
+    sweep = "".join(chr(codepoint) for codepoint in range(0x20, 0x30000) if not 0xD800 <= codepoint < 0xE000)
+    for start in range(0, len(sweep), 4096):
+        preprocess_text(sweep[start:start + 4096], lemmatize=False)
+    assert len(preprocess_module._strip_table) <= preprocess_module._STRIP_TABLE_SIZE
+    # Code points past the cap are still stripped.
+    stripped = preprocess_text("deal \U0001D7D8\U0001D7D9 ends", lemmatize=False)
+    assert stripped == preprocess_text("deal ends", lemmatize=False)
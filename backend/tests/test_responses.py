@@ -0,0 +1,102 @@
+import gzip
+import json
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+from pipeline import responses
+from pipeline.responses import dumps, json_response, negotiate_encoding
+
+CONTENT = {"text": "Nur noch 2 Stück – beeilen Sie sich", "confidence": 0.9, "items": list(range(400))}
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    # Stands in for the optional package; only the chosen coding matters here.
+    monkeypatch.setattr(responses, "brotli", SimpleNamespace(compress=lambda body, quality: b"br:" + body))
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+
+
+def _request(accept_encoding=None) -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("br, gzip", "br"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("*;q=0.5, gzip", "gzip"),
+        ("BR;q=0.8", "br"),
+        ("gzip;q=abc, br;q=0.1", "br"),
+    ],
+)
+def test_negotiate_encoding(with_brotli, header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.mark.parametrize("header, expected", [("br", None), ("br, gzip", "gzip"), ("*", "gzip")])
+def test_negotiate_encoding_without_brotli(without_brotli, header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.mark.parametrize("orjson_installed", [True, False])
+def test_dumps_is_compact_utf8_either_way(monkeypatch, orjson_installed):
+    if not orjson_installed:
+        monkeypatch.setattr(responses, "orjson", None)
+    body = dumps(CONTENT)
+    assert json.loads(body) == CONTENT
+    assert "Stück".encode() in body
+    assert b", " not in body and b": " not in body
+
+
+def test_small_bodies_are_not_compressed(without_brotli):
+    response = json_response({"ok": True}, _request("gzip"))
+    assert response.body == b'{"ok":true}'
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.media_type == "application/json"
+
+
+def test_large_bodies_are_gzipped_when_accepted(without_brotli):
+    response = json_response(CONTENT, _request("gzip"), status_code=207)
+    assert response.status_code == 207
+    assert response.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.body)) == CONTENT
+    assert int(response.headers["content-length"]) == len(response.body)
+
+
+def test_large_bodies_prefer_brotli_when_installed(with_brotli):
+    response = json_response(CONTENT, _request("gzip, br"))
+    assert response.headers["content-encoding"] == "br"
+    assert response.body == b"br:" + dumps(CONTENT)
+
+
+def test_clients_without_accept_encoding_get_identity(without_brotli):
+    response = json_response(CONTENT, _request())
+    assert "content-encoding" not in response.headers
+    assert json.loads(response.body) == CONTENT
+
+
+def test_compression_can_be_disabled(without_brotli, monkeypatch):
+    monkeypatch.setattr(responses, "RESPONSE_COMPRESSION_MIN_BYTES", 0)
+    assert "content-encoding" not in json_response(CONTENT, _request("gzip")).headers
+
+
+def test_routes_answer_compressed_json(api):
+    items = [{"id": index, "text": "Hurry, only 2 left in stock"} for index in range(100)]
+    response = api.post("/analyze-batch", json=items, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    # The client decodes it transparently.
+    assert response.json()["total_items"] == 100
@@ -0,0 +1,115 @@
+import pytest
+
+from pipeline.scan_index import ScanIndex
+
+URL = "https://shop.example.com/product"
+FINGERPRINT = "a" * 64
+PAGE = [
+    "Hurry, only 2 left in stock",
+    "Free shipping on orders over 50 dollars",
+    "Hurry, this deal ends tonight",
+    "Read our return policy before ordering",
+]
+
+
+class FakeModel:
+    """Flags chunks mentioning "hurry", in predict_chunks format, and records what it scored."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_chunks(self, chunks):
+        self.calls.append(list(chunks))
+        return [
+            {
+                "index": position,
+                "text": chunk,
+                "prediction": int("hurry" in chunk.lower()),
+                "confidence": 0.9 if "hurry" in chunk.lower() else 0.8,
+            }
+            for position, chunk in enumerate(chunks)
+            if chunk.strip()
+        ]
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ScanIndex(str(tmp_path / "scans.db"))
+
+
+@pytest.fixture
+def model():
+    return FakeModel()
+
+
+def test_first_scan_scores_everything_and_reports_all_detections(index, model):
+    predictions, diff = index.scan(URL, FINGERPRINT, PAGE, model.predict_chunks)
+
+    assert predictions == model.predict_chunks(PAGE)
+    assert diff["previous_scan_at"] is None
+    assert diff["chunks_scored"] == len(PAGE)
+    assert diff["chunks_reused"] == 0
+    assert [item["text"] for item in diff["new_detections"]] == [PAGE[0], PAGE[2]]
+    assert diff["removed_detections"] == []
+
+
+def test_unchanged_rescan_scores_nothing(index, model):
+    first, _ = index.scan(URL, FINGERPRINT, PAGE, model.predict_chunks)
+    predictions, diff = index.scan(URL, FINGERPRINT, PAGE, model.predict_chunks)
+
+    assert predictions == first
+    assert len(model.calls) == 1
+    assert diff["previous_scan_at"] is not None
+    assert diff["chunks_scored"] == 0
+    assert diff["chunks_reused"] == len(PAGE)
+    assert diff["new_detections"] == diff["removed_detections"] == []
+
+
+def test_rescan_with_one_changed_chunk_scores_only_that_chunk(index, model):
+    index.scan(URL, FINGERPRINT, PAGE, model.predict_chunks)
+    changed = PAGE[:3] + ["Hurry, prices go up at midnight"]
+    predictions, diff = index.scan(URL, FINGERPRINT, changed, model.predict_chunks)
+
+    assert model.calls[-1] == ["Hurry, prices go up at midnight"]
+    assert diff["chunks_scored"] == 1
+    assert diff["chunks_reused"] == 3
+    assert [item["text"] for item in diff["new_detections"]] == ["Hurry, prices go up at midnight"]
+    assert diff["removed_detections"] == []
+    # Reused verdicts keep their positions in the new page.
+    assert predictions == FakeModel().predict_chunks(changed)
+
+
+def test_removed_detections_are_reported(index, model):
+    index.scan(URL, FINGERPRINT, PAGE, model.predict_chunks)
+    _, diff = index.scan(URL, FINGERPRINT, [PAGE[1], PAGE[2], PAGE[3]], model.predict_chunks)
+
+    assert diff["chunks_scored"] == 0
+    assert diff["new_detections"] == []
+    assert diff["removed_detections"] == [{"text": PAGE[0], "confidence": 0.9}]
+
+
+def test_model_change_rescores_everything(index, model):
+    index.scan(URL, FINGERPRINT, PAGE, model.predict_chunks)
+    _, diff = index.scan(URL, "b" * 64, PAGE, model.predict_chunks)
+
+    assert model.calls[-1] == PAGE
+    assert diff["previous_scan_at"] is None
+    assert diff["chunks_scored"] == len(PAGE)
+    assert len(diff["new_detections"]) == 2
+
+
+def test_chunks_without_a_verdict_are_remembered(index, model):
+    page = PAGE + ["   "]
+    first, _ = index.scan(URL, FINGERPRINT, page, model.predict_chunks)
+    predictions, diff = index.scan(URL, FINGERPRINT, page, model.predict_chunks)
+
+    assert diff["chunks_scored"] == 0
+    assert predictions == first
+    assert all(item["index"] != len(PAGE) for item in predictions)
+
+
+def test_urls_are_tracked_separately(index, model):
+    index.scan(URL, FINGERPRINT, PAGE, model.predict_chunks)
+    _, diff = index.scan(URL + "?page=2", FINGERPRINT, PAGE, model.predict_chunks)
+    assert diff["previous_scan_at"] is None
+    assert diff["chunks_scored"] == len(PAGE)
@@ -0,0 +1,103 @@
+import csv
+import json
+
+import pytest
+
+import score_corpus
+from score_corpus import ProgressFile
+
+TEXTS = [
+    "Hurry, only 2 left in stock",
+    "Free shipping on all orders",
+    "Offer ends in 10 minutes",
+    "Contact us for details",
+    "Only 1 room left at this price",
+]
+
+
+@pytest.fixture
+def corpus_csv(tmp_path):
+    path = tmp_path / "corpus.csv"
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["sku", "Pattern String"])
+        writer.writerows([f"sku-{index}", text] for index, text in enumerate(TEXTS))
+    return path
+
+
+def _read_jsonl(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_csv_input_detects_the_text_column(corpus_csv, tmp_path):
+    output = tmp_path / "scored.csv"
+    assert score_corpus.score_corpus(corpus_csv, output, "csv", id_column="sku", include_text=True) == 5
+
+    with open(output, newline="", encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [(row["id"], row["text"]) for row in rows] == [(f"sku-{index}", text) for index, text in enumerate(TEXTS)]
+    assert rows[0]["prediction"] == "1"
+    assert all(0.5 <= float(row["confidence"]) <= 1.0 for row in rows)
+    assert ProgressFile(output).load() == {"rows": 5, "bytes": output.stat().st_size}
+
+
+def test_jsonl_input_uses_line_numbers_for_missing_ids(tmp_path):
+    source = tmp_path / "corpus.jsonl"
+    source.write_text(
+        json.dumps({"id": "a", "body": TEXTS[0]}) + "\n\n" + json.dumps({"body": TEXTS[1]}) + "\n",
+        encoding="utf-8",
+    )
+    output = tmp_path / "scored.jsonl"
+    score_corpus.score_corpus(source, output, "jsonl", text_column="body", batch_size=1)
+
+    records = _read_jsonl(output)
+    assert [record["id"] for record in records] == ["a", 2]
+    assert set(records[0]) == {"id", "prediction", "confidence"}
+
+
+def test_unsupported_input_is_refused(tmp_path):
+    with pytest.raises(SystemExit, match="Unsupported input format"):
+        score_corpus.score_corpus(tmp_path / "corpus.txt", tmp_path / "out.jsonl", "jsonl")
+
+
+@pytest.mark.parametrize("output_format", ["jsonl", "csv"])
+def test_interrupted_run_resumes_from_its_progress_file(corpus_csv, tmp_path, monkeypatch, output_format):
+    expected = tmp_path / f"expected.{output_format}"
+    score_corpus.score_corpus(corpus_csv, expected, output_format, batch_size=2)
+
+    output = tmp_path / f"scored.{output_format}"
+    real_score_batch = score_corpus._score_batch
+    calls = []
+
+    def failing_score_batch(texts):
+        calls.append(texts)
+        if len(calls) == 2:
+            raise RuntimeError("interrupted")
+        return real_score_batch(texts)
+
+    monkeypatch.setattr(score_corpus, "_score_batch", failing_score_batch)
+    with pytest.raises(RuntimeError):
+        score_corpus.score_corpus(corpus_csv, output, output_format, batch_size=2)
+    assert ProgressFile(output).load()["rows"] == 2
+    # A batch cut off mid-write leaves a partial line behind.
+    with open(output, "a", encoding="utf-8") as handle:
+        handle.write('{"id": 2, "predic')
+
+    calls.clear()
+    monkeypatch.setattr(score_corpus, "_score_batch", real_score_batch)
+    assert score_corpus.score_corpus(corpus_csv, output, output_format, batch_size=2, resume=True) == 5
+    assert output.read_text(encoding="utf-8") == expected.read_text(encoding="utf-8")
+
+
+def test_start_offset_skips_rows(corpus_csv, tmp_path):
+    output = tmp_path / "scored.jsonl"
+    assert score_corpus.score_corpus(corpus_csv, output, "jsonl", start_offset=3) == 5
+    assert [record["id"] for record in _read_jsonl(output)] == [3, 4]
+
+
+def test_worker_processes_keep_row_order(corpus_csv, tmp_path):
+    inline = tmp_path / "inline.jsonl"
+    pooled = tmp_path / "pooled.jsonl"
+    score_corpus.score_corpus(corpus_csv, inline, "jsonl", batch_size=1)
+    score_corpus.score_corpus(corpus_csv, pooled, "jsonl", batch_size=1, workers=2)
+    assert pooled.read_text(encoding="utf-8") == inline.read_text(encoding="utf-8")
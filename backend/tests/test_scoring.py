@@ -0,0 +1,88 @@
+import pytest
+
+from conftest import MODEL_DIR
+from pipeline.artifact import ModelArtifact, export_artifact
+from pipeline.inference import InferenceService
+from pipeline.lexicon import Lexicon
+from pipeline.preprocess import preprocess_many
+from pipeline.scoring import CompiledLinearScorer
+
+TOLERANCE = 1e-9
+
+
+@pytest.fixture(scope="module")
+def processed_texts(dataset_strings):
+    lexicon = Lexicon.load(MODEL_DIR / "lexicon.json")
+    # Raw strings too: the scorer must agree on any analyzer input, not just preprocessed text.
+    return preprocess_many(dataset_strings, lexicon=lexicon) + dataset_strings + [""]
+
+
+@pytest.fixture(scope="module")
+def sklearn_verdicts(model_pickles, processed_texts):
+    vectorizer, model = model_pickles
+    features = vectorizer.transform(processed_texts)
+    classes = list(model.classes_)
+    labels = [int(label) for label in model.predict(features)]
+    probabilities = model.predict_proba(features)
+    return [(label, float(probabilities[row][classes.index(label)])) for row, label in enumerate(labels)]
+
+
+def _assert_matches(scorer, processed_texts, sklearn_verdicts):
+    for text, (label, confidence) in zip(processed_texts, sklearn_verdicts):
+        compiled_label, compiled_confidence = scorer.score(text)
+        assert compiled_label == label, text
+        assert compiled_confidence == pytest.approx(confidence, abs=TOLERANCE), text
+
+
+def test_compiled_scorer_matches_sklearn(model_pickles, processed_texts, sklearn_verdicts):
+    scorer = CompiledLinearScorer(*model_pickles)
+    _assert_matches(scorer, processed_texts, sklearn_verdicts)
+    assert scorer.score_many(processed_texts[:50]) == [scorer.score(text) for text in processed_texts[:50]]
+
+
+def test_decision_matches_decision_function(model_pickles, processed_texts):
+    vectorizer, model = model_pickles
+    scorer = CompiledLinearScorer(vectorizer, model)
+    expected = model.decision_function(vectorizer.transform(processed_texts[:500]))
+    for text, decision in zip(processed_texts[:500], expected):
+        assert scorer.decision(text) == pytest.approx(float(decision), abs=TOLERANCE)
+
+
+def test_shipped_artifact_matches_sklearn(processed_texts, sklearn_verdicts):
+    artifact = ModelArtifact(MODEL_DIR / "model.artifact")
+    scorer = CompiledLinearScorer.from_artifact(artifact)
+    _assert_matches(scorer, processed_texts, sklearn_verdicts)
+
+
+def test_exported_artifact_matches_sklearn(model_pickles, processed_texts, sklearn_verdicts, tmp_path):
+    path = tmp_path / "model.artifact"
+    export_artifact(*model_pickles, path)
+    scorer = CompiledLinearScorer.from_artifact(ModelArtifact(path))
+    _assert_matches(scorer, processed_texts, sklearn_verdicts)
+
+
+def test_artifact_looks_terms_up_in_its_table(model_pickles, tmp_path):
+    vectorizer, _ = model_pickles
+    path = tmp_path / "model.artifact"
+    export_artifact(*model_pickles, path)
+    artifact = ModelArtifact(path)
+
+    terms = sorted(vectorizer.vocabulary_)
+    assert len(artifact) == len(terms)
+    for row, term in enumerate(terms):
+        assert artifact.lookup(term) == row
+        assert artifact.term(row) == term
+    for missing in ["", " ", "\U0010ffff", terms[0] + "\0", "zzzz-not-a-term", terms[-1] + "z"]:
+        assert artifact.lookup(missing) is None
+
+
+def test_service_scoring_modes_agree(dataset_strings, monkeypatch):
+    monkeypatch.setenv("PREDICTION_CACHE_BYTES", "0")
+    monkeypatch.setenv("INFERENCE_BACKEND", "inline")
+    monkeypatch.setenv("NEAR_DUP_MODE", "off")
+    texts = dataset_strings[:1000]
+    compiled = InferenceService(scoring_mode="compiled").predict_many(texts)
+    reference = InferenceService(scoring_mode="sklearn").predict_many(texts)
+    for fast, slow in zip(compiled, reference):
+        assert fast["prediction"] == slow["prediction"]
+        assert fast["confidence"] == pytest.approx(slow["confidence"], abs=TOLERANCE)
@@ -0,0 +1,92 @@
+import gzip
+
+import pytest
+
+from webscraper.scraper import WebScraper
+from webscraper.session import build_session
+
+PAGE = b"<html><body><p>Hurry, only 2 left in stock</p></body></html>"
+
+
+class RecordingMetrics:
+    def __init__(self):
+        self.counts = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counts[key] = self.counts.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def errors(self):
+        return {dict(labels)["type"] for name, labels in self.counts if name == "errors_total"}
+
+    def fetched_bytes(self):
+        return self.counts.get(("fetched_bytes_total", ()), 0)
+
+
+@pytest.fixture
+def metrics():
+    return RecordingMetrics()
+
+
+def _scraper(metrics, **kwargs) -> WebScraper:
+    return WebScraper(timeout=5, session=build_session(), metrics=metrics, **kwargs)
+
+
+def _padded_page(size: int) -> bytes:
+    return b"<html><body><p>" + b"x" * size + b"</p></body></html>"
+
+
+@pytest.mark.parametrize("extract", [False, True])
+def test_body_past_max_bytes_is_aborted_mid_stream(stub_server, metrics, extract):
+    # Chunked, so there is no Content-Length to reject it up front.
+    stub_server.routes["/big"] = (200, {"Transfer-Encoding": "chunked"}, _padded_page(2 * 1024 * 1024))
+    scraper = _scraper(metrics, max_bytes=256 * 1024)
+    url = stub_server.url("/big")
+
+    result = scraper.extract_chunks(url) if extract else scraper.fetch(url)
+    assert result is None
+    assert metrics.errors() == {"fetch_aborted"}
+    # Only the blocks up to the budget were read.
+    assert 256 * 1024 < metrics.fetched_bytes() <= 256 * 1024 + 64 * 1024
+
+
+def test_content_length_past_max_bytes_is_rejected_before_reading(stub_server, metrics):
+    stub_server.routes["/big"] = (200, {}, _padded_page(512 * 1024))
+    assert _scraper(metrics, max_bytes=256 * 1024).fetch(stub_server.url("/big")) is None
+    assert metrics.errors() == {"body_too_large"}
+    assert metrics.fetched_bytes() == 0
+
+
+def test_decompression_bomb_is_aborted(stub_server, metrics):
+    bomb = gzip.compress(_padded_page(8 * 1024 * 1024), compresslevel=9)
+    stub_server.routes["/bomb"] = (200, {"Content-Encoding": "gzip"}, bomb)
+    scraper = _scraper(metrics, max_bytes=64 * 1024 * 1024, max_decompression_ratio=100)
+
+    assert scraper.fetch(stub_server.url("/bomb")) is None
+    assert metrics.errors() == {"fetch_aborted"}
+
+
+def test_ordinary_compression_is_accepted(stub_server, metrics):
+    stub_server.routes["/page"] = (200, {"Content-Encoding": "gzip"}, gzip.compress(PAGE))
+    assert _scraper(metrics).fetch(stub_server.url("/page")) == PAGE.decode()
+    assert metrics.errors() == set()
+
+
+@pytest.mark.parametrize("content_type", ["application/pdf", "image/png", "application/json"])
+def test_non_html_content_type_is_rejected_before_reading(stub_server, metrics, content_type):
+    stub_server.routes["/file"] = (200, {"Content-Type": content_type}, b"%PDF" + b"\0" * 100_000)
+    scraper = _scraper(metrics)
+
+    assert scraper.fetch(stub_server.url("/file")) is None
+    assert scraper.extract_chunks(stub_server.url("/file")) is None
+    assert metrics.errors() == {"unsupported_content_type"}
+    assert metrics.fetched_bytes() == 0
+
+
+def test_allowed_content_types_can_be_widened(stub_server, metrics):
+    stub_server.routes["/page"] = (200, {"Content-Type": "text/plain"}, b"Hurry, only 2 left")
+    scraper = _scraper(metrics, allowed_content_types=["text/html", "text/plain"])
+    assert scraper.fetch(stub_server.url("/page")) == "Hurry, only 2 left"
@@ -0,0 +1,132 @@
+import socket
+import time
+
+import pytest
+
+from webscraper.scraper import WebScraper
+from webscraper.session import DNSCache, build_session, dns_cache, get_shared_session, session_stats
+
+PAGE = b"<html><body><p>Limited time offer ends tonight</p></body></html>"
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Count getaddrinfo calls for "localhost", answering with the IPv4 loopback."""
+    calls = []
+    real_getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(host, *args, **kwargs):
+        if host == "localhost":
+            calls.append(host)
+            host = "127.0.0.1"
+        return real_getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", counting_getaddrinfo)
+    return calls
+
+
+def test_scrapers_on_one_session_reuse_a_connection(stub_server):
+    stub_server.routes["/page"] = (200, {}, PAGE)
+    session = build_session()
+    for _ in range(5):
+        assert WebScraper(session=session).fetch(stub_server.url("/page")) == PAGE.decode()
+
+    assert len(stub_server.requests) == 5
+    assert stub_server.connections == 1
+
+
+def test_streamed_extraction_returns_its_connection(stub_server):
+    stub_server.routes["/page"] = (200, {}, PAGE)
+    scraper = WebScraper(session=build_session())
+    for _ in range(5):
+        assert scraper.extract_chunks(stub_server.url("/page")) == ["Limited time offer ends tonight"]
+
+    assert stub_server.connections == 1
+
+
+def test_new_connections_reuse_the_cached_address(stub_server, lookups):
+    stub_server.routes["/page"] = (200, {"Connection": "close"}, PAGE)
+    dns_cache.forget("localhost", stub_server.port)
+    scraper = WebScraper(session=build_session())
+    for _ in range(3):
+        assert scraper.fetch(stub_server.url("/page", host="localhost")) == PAGE.decode()
+
+    # Each request opened a fresh connection, but the host was resolved once.
+    assert stub_server.connections == 3
+    assert lookups == ["localhost"]
+    assert stub_server.requests[-1][1]["Host"] == f"localhost:{stub_server.port}"
+
+
+def test_dns_cache_expires_and_forgets(lookups):
+    cache = DNSCache(ttl=0.0)
+    cache.resolve("localhost", 80)
+    cache.resolve("localhost", 80)
+    assert len(lookups) == 2
+
+    cache = DNSCache(ttl=60.0)
+    cache.resolve("localhost", 80)
+    cache.resolve("localhost", 80)
+    cache.forget("localhost", 80)
+    cache.resolve("localhost", 80)
+    assert len(lookups) == 4
+
+
+def _flaky(statuses, headers=None):
+    """Route answering with each status in turn, then 200."""
+    remaining = list(statuses)
+
+    def route(request_headers):
+        status = remaining.pop(0) if remaining else 200
+        return (status, dict(headers or {}), PAGE)
+
+    return route
+
+
+def test_retryable_statuses_are_retried_with_backoff(stub_server):
+    stub_server.routes["/page"] = _flaky([503, 502])
+    session = build_session(retries=2, backoff_factor=0.1)
+    started = time.monotonic()
+    response = session.get(stub_server.url("/page"))
+
+    assert response.status_code == 200
+    assert len(stub_server.requests) == 3
+    # No wait before the first retry, backoff_factor * 2 before the second.
+    assert time.monotonic() - started >= 0.2
+
+
+def test_retries_run_out_and_other_statuses_are_not_retried(stub_server):
+    stub_server.routes["/busy"] = _flaky([503, 503, 503])
+    stub_server.routes["/missing"] = (404, {}, b"")
+    session = build_session(retries=2, backoff_factor=0.0)
+
+    assert session.get(stub_server.url("/busy")).status_code == 503
+    assert session.get(stub_server.url("/missing")).status_code == 404
+    assert [path for path, _ in stub_server.requests] == ["/busy"] * 3 + ["/missing"]
+
+
+def test_retry_after_is_not_honoured(stub_server):
+    stub_server.routes["/page"] = _flaky([429], {"Retry-After": "30"})
+    started = time.monotonic()
+    assert build_session(backoff_factor=0.0).get(stub_server.url("/page")).status_code == 200
+    assert time.monotonic() - started < 5
+
+
+def test_cookies_are_not_kept_between_requests(stub_server):
+    stub_server.routes["/login"] = (200, {"Set-Cookie": "session=abc; Path=/"}, PAGE)
+    stub_server.routes["/page"] = (200, {}, PAGE)
+    session = build_session()
+    session.get(stub_server.url("/login"))
+    session.get(stub_server.url("/page"))
+
+    assert len(session.cookies) == 0
+    assert "Cookie" not in stub_server.requests[-1][1]
+
+
+def test_health_and_metrics_report_the_shared_session(api, stub_server):
+    stub_server.routes["/page"] = (200, {}, PAGE)
+    get_shared_session().get(stub_server.url("/page"))
+
+    stats = api.get("/").json()["http_session"]
+    assert stats["host_pools"] >= 1
+    assert stats == session_stats()
+    assert f"darkpattern_http_host_pools {stats['host_pools']}" in api.get("/metrics").text
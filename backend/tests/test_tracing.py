@@ -0,0 +1,109 @@
+import re
+import time
+from pathlib import Path
+
+import pytest
+
+from pipeline import tracing
+from pipeline.tracing import RequestTrace, TraceDisabled, add_stage_time, start_trace
+
+PAGE = b"<html><body><p>Hurry, only 2 left in stock</p></body></html>"
+
+
+@pytest.fixture
+def traces_enabled(monkeypatch):
+    monkeypatch.setattr(tracing, "DEBUG_TRACE_ENABLED", True)
+
+
+@pytest.fixture
+def profile_dir(monkeypatch, tmp_path, traces_enabled):
+    monkeypatch.setattr(tracing, "DEBUG_PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(tracing, "DEBUG_PROFILE_INTERVAL_MS", 1.0)
+    return tmp_path / "profiles"
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def test_no_trace_unless_asked(monkeypatch):
+    monkeypatch.setattr(tracing, "DEBUG_TRACE_ENABLED", False)
+    with start_trace("analyze", debug=False) as trace:
+        assert trace is None
+
+
+@pytest.mark.parametrize(
+    "enabled, debug, profile, message",
+    [
+        (False, True, False, "Debug traces are disabled (set DEBUG_TRACE_ENABLED)"),
+        (False, False, True, "Debug traces are disabled (set DEBUG_TRACE_ENABLED)"),
+        (True, True, True, "Profiling is disabled (set DEBUG_PROFILE_DIR)"),
+    ],
+)
+def test_unconfigured_traces_are_refused(monkeypatch, enabled, debug, profile, message):
+    monkeypatch.setattr(tracing, "DEBUG_TRACE_ENABLED", enabled)
+    monkeypatch.setattr(tracing, "DEBUG_PROFILE_DIR", None)
+    with pytest.raises(TraceDisabled, match=re.escape(message)):
+        start_trace("analyze", debug=debug, profile=profile)
+
+
+def test_trace_collects_stage_times(traces_enabled):
+    with start_trace("analyze", debug=True) as trace:
+        add_stage_time(trace.inference, "score", 0.002)
+        add_stage_time(trace.inference, "score", 0.003)
+        add_stage_time(None, "score", 1.0)
+        result = trace.finish()
+
+    assert result["inference"] == {"score_ms": pytest.approx(5.0)}
+    assert "fetch" not in result and "profile" not in result
+    assert result["total_ms"] >= 0
+
+
+def test_profile_is_written_as_folded_stacks(profile_dir):
+    with start_trace("analyze", debug=False, profile=True) as trace:
+        _busy(0.1)
+        result = trace.finish()
+
+    assert result["profile_samples"] > 0
+    path = Path(result["profile"])
+    assert path.parent == profile_dir
+    lines = path.read_text().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == result["profile_samples"]
+    assert any("_busy (test_tracing.py:" in line for line in lines)
+
+
+def test_sampler_stops_when_the_request_fails(profile_dir):
+    with pytest.raises(ValueError):
+        with start_trace("analyze", debug=True, profile=True) as trace:
+            raise ValueError("boom")
+    assert not trace._sampler.running
+    assert not profile_dir.exists()
+
+
+def test_unwritable_profile_dir_is_reported(profile_dir):
+    profile_dir.write_text("not a directory")
+    with RequestTrace("analyze", profile=True) as trace:
+        result = trace.finish()
+    assert result["profile"] is None
+
+
+def test_debug_request_is_refused_when_traces_are_disabled(api, monkeypatch):
+    monkeypatch.setattr(tracing, "DEBUG_TRACE_ENABLED", False)
+    response = api.post("/analyze?debug=true", json={"text": "Hurry"})
+    assert response.status_code == 403
+    assert response.json() == {"status": "error", "message": "Debug traces are disabled (set DEBUG_TRACE_ENABLED)"}
+    # Requests without debug are unaffected.
+    assert api.post("/analyze", json={"text": "Hurry"}).status_code == 200
+
+
+def test_debug_responses_carry_the_trace(api, traces_enabled, stub_server):
+    body = api.post("/analyze?debug=true", json={"text": "Hurry"}).json()
+    assert body["prediction"] == 1
+    assert set(body["debug"]) == {"total_ms", "inference"}
+
+    stub_server.routes["/page"] = (200, {}, PAGE)
+    body = api.post("/detect-from-url?debug=true", json={"url": stub_server.url("/page")}).json()
+    assert body["total_dark_patterns_detected"] == 1
+    assert body["debug"]["fetch"]["status_code"] == 200
@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from routes import url_route
+from routes.url_route import HostLanes
+
+PAGE = b"<html><body><p>Hurry, only 2 left in stock</p><p>Free shipping on all orders</p></body></html>"
+CALM_PAGE = b"<html><body><p>Free shipping on all orders</p></body></html>"
+
+
+@pytest.fixture
+def host_lanes(monkeypatch):
+    lanes = HostLanes(2)
+    monkeypatch.setattr(url_route, "_host_lanes", lanes)
+    return lanes
+
+
+def test_batch_results_keep_request_order(api, stub_server, host_lanes):
+    stub_server.routes["/dark"] = (200, {}, PAGE)
+    stub_server.routes["/calm"] = (200, {}, CALM_PAGE)
+    stub_server.routes["/empty"] = (200, {}, b"<html><body></body></html>")
+    urls = [
+        stub_server.url("/dark"),
+        "ftp://example.com/file",
+        stub_server.url("/missing"),
+        stub_server.url("/empty"),
+        stub_server.url("/calm"),
+    ]
+    body = api.post("/detect-from-urls", json={"urls": urls}).json()
+
+    assert [result["url"] for result in body["results"]] == urls
+    assert [result["status"] for result in body["results"]] == ["ok", "error", "error", "error", "ok"]
+    assert body["results"][1]["message"] == "Invalid URL. Use http:// or https://"
+    assert body["results"][2]["message"] == "Failed to fetch URL content"
+    assert body["results"][3]["message"] == "No usable visible text chunks found on page"
+    assert body["results"][0]["detected_texts"] == [{"text": "Hurry, only 2 left in stock", "confidence": 0.9}]
+    assert (body["urls_scanned"], body["urls_failed"]) == (2, 3)
+    assert (body["total_contents_scanned"], body["total_dark_patterns_detected"], body["dark_ratio"]) == (3, 1, 33.33)
+
+
+def test_pages_are_scored_in_pooled_batches(api, fake_service, stub_server, host_lanes, monkeypatch):
+    for index in range(4):
+        stub_server.routes[f"/page/{index}"] = (200, {}, PAGE)
+    urls = [stub_server.url(f"/page/{index}") for index in range(4)]
+
+    api.post("/detect-from-urls", json={"urls": urls})
+    assert [len(call) for call in fake_service.chunk_calls] == [8]
+
+    fake_service.chunk_calls.clear()
+    monkeypatch.setattr(url_route, "PREDICT_BATCH_CHUNKS", 4)
+    body = api.post("/detect-from-urls", json={"urls": urls}).json()
+    assert [len(call) for call in fake_service.chunk_calls] == [4, 4]
+    assert all(result["total_contents_scanned"] == 2 for result in body["results"])
+
+
+def test_compact_batch_shares_one_chunk_table(api, stub_server, host_lanes):
+    stub_server.routes["/a"] = (200, {}, PAGE)
+    stub_server.routes["/b"] = (200, {}, PAGE)
+    body = api.post("/detect-from-urls?compact=true", json={"urls": [stub_server.url("/a"), stub_server.url("/b")]}).json()
+
+    assert body["chunks"] == ["Hurry, only 2 left in stock"]
+    assert [result["detected_chunks"] for result in body["results"]] == [[[0, 0.9]], [[0, 0.9]]]
+
+
+@pytest.mark.parametrize(
+    "urls, message",
+    [([], "URL list cannot be empty"), (["http://example.com/"] * 3, "Too many URLs (max 2)")],
+)
+def test_batch_size_is_validated(api, monkeypatch, urls, message):
+    monkeypatch.setattr(url_route, "URL_BATCH_MAX_URLS", 2)
+    response = api.post("/detect-from-urls", json={"urls": urls})
+    assert response.status_code == 400
+    assert response.json()["message"] == message
+
+
+def test_per_host_limit_holds_across_requests(api, stub_server, host_lanes):
+    active = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    def slow_page(headers):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return (200, {}, PAGE)
+
+    for index in range(8):
+        stub_server.routes[f"/page/{index}"] = slow_page
+    batches = [[stub_server.url(f"/page/{index}") for index in range(start, start + 4)] for start in (0, 4)]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        responses = list(executor.map(lambda urls: api.post("/detect-from-urls", json={"urls": urls}), batches))
+
+    assert all(response.json()["urls_scanned"] == 4 for response in responses)
+    assert peak[0] == 2
+    # Lanes are dropped once their host has no queued work.
+    assert host_lanes._lanes == {} and host_lanes._queued == {}
+
+
+def test_host_lanes_run_every_job_and_stay_under_the_limit():
+    lanes = HostLanes(2)
+    running = {"a": 0, "b": 0}
+    peaks = {"a": 0, "b": 0}
+    finished = []
+    lock = threading.Lock()
+    all_done = threading.Event()
+
+    def job(host, index):
+        with lock:
+            running[host] += 1
+            peaks[host] = max(peaks[host], running[host])
+        time.sleep(0.01)
+        with lock:
+            running[host] -= 1
+            finished.append((host, index))
+            if len(finished) == 12:
+                all_done.set()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for index in range(6):
+            for host in ("a", "b"):
+                lanes.submit(executor, host, lambda host=host, index=index: job(host, index))
+        assert all_done.wait(5)
+
+    assert sorted(finished) == sorted((host, index) for host in "ab" for index in range(6))
+    assert peaks == {"a": 2, "b": 2}
+
+
+def _long_page(count):
+    paragraphs = "".join(
+        f"<p>Hurry, item {index} is almost gone</p>" if index % 2 else f"<p>Plain product note number {index}</p>"
+        for index in range(count)
+    )
+    return f"<html><body>{paragraphs}</body></html>".encode()
+
+
+def test_stream_sends_the_page_before_its_batches_as_ndjson(api, fake_service, stub_server, monkeypatch):
+    monkeypatch.setattr(url_route, "STREAM_BATCH_CHUNKS", 2)
+    stub_server.routes["/page"] = (200, {}, _long_page(5))
+    response = api.post("/detect-from-url/stream", json={"url": stub_server.url("/page")})
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text.endswith("\n")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["type"] for event in events] == ["page", "detections", "detections", "detections", "summary"]
+    assert events[0] == {"type": "page", "url": stub_server.url("/page"), "total_chunks": 5}
+    assert [(event["batch"], event["contents_scanned"]) for event in events[1:4]] == [(0, 2), (1, 2), (2, 1)]
+    assert [len(event["detected_texts"]) for event in events[1:4]] == [1, 1, 0]
+    assert events[-1]["total_contents_scanned"] == 5
+    assert events[-1]["total_dark_patterns_detected"] == 2
+    assert "detected_texts" not in events[-1]
+    assert [len(call) for call in fake_service.chunk_calls] == [2, 2, 1]
+
+
+def test_stream_uses_sse_framing_when_asked(api, stub_server, monkeypatch):
+    monkeypatch.setattr(url_route, "STREAM_BATCH_CHUNKS", 2)
+    stub_server.routes["/page"] = (200, {}, _long_page(3))
+    response = api.post(
+        "/detect-from-url/stream?explain=1",
+        json={"url": stub_server.url("/page")},
+        headers={"Accept": "text/event-stream"},
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    frames = response.text.split("\n\n")
+    assert frames[-1] == ""
+    events = []
+    for frame in frames[:-1]:
+        event_line, data_line = frame.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        event = json.loads(data_line[len("data: "):])
+        assert event_line == f"event: {event['type']}"
+        events.append(event)
+    assert [event["type"] for event in events] == ["page", "detections", "detections", "summary"]
+    assert events[1]["detected_texts"][0]["explanation"] == [{"token": "hurry", "weight": 1.0}]
+
+
+def test_stream_fails_before_streaming_when_the_page_cannot_be_fetched(api, stub_server):
+    response = api.post("/detect-from-url/stream", json={"url": stub_server.url("/missing")})
+    assert response.status_code == 400
+    assert response.json()["message"] == "Failed to fetch URL content"
+
+
+def test_page_event_is_sent_before_any_scoring(fake_service):
+    events = url_route._stream_detections("https://example.com/", ["Hurry", "Calm"], fake_service, url_route._ndjson)
+    assert json.loads(next(events))["type"] == "page"
+    assert fake_service.chunk_calls == []
+    assert json.loads(next(events))["type"] == "detections"
+    assert fake_service.chunk_calls == [["Hurry", "Calm"]]
@@ -0,0 +1,93 @@
+import os
+import threading
+
+import pytest
+
+from pipeline import worker_pool
+from pipeline.worker_pool import BrokenProcessPool, InferencePoolSaturated, InferenceWorkerPool
+
+
+def _init_stub(service_kwargs):
+    pass
+
+
+def _compute_stub(texts):
+    for text in texts:
+        if text == "die":
+            os._exit(1)
+        if text.startswith("die-once:"):
+            marker = text.split(":", 1)[1]
+            if not os.path.exists(marker):
+                open(marker, "w").close()
+                os._exit(1)
+    return [(int("hurry" in text), 0.9) for text in texts]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Forked workers inherit the stubs, so no model is loaded.
+    monkeypatch.setattr(worker_pool, "_init_worker", _init_stub)
+    monkeypatch.setattr(worker_pool, "_compute", _compute_stub)
+    pool = InferenceWorkerPool({}, workers=2, queue_timeout=0.05, min_slice=1, start_method="fork")
+    yield pool
+    pool.close()
+
+
+def test_batches_are_split_across_workers_in_order(pool):
+    texts = ["hurry", "calm", "hurry up", "fine"]
+    assert pool._slices(texts) == [["hurry", "calm"], ["hurry up", "fine"]]
+    assert pool.compute(texts) == [(1, 0.9), (0, 0.9), (1, 0.9), (0, 0.9)]
+    assert pool.compute([]) == []
+    assert pool.in_flight == 0
+
+
+def test_crashed_worker_is_restarted_and_the_batch_retried_once(pool, tmp_path):
+    texts = ["hurry", f"die-once:{tmp_path / 'died'}"]
+    assert pool.compute(texts) == [(1, 0.9), (0, 0.9)]
+    assert pool.restarts == 1
+    assert pool.in_flight == 0
+    # The new pool keeps serving.
+    assert pool.compute(["hurry"]) == [(1, 0.9)]
+
+
+def test_second_crash_propagates(pool):
+    with pytest.raises(BrokenProcessPool):
+        pool.compute(["die"])
+    assert pool.restarts == 1
+    assert pool.in_flight == 0
+
+
+def test_caller_gives_up_when_every_slot_is_taken(pool):
+    pool.in_flight = pool.max_pending
+    with pytest.raises(InferencePoolSaturated):
+        pool.compute(["hurry"])
+    assert pool.rejected == 1
+
+
+def test_freed_slot_wakes_a_waiting_caller(pool):
+    pool.queue_timeout = 5.0
+    pool.in_flight = pool.max_pending
+    threading.Timer(0.05, pool._release, args=(pool.max_pending,)).start()
+    assert pool.compute(["hurry"]) == [(1, 0.9)]
+    assert pool.rejected == 0
+
+
+class PooledService:
+    fingerprint = "f" * 64
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def predict(self, text):
+        prediction, confidence = self.pool.compute([text])[0]
+        return {"text": text, "prediction": prediction, "confidence": confidence}
+
+
+def test_saturated_pool_answers_503(api, pool):
+    api.app.state.inference_service = PooledService(pool)
+    pool.in_flight = pool.max_pending
+    response = api.post("/analyze", json={"text": "Hurry, only 2 left"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json() == {"status": "error", "message": "Inference workers are saturated"}
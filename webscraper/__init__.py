@@ -2,7 +2,26 @@
 WebScraper - A module for scraping website content.
 """
 
-from .scraper import WebScraper, scrape_url, get_text_content
+from .crawler import SiteCrawler, canonicalize_url
+from .extract import ChunkExtractor, extract_chunks
+from .page import Page
+from .page_cache import PageCache, get_shared_page_cache
+from .scraper import FetchAborted, WebScraper, scrape_url, get_text_content
+from .session import build_session, get_shared_session
 
 __version__ = "1.0.0"
-__all__ = ["WebScraper", "scrape_url", "get_text_content"]
+__all__ = [
+    "WebScraper",
+    "Page",
+    "FetchAborted",
+    "scrape_url",
+    "get_text_content",
+    "build_session",
+    "get_shared_session",
+    "ChunkExtractor",
+    "extract_chunks",
+    "PageCache",
+    "get_shared_page_cache",
+    "SiteCrawler",
+    "canonicalize_url",
+]
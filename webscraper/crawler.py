@@ -0,0 +1,355 @@
+"""
+Breadth-first, same-origin crawling on top of WebScraper.
+"""
+
+import hashlib
+import logging
+import math
+import posixpath
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from .extract import MAX_CHUNKS, ChunkExtractor
+from .scraper import FetchAborted, WebScraper
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+TRACKING_PARAMS = frozenset({"fbclid", "gclid", "msclkid"})
+# Redirect hops followed for one page before it is reported as failed.
+MAX_REDIRECTS = 10
+# Rules past this many bytes of robots.txt are ignored, as major crawlers do.
+ROBOTS_MAX_BYTES = 512 * 1024
+# Hosts whose next request slot has passed are forgotten once this many are tracked.
+RATE_LIMITER_MAX_HOSTS = 1024
+
+
+def canonicalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Resolve a link against its page and reduce it to a canonical form.
+
+    The fragment, default port and tracking parameters are dropped, the
+    scheme and host are lowercased, dot segments are resolved and the
+    remaining query parameters are sorted.
+
+    Args:
+        url: The link as found in the page
+        base: The URL of the page the link was found on
+
+    Returns:
+        Canonical absolute URL, or None for non-HTTP links
+    """
+    try:
+        parts = urlsplit(urljoin(base, url.strip()) if base else url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    netloc = parts.hostname.lower()
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    path = parts.path or "/"
+    normalized_path = posixpath.normpath(path)
+    if path.endswith("/") and normalized_path != "/":
+        normalized_path += "/"
+    if normalized_path.startswith("//"):
+        normalized_path = "/" + normalized_path.lstrip("/")
+
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith(TRACKING_PARAM_PREFIXES)
+    ]
+    return urlunsplit((scheme, netloc, normalized_path, urlencode(sorted(query)), ""))
+
+
+def origin_of(url: str) -> str:
+    """
+    Return the scheme://host[:port] origin of a canonical URL.
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set used to remember visited URLs on large sites.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        Initialize the BloomFilter.
+
+        Args:
+            capacity: Number of items the filter is sized for
+            error_rate: Target false-positive rate at capacity
+        """
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def add(self, item: str) -> bool:
+        """
+        Add an item.
+
+        Returns:
+            True if the item was (probably) already present
+        """
+        present = True
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                present = False
+                self._bits[byte] |= 1 << bit
+        return present
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position // 8] & (1 << position % 8) for position in self._positions(item))
+
+
+class HostRateLimiter:
+    """
+    Spaces out request starts to each host by a minimum interval.
+
+    Thread-safe, so one limiter can be shared by every crawl in a process
+    and concurrent crawls of a host are spaced out together.
+    """
+
+    def __init__(self, min_interval: float):
+        """
+        Initialize the HostRateLimiter.
+
+        Args:
+            min_interval: Minimum seconds between two requests to the same host
+        """
+        self.min_interval = min_interval
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str, min_interval: Optional[float] = None) -> None:
+        """
+        Block until a request to host is allowed.
+        """
+        interval = max(self.min_interval, min_interval or 0.0)
+        with self._lock:
+            now = time.monotonic()
+            if len(self._next_slot) >= RATE_LIMITER_MAX_HOSTS:
+                self._next_slot = {name: slot for name, slot in self._next_slot.items() if slot > now}
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class SiteCrawler:
+    """
+    Walks same-origin links breadth-first from a seed URL and extracts
+    chunks from every page it visits.
+    """
+
+    def __init__(
+        self,
+        scraper: WebScraper,
+        max_pages: int = 50,
+        max_depth: int = 2,
+        min_interval: float = 1.0,
+        respect_robots: bool = True,
+        max_chunks: int = MAX_CHUNKS,
+        max_crawl_delay: float = 30.0,
+        rate_limiter: Optional[HostRateLimiter] = None,
+    ):
+        """
+        Initialize the SiteCrawler.
+
+        Args:
+            scraper: WebScraper used for page and robots.txt requests
+            max_pages: Maximum number of pages fetched
+            max_depth: Maximum link depth from the seed (seed is depth 0)
+            min_interval: Minimum seconds between requests to the host
+            respect_robots: Whether to obey robots.txt (including Crawl-delay)
+            max_chunks: Maximum number of chunks extracted per page
+            max_crawl_delay: Longest robots.txt Crawl-delay honored; a site
+                asking for more is not crawled
+            rate_limiter: Limiter shared with other crawls; by default the
+                crawler gets its own with min_interval
+        """
+        self.scraper = scraper
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.respect_robots = respect_robots
+        self.max_chunks = max_chunks
+        self.max_crawl_delay = max_crawl_delay
+        self.rate_limiter = rate_limiter if rate_limiter is not None else HostRateLimiter(min_interval)
+        # Pages link to far more URLs than are ever fetched; the frontier is
+        # capped and the seen-set is a Bloom filter so memory stays bounded.
+        self.max_frontier = max_pages * 20
+        self.seen = BloomFilter(capacity=max(self.max_frontier * 5, 10_000))
+
+    def _robots(self, origin: str) -> Optional[RobotFileParser]:
+        if not self.respect_robots:
+            return None
+        robots_url = f"{origin}/robots.txt"
+        parser = RobotFileParser(robots_url)
+        try:
+            response = self.scraper.session.get(
+                robots_url,
+                headers=self.scraper.headers,
+                timeout=(self.scraper.connect_timeout, self.scraper.timeout),
+                stream=True,
+            )
+        except requests.RequestException as e:
+            logger.warning(f"Could not fetch {robots_url}: {e}")
+            parser.allow_all = True
+            return parser
+        with response:
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if response.status_code in (401, 403):
+                parser.disallow_all = True
+            elif response.status_code >= 400 or (content_type and not content_type.startswith("text/")):
+                parser.allow_all = True
+            else:
+                try:
+                    body = self._read_robots(response)
+                except requests.RequestException as e:
+                    logger.warning(f"Could not read {robots_url}: {e}")
+                    parser.allow_all = True
+                    return parser
+                parser.parse(body.decode(response.encoding or "utf-8", errors="replace").splitlines())
+        return parser
+
+    @staticmethod
+    def _read_robots(response: requests.Response) -> bytes:
+        # Decoded and wire bytes are both capped, so neither a huge file nor
+        # a compression bomb is read past the limit.
+        body = bytearray()
+        for block in response.iter_content(chunk_size=16 * 1024):
+            body += block
+            if len(body) >= ROBOTS_MAX_BYTES or (response.raw.tell() or 0) >= ROBOTS_MAX_BYTES:
+                break
+        del body[ROBOTS_MAX_BYTES:]
+        # A rule cut off mid-line is dropped rather than misread.
+        if len(body) == ROBOTS_MAX_BYTES:
+            del body[body.rfind(b"\n") + 1:]
+        return bytes(body)
+
+    def _open(
+        self, url: str, in_scope: Callable[[str], bool], interval: Optional[float]
+    ) -> Tuple[Optional[requests.Response], Optional[str]]:
+        # Returns (response, None) or (None, error). Redirects are followed
+        # here rather than by requests, so every target is checked against
+        # the origin and robots.txt before it is requested, and every hop
+        # waits for the rate limiter like a page does.
+        for _ in range(MAX_REDIRECTS + 1):
+            self.rate_limiter.wait(urlsplit(url).netloc, interval)
+            response = self.scraper._open(url, allow_redirects=False)
+            if response is None:
+                return None, "Failed to fetch URL content"
+            if not response.is_redirect:
+                return response, None
+            location = canonicalize_url(response.headers["Location"], base=response.url)
+            response.close()
+            if location is None or not in_scope(location):
+                logger.warning(f"Not following redirect from {url} to {location}")
+                return None, "Redirected off-site or to a URL disallowed by robots.txt"
+            url = location
+        return None, "Too many redirects"
+
+    def _extract(self, url: str, in_scope: Callable[[str], bool], interval: Optional[float]) -> Dict[str, Any]:
+        # Returns the URL the page was served from, with its chunks and
+        # links, or an error.
+        response, error = self._open(url, in_scope, interval)
+        if response is None:
+            return {"error": error}
+        final_url = canonicalize_url(response.url) or url
+
+        extractor = ChunkExtractor(max_chunks=self.max_chunks, collect_links=True)
+        pieces = self.scraper._iter_text(url, response)
+        try:
+            for piece in pieces:
+                extractor.feed(piece)
+        except FetchAborted as e:
+            logger.error(f"Error fetching {url}: {e}")
+            return {"error": "Failed to fetch URL content"}
+        finally:
+            pieces.close()
+        return {"url": final_url, "chunks": extractor.close(), "links": extractor.links}
+
+    def crawl(self, seed: str) -> Iterator[Dict[str, Any]]:
+        """
+        Crawl from a seed URL, yielding one result per visited page.
+
+        Args:
+            seed: The start URL
+
+        Yields:
+            Dictionaries with url, depth and either chunks or error
+        """
+        start = canonicalize_url(seed)
+        if start is None:
+            yield {"url": seed, "depth": 0, "error": "Invalid URL"}
+            return
+
+        origin = origin_of(start)
+        robots = self._robots(origin)
+        user_agent = self.scraper.headers.get("User-Agent", "*")
+        crawl_delay = robots.crawl_delay(user_agent) if robots is not None else None
+        interval = float(crawl_delay) if crawl_delay else None
+        if interval is not None and interval > self.max_crawl_delay:
+            # Honoring it would hold the crawl (and its worker) for hours.
+            logger.warning(f"Not crawling {origin}: Crawl-delay {interval:g}s exceeds {self.max_crawl_delay:g}s")
+            yield {"url": start, "depth": 0, "error": f"robots.txt Crawl-delay exceeds {self.max_crawl_delay:g}s"}
+            return
+
+        def in_scope(candidate: str) -> bool:
+            if origin_of(candidate) != origin:
+                return False
+            return robots is None or robots.can_fetch(user_agent, candidate)
+
+        frontier = deque([(start, 0)])
+        self.seen.add(start)
+        fetched = 0
+        while frontier and fetched < self.max_pages:
+            url, depth = frontier.popleft()
+            if robots is not None and not robots.can_fetch(user_agent, url):
+                yield {"url": url, "depth": depth, "error": "Disallowed by robots.txt"}
+                continue
+
+            fetched += 1
+            page = self._extract(url, in_scope, interval)
+            if "error" in page:
+                yield {"url": url, "depth": depth, "error": page["error"]}
+                continue
+            # Links are relative to where the page was served from.
+            base = page["url"]
+            self.seen.add(base)
+
+            if depth < self.max_depth:
+                for link in page["links"]:
+                    if len(frontier) >= self.max_frontier:
+                        break
+                    candidate = canonicalize_url(link, base=base)
+                    if candidate is None or origin_of(candidate) != origin:
+                        continue
+                    if not self.seen.add(candidate):
+                        frontier.append((candidate, depth + 1))
+
+            yield {"url": url, "depth": depth, "chunks": page["chunks"]}
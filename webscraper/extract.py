@@ -0,0 +1,357 @@
+"""
+Single-pass, event-driven extraction of visible text chunks from HTML.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+MIN_CHUNK_CHARS = 15
+MIN_CHUNK_WORDS = 3
+MAX_CHUNK_CHARS = 1200
+MAX_CHUNKS = 300
+# Characters handed to lxml per feed() call; small enough to stop promptly.
+FEED_SIZE = 64 * 1024
+
+# Subtrees dropped entirely, as decompose() did for the soup-based extractor.
+SKIPPED_TAGS = frozenset({"script", "style"})
+# Strings inside these tags get a NavigableString subclass in BeautifulSoup
+# and are therefore left out of get_text() on any ancestor.
+NON_TEXT_CONTAINERS = frozenset({"rt", "rp", "template"})
+SUBMIT_INPUT_TYPES = frozenset({"button", "submit"})
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+class _ChunkFilter:
+    """
+    Applies the normalize / length / dedupe rules and keeps up to a limit.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.kept: Dict[str, None] = {}
+        self.dropped: Dict[str, int] = {}
+        self.truncated = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self.kept) >= self.limit
+
+    def _drop(self, rule: str) -> None:
+        self.dropped[rule] = self.dropped.get(rule, 0) + 1
+
+    def add(self, chunk: str) -> None:
+        if self.full:
+            self._drop("over_limit")
+            return
+        cleaned = " ".join(chunk.split())
+        if len(cleaned) < MIN_CHUNK_CHARS:
+            self._drop("too_short")
+            return
+        if len(cleaned.split()) < MIN_CHUNK_WORDS:
+            self._drop("too_few_words")
+            return
+        if len(cleaned) > MAX_CHUNK_CHARS:
+            cleaned = cleaned[:MAX_CHUNK_CHARS]
+            self.truncated += 1
+        if cleaned in self.kept:
+            self._drop("duplicate")
+            return
+        self.kept[cleaned] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"kept": len(self.kept), "truncated": self.truncated, "dropped": dict(self.dropped)}
+
+
+class _OrderedCapture:
+    """
+    Collects text of possibly nested elements and releases it in start-tag order.
+    """
+
+    def __init__(self, chunk_filter: _ChunkFilter):
+        self.filter = chunk_filter
+        self.slots: List[Optional[str]] = []
+        self.flushed = 0
+        self.open: List[List[str]] = []
+        self.open_slots: List[int] = []
+        self.found_text = False
+
+    def start(self) -> None:
+        self.slots.append(None)
+        self.open_slots.append(len(self.slots) - 1)
+        self.open.append([])
+
+    def end(self) -> None:
+        slot = self.open_slots.pop()
+        self.slots[slot] = " ".join(self.open.pop())
+        while self.flushed < len(self.slots) and self.slots[self.flushed] is not None:
+            text = self.slots[self.flushed]
+            self.slots[self.flushed] = ""
+            self.flushed += 1
+            if text:
+                self.found_text = True
+                self.filter.add(text)
+
+    def data(self, words: List[str]) -> None:
+        for buffer in self.open:
+            buffer.extend(words)
+
+
+class _ExtractorTarget:
+    """
+    lxml parser target that routes text to the open <p>/<button> captures.
+    """
+
+    def __init__(self, max_chunks: int, collect_links: bool = False):
+        self.collect_links = collect_links
+        self.links: List[str] = []
+        self.paragraphs = _OrderedCapture(_ChunkFilter(max_chunks))
+        self.buttons = _OrderedCapture(_ChunkFilter(max_chunks))
+        self.inputs = _ChunkFilter(max_chunks)
+        self.found_input_text = False
+        self.page_words: Optional[List[str]] = []
+        self.done = False
+        self.elements = 0
+        self.skipped_elements = 0
+
+        self._pending: List[str] = []
+        self._skip_depth = 0
+        self._container_depth = 0
+
+    @property
+    def found_markup_text(self) -> bool:
+        return self.paragraphs.found_text or self.buttons.found_text or self.found_input_text
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending = []
+        if self._skip_depth or self._container_depth:
+            return
+        words = text.split()
+        if not words:
+            return
+        self.paragraphs.data(words)
+        self.buttons.data(words)
+        if self.page_words is not None:
+            self.page_words.extend(words)
+
+    def _check_fallback(self) -> None:
+        # Page text is only needed while no element has produced any text.
+        if self.page_words is not None and self.found_markup_text:
+            self.page_words = None
+
+    def start(self, tag, attrib, nsmap=None):
+        if self.done:
+            return
+        self.flush()
+        self.elements += 1
+        if self._skip_depth or tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+            self.skipped_elements += 1
+            return
+        if tag in NON_TEXT_CONTAINERS:
+            self._container_depth += 1
+        if tag == "p":
+            self.paragraphs.start()
+        elif tag == "a":
+            if self.collect_links and "href" in attrib:
+                self.links.append(attrib["href"])
+        elif tag == "button":
+            self.buttons.start()
+        elif tag == "input":
+            input_type = (attrib.get("type") or "").strip().lower()
+            value = attrib.get("value") or ""
+            if input_type in SUBMIT_INPUT_TYPES and value.split():
+                self.found_input_text = True
+                self.inputs.add(value)
+                self._check_fallback()
+
+    def end(self, tag):
+        if self.done:
+            return
+        self.flush()
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+        if tag in NON_TEXT_CONTAINERS:
+            self._container_depth -= 1
+        if tag == "p":
+            self.paragraphs.end()
+            self._check_fallback()
+            if self.paragraphs.filter.full and not self.collect_links:
+                self.done = True
+        elif tag == "button":
+            self.buttons.end()
+            self._check_fallback()
+
+    def data(self, data):
+        if not self.done:
+            self._pending.append(data)
+
+    def comment(self, text):
+        self.flush()
+
+    def pi(self, target, data=None):
+        self.flush()
+
+    def doctype(self, *args):
+        self.flush()
+
+    def close(self):
+        self.flush()
+
+
+class ChunkExtractor:
+    """
+    Extracts <p>, <button> and submit <input> text from HTML in one pass,
+    without building a tree, and stops once enough paragraph chunks exist.
+
+    Output matches the BeautifulSoup-based extractor: paragraphs first, then
+    buttons, then input values, falling back to sentence-split page text
+    when none of those carry text.
+    """
+
+    def __init__(self, max_chunks: int = MAX_CHUNKS, collect_links: bool = False):
+        """
+        Initialize the ChunkExtractor.
+
+        Args:
+            max_chunks: Maximum number of chunks returned
+            collect_links: Also collect <a href> values; disables early termination
+        """
+        self.max_chunks = max_chunks
+        self._target = _ExtractorTarget(max_chunks, collect_links=collect_links)
+        self._parser = etree.HTMLParser(target=self._target, recover=True)
+        self._started = False
+        self._closed = False
+        self._fallback: Optional[_ChunkFilter] = None
+        self._merged: Dict[str, int] = {}
+
+    @property
+    def done(self) -> bool:
+        """
+        True once the chunk cap is reached and further input would be ignored.
+        """
+        return self._target.done
+
+    @property
+    def links(self) -> List[str]:
+        """
+        The href values of <a> elements seen so far, when collect_links is set.
+        """
+        return self._target.links
+
+    def feed(self, markup: str) -> bool:
+        """
+        Feed the next piece of the document.
+
+        Args:
+            markup: HTML text
+
+        Returns:
+            True while more input is useful, False once the chunk cap is reached
+        """
+        if self.done or self._closed:
+            return False
+        if not self._started:
+            self._started = True
+            if markup.startswith("\ufeff"):
+                markup = markup[1:]
+        try:
+            self._parser.feed(markup)
+        except (etree.ParserError, etree.XMLSyntaxError) as e:
+            logger.warning(f"Stopped parsing HTML early: {e}")
+            self._target.done = True
+        return not self.done
+
+    def close(self) -> List[str]:
+        """
+        Finish parsing and return the extracted chunks.
+
+        Returns:
+            List of filtered, deduplicated chunks
+        """
+        if not self._closed:
+            self._closed = True
+            if not self.done:
+                try:
+                    if not self._started:
+                        self._parser.feed("")
+                    self._parser.close()
+                except (etree.ParserError, etree.XMLSyntaxError):
+                    self._target.flush()
+        return self._chunks()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report how much of the document was visited and why chunks were dropped.
+
+        Per-source counts come from the filter rules (too_short, too_few_words,
+        duplicate, over_limit); "merged" counts chunks dropped when the sources
+        are combined. Complete only after close().
+
+        Returns:
+            Dictionary with element counts, early-stop and fallback flags, and
+            kept/truncated/dropped counts per source
+        """
+        target = self._target
+        sources = {
+            "paragraphs": target.paragraphs.filter.stats(),
+            "buttons": target.buttons.filter.stats(),
+            "inputs": target.inputs.stats(),
+        }
+        if self._fallback is not None:
+            sources["page_text"] = self._fallback.stats()
+        return {
+            "elements": target.elements,
+            "skipped_elements": target.skipped_elements,
+            "stopped_early": target.done,
+            "fallback": self._fallback is not None,
+            "sources": sources,
+            "merged": dict(self._merged),
+        }
+
+    def _chunks(self) -> List[str]:
+        target = self._target
+        if not target.found_markup_text:
+            fallback = _ChunkFilter(self.max_chunks)
+            for sentence in _SENTENCE_BOUNDARY.split(" ".join(target.page_words or [])):
+                fallback.add(sentence)
+            self._fallback = fallback
+            return list(fallback.kept)
+
+        kept: Dict[str, None] = dict(target.paragraphs.filter.kept)
+        duplicates = 0
+        for source in (target.buttons.filter.kept, target.inputs.kept):
+            for chunk in source:
+                if chunk in kept:
+                    duplicates += 1
+                else:
+                    kept[chunk] = None
+        self._merged = {"duplicate": duplicates, "over_limit": max(0, len(kept) - self.max_chunks)}
+        return list(kept)[: self.max_chunks]
+
+
+def extract_chunks(html: str, max_chunks: int = MAX_CHUNKS) -> List[str]:
+    """
+    Extract text chunks from a complete HTML document.
+
+    Args:
+        html: HTML content as string
+        max_chunks: Maximum number of chunks returned
+
+    Returns:
+        List of filtered, deduplicated chunks
+    """
+    extractor = ChunkExtractor(max_chunks=max_chunks)
+    for start in range(0, len(html), FEED_SIZE):
+        if not extractor.feed(html[start:start + FEED_SIZE]):
+            break
+    return extractor.close()
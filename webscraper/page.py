@@ -0,0 +1,198 @@
+"""
+A fetched page whose extractors share one download and one parse.
+"""
+
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from .extract import MAX_CHUNKS, extract_chunks
+
+if TYPE_CHECKING:
+    from .scraper import WebScraper
+
+# Marks a value that has not been computed yet; None means it failed.
+_UNSET: Any = object()
+
+
+class Page:
+    """
+    One URL, downloaded and parsed at most once.
+
+    The body is fetched on first use, parsed with BeautifulSoup on the first
+    tree-based extractor, and every extractor result is memoized, so asking
+    for text, links and a CSS selection costs one download and one parse.
+    A failed fetch or parse is remembered too and not retried.
+
+    chunks() is served from the body when it is already known. Otherwise it
+    streams the page through the ChunkExtractor like
+    WebScraper.extract_chunks() and keeps the body for later extractors,
+    unless extraction stopped early and the rest of the page was never
+    downloaded. A Page is meant for one caller and is not thread-safe.
+    """
+
+    def __init__(self, scraper: "WebScraper", url: str):
+        """
+        Initialize the Page.
+
+        Args:
+            scraper: WebScraper used to fetch and parse the URL
+            url: The URL to scrape
+        """
+        self.scraper = scraper
+        self.url = url
+        self._html: Optional[str] = _UNSET
+        self._soup: Optional[BeautifulSoup] = _UNSET
+        self._text: Optional[str] = _UNSET
+        self._links: Optional[List[str]] = None
+        self._images: Optional[List[str]] = None
+        self._selections: Dict[str, List[str]] = {}
+        self._chunks: Dict[int, Optional[List[str]]] = {}
+
+    @property
+    def html(self) -> Optional[str]:
+        """
+        The page body, or None if the fetch failed.
+        """
+        if self._html is _UNSET:
+            self._html = self.scraper.fetch(self.url)
+        return self._html
+
+    @property
+    def soup(self) -> Optional[BeautifulSoup]:
+        """
+        The parsed page, or None if the fetch or parse failed.
+
+        Shared by all extractors, so callers must not modify it.
+        """
+        if self._soup is _UNSET:
+            html = self.html
+            self._soup = self.scraper.parse(html) if html is not None else None
+        return self._soup
+
+    @property
+    def error(self) -> Optional[str]:
+        """
+        Why the page could not be scraped, or None once it is parsed.
+        """
+        if self.html is None:
+            return "Failed to fetch URL"
+        if self.soup is None:
+            return "Failed to parse HTML"
+        return None
+
+    @property
+    def text(self) -> Optional[str]:
+        """
+        All visible text with whitespace collapsed, or None if failed.
+        """
+        if self._text is _UNSET:
+            soup = self.soup
+            if soup is None:
+                self._text = None
+            else:
+                # Strings inside <script> and <style> are Script/Stylesheet
+                # strings, which get_text() leaves out, so the shared tree
+                # does not need them decomposed.
+                lines = (line.strip() for line in soup.get_text().splitlines())
+                phrases = (phrase.strip() for line in lines for phrase in line.split("  "))
+                self._text = " ".join(phrase for phrase in phrases if phrase)
+        return self._text
+
+    @property
+    def links(self) -> List[str]:
+        """
+        The href values of <a> elements.
+        """
+        if self._links is None:
+            self._collect_references()
+        return self._links
+
+    @property
+    def images(self) -> List[str]:
+        """
+        The src values of <img> elements.
+        """
+        if self._images is None:
+            self._collect_references()
+        return self._images
+
+    def _collect_references(self) -> None:
+        # Links and images come from the same walk over the tree.
+        self._links, self._images = [], []
+        if self.soup is None:
+            return
+        for tag in self.soup.find_all(["a", "img"]):
+            if tag.name == "a" and tag.has_attr("href"):
+                self._links.append(tag["href"])
+            elif tag.name == "img" and tag.has_attr("src"):
+                self._images.append(tag["src"])
+
+    def select(self, selector: str) -> List[str]:
+        """
+        Get the text of elements matching a CSS selector.
+
+        Args:
+            selector: CSS selector
+
+        Returns:
+            List of element texts, stripped
+        """
+        if selector not in self._selections:
+            soup = self.soup
+            self._selections[selector] = (
+                [element.get_text(strip=True) for element in soup.select(selector)] if soup is not None else []
+            )
+        return self._selections[selector]
+
+    def chunks(self, max_chunks: int = MAX_CHUNKS, trace: Optional[Dict[str, Any]] = None) -> Optional[List[str]]:
+        """
+        Get the page's visible text chunks.
+
+        Args:
+            max_chunks: Maximum number of chunks returned
+            trace: Optional dict filled as by WebScraper.extract_chunks() when
+                this call downloads the page
+
+        Returns:
+            List of text chunks, or None if the fetch fails
+        """
+        if max_chunks not in self._chunks:
+            if self._html is _UNSET:
+                chunks, html = self.scraper._extract(self.url, max_chunks, trace, keep_body=True)
+                if chunks is None:
+                    self._html = None
+                elif html is not None:
+                    self._html = html
+            elif self._html is None:
+                chunks = None
+            else:
+                started = time.perf_counter()
+                chunks = extract_chunks(self._html, max_chunks=max_chunks)
+                self.scraper._observe_stage("extract", time.perf_counter() - started)
+            self._chunks[max_chunks] = chunks
+        return self._chunks[max_chunks]
+
+    def scrape(self) -> Dict[str, Any]:
+        """
+        Collect the page's text, links and images.
+
+        Returns:
+            Dictionary in the WebScraper.scrape() format
+        """
+        result = {
+            'url': self.url,
+            'success': False,
+            'text_content': None,
+            'links': [],
+            'images': [],
+            'error': self.error,
+        }
+        if result['error'] is not None:
+            return result
+        result['text_content'] = self.text
+        result['links'] = list(self.links)
+        result['images'] = list(self.images)
+        result['success'] = True
+        return result
@@ -0,0 +1,296 @@
+"""
+On-disk cache of fetched pages, their HTTP validators and extracted chunks.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PageCache:
+    """
+    SQLite-backed page cache used by WebScraper for conditional requests.
+
+    Each entry keeps the response validators (ETag / Last-Modified), the
+    decoded body when it was downloaded in full, and the chunk list last
+    extracted from it. Entries are evicted least-recently-used once the
+    stored size passes max_bytes. The total size is kept in a one-row table
+    by triggers, in the same transaction as each write, so checking it costs
+    one lookup even when several processes share the database.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, max_age: float = 0.0):
+        """
+        Initialize the PageCache.
+
+        Args:
+            path: SQLite database file
+            max_bytes: Maximum total stored size before eviction
+            max_age: Seconds an entry is served without revalidation (0: always revalidate)
+        """
+        self.path = str(Path(path).resolve())
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._local = threading.local()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, "
+                "chunks TEXT, max_chunks INTEGER, stored_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages(accessed_at)")
+            connection.execute("CREATE TABLE IF NOT EXISTS pages_size (total INTEGER NOT NULL)")
+            connection.execute(
+                "INSERT INTO pages_size SELECT coalesce(sum(size), 0) FROM pages "
+                "WHERE NOT EXISTS (SELECT 1 FROM pages_size)"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS pages_size_insert AFTER INSERT ON pages "
+                "BEGIN UPDATE pages_size SET total = total + NEW.size; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS pages_size_delete AFTER DELETE ON pages "
+                "BEGIN UPDATE pages_size SET total = total - OLD.size; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS pages_size_update AFTER UPDATE OF size ON pages "
+                "BEGIN UPDATE pages_size SET total = total + NEW.size - OLD.size; END"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached page.
+
+        Args:
+            url: The page URL
+
+        Returns:
+            Dictionary with etag, last_modified, body, chunks, max_chunks and
+            stored_at, or None if the URL is not cached
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT etag, last_modified, body, chunks, max_chunks, stored_at FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache read failed for {url}: {e}")
+            return None
+        if row is None:
+            return None
+        etag, last_modified, body, chunks, max_chunks, stored_at = row
+        try:
+            body = zlib.decompress(body).decode("utf-8") if body is not None else None
+            chunks = json.loads(chunks) if chunks is not None else None
+        except (zlib.error, ValueError, UnicodeDecodeError) as e:
+            # A corrupt entry is a miss; dropping it lets the next fetch replace it.
+            logger.warning(f"Page cache entry for {url} is corrupt: {e}")
+            self.delete(url)
+            return None
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+            "chunks": chunks,
+            "max_chunks": max_chunks,
+            "stored_at": stored_at,
+        }
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """
+        Whether an entry may be served without contacting the origin.
+        """
+        return self.max_age > 0 and time.time() - entry["stored_at"] < self.max_age
+
+    @staticmethod
+    def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Build If-None-Match / If-Modified-Since headers for a cached entry.
+        """
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def is_cacheable(self, response_headers: Any) -> bool:
+        """
+        Whether a response can be stored, based on its headers.
+        """
+        cache_control = (response_headers.get("Cache-Control") or "").lower()
+        if "no-store" in cache_control:
+            return False
+        has_validators = bool(response_headers.get("ETag") or response_headers.get("Last-Modified"))
+        return has_validators or self.max_age > 0
+
+    def record_hit(self, url: str, revalidated: bool) -> None:
+        """
+        Count a hit and mark the entry as recently used (and re-validated).
+        """
+        if revalidated:
+            self.revalidations += 1
+        else:
+            self.hits += 1
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                if revalidated:
+                    connection.execute(
+                        "UPDATE pages SET accessed_at = ?, stored_at = ? WHERE url = ?", (now, now, url)
+                    )
+                else:
+                    connection.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, url))
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache update failed for {url}: {e}")
+
+    def record_miss(self) -> None:
+        """
+        Count a page that had to be downloaded in full.
+        """
+        self.misses += 1
+
+    def put(
+        self,
+        url: str,
+        response_headers: Any,
+        body: Optional[str],
+        chunks: Optional[List[str]] = None,
+        max_chunks: Optional[int] = None,
+    ) -> None:
+        """
+        Store a freshly downloaded page, replacing any earlier entry.
+
+        Args:
+            url: The page URL
+            response_headers: Headers of the 200 response
+            body: Full decoded body, or None if the download stopped early
+            chunks: Chunks extracted from the page, if any
+            max_chunks: The chunk cap the chunks were extracted with
+        """
+        stored_body = zlib.compress(body.encode("utf-8")) if body is not None else None
+        stored_chunks = json.dumps(chunks) if chunks is not None else None
+        size = len(stored_body or b"") + len(stored_chunks or "") + len(url)
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                # An upsert rather than INSERT OR REPLACE: the implicit delete
+                # of a REPLACE does not fire the size trigger.
+                connection.execute(
+                    "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(url) DO UPDATE SET "
+                    "etag = excluded.etag, last_modified = excluded.last_modified, body = excluded.body, "
+                    "chunks = excluded.chunks, max_chunks = excluded.max_chunks, stored_at = excluded.stored_at, "
+                    "accessed_at = excluded.accessed_at, size = excluded.size",
+                    (
+                        url,
+                        response_headers.get("ETag"),
+                        response_headers.get("Last-Modified"),
+                        stored_body,
+                        stored_chunks,
+                        max_chunks,
+                        now,
+                        now,
+                        size,
+                    ),
+                )
+            self._evict()
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache write failed for {url}: {e}")
+
+    def update_chunks(self, url: str, chunks: List[str], max_chunks: int) -> None:
+        """
+        Replace the stored chunk list of an entry, keeping its body and validators.
+        """
+        stored_chunks = json.dumps(chunks)
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "UPDATE pages SET chunks = ?, max_chunks = ?, "
+                    "size = length(coalesce(body, x'')) + ? + length(url) WHERE url = ?",
+                    (stored_chunks, max_chunks, len(stored_chunks), url),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache update failed for {url}: {e}")
+
+    def delete(self, url: str) -> None:
+        """
+        Drop an entry, e.g. because its page is no longer cacheable.
+        """
+        try:
+            with self._connection() as connection:
+                connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache delete failed for {url}: {e}")
+
+    def size(self) -> int:
+        """
+        Total stored size of all entries.
+        """
+        return self._connection().execute("SELECT total FROM pages_size").fetchone()[0]
+
+    def _evict(self) -> None:
+        total = self.size()
+        if total <= self.max_bytes:
+            return
+        with self._connection() as connection:
+            evicted = []
+            for url, size in connection.execute("SELECT url, size FROM pages ORDER BY accessed_at"):
+                if total <= self.max_bytes:
+                    break
+                evicted.append((url,))
+                total -= size
+            connection.executemany("DELETE FROM pages WHERE url = ?", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report hit, revalidation and miss counts.
+        """
+        return {"hits": self.hits, "revalidations": self.revalidations, "misses": self.misses}
+
+
+_shared_page_cache: Optional[PageCache] = None
+_shared_page_cache_lock = threading.Lock()
+
+
+def get_shared_page_cache() -> Optional[PageCache]:
+    """
+    Return the process-wide page cache, or None if SCRAPER_PAGE_CACHE_PATH is unset.
+
+    Size and freshness come from SCRAPER_PAGE_CACHE_BYTES and
+    SCRAPER_PAGE_CACHE_MAX_AGE.
+    """
+    global _shared_page_cache
+    path = os.environ.get("SCRAPER_PAGE_CACHE_PATH")
+    if not path:
+        return None
+    if _shared_page_cache is None:
+        with _shared_page_cache_lock:
+            if _shared_page_cache is None:
+                _shared_page_cache = PageCache(
+                    path,
+                    max_bytes=int(os.environ.get("SCRAPER_PAGE_CACHE_BYTES", 256 * 1024 * 1024)),
+                    max_age=float(os.environ.get("SCRAPER_PAGE_CACHE_MAX_AGE", 0)),
+                )
+    return _shared_page_cache
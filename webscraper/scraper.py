@@ -2,30 +2,114 @@
 Core web scraping functionality.
 """
 
+import codecs
+import os
+import time
 import requests
 from bs4 import BeautifulSoup
-from typing import Optional, List, Dict, Any
+from requests.compat import chardet
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
 import logging
 
+from .extract import MAX_CHUNKS, ChunkExtractor, extract_chunks
+from .page import Page
+from .page_cache import PageCache
+from .session import get_shared_session
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_BYTES = int(os.environ.get("SCRAPER_MAX_BYTES", 10 * 1024 * 1024))
+DEFAULT_MAX_DECOMPRESSION_RATIO = float(os.environ.get("SCRAPER_MAX_DECOMPRESSION_RATIO", 100))
+HTML_CONTENT_TYPES = frozenset({"text/html", "application/xhtml+xml"})
+STREAM_CHUNK_SIZE = 64 * 1024
+# Below this many decoded bytes the decompression ratio is not checked.
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+
+
+class FetchAborted(Exception):
+    """
+    Raised while streaming a body that breaks the byte budget or fails mid-read.
+    """
+
+
+class _ResponseText:
+    """
+    Incrementally decoded text of a streamed response.
+
+    Closing it (or letting it be garbage-collected) closes the response even
+    when iteration never started, which a bare generator would not: its
+    finally block only runs once the first piece was requested.
+    """
+
+    def __init__(self, response: requests.Response, pieces: Iterator[str]):
+        self.response = response
+        self._pieces = pieces
+
+    def __iter__(self) -> "_ResponseText":
+        return self
+
+    def __next__(self) -> str:
+        return next(self._pieces)
+
+    def close(self) -> None:
+        try:
+            self._pieces.close()
+        finally:
+            self.response.close()
+
+    def __del__(self) -> None:
+        self.close()
+
 
 class WebScraper:
     """
     A web scraper class for fetching and parsing website content.
     """
     
-    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: int = 30):
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: int = 30,
+        connect_timeout: Optional[float] = None,
+        session: Optional[requests.Session] = None,
+        max_bytes: Optional[int] = None,
+        max_decompression_ratio: Optional[float] = None,
+        allowed_content_types: Optional[Iterable[str]] = None,
+        page_cache: Optional[PageCache] = None,
+        metrics: Optional[Any] = None,
+    ):
         """
         Initialize the WebScraper.
         
         Args:
             headers: Optional custom headers for HTTP requests
-            timeout: Request timeout in seconds (default: 30)
+            timeout: Read timeout in seconds (default: 30)
+            connect_timeout: Connect timeout in seconds (default: same as timeout)
+            session: Optional requests session (default: the shared pooled session)
+            max_bytes: Maximum body size, on the wire and decoded (default: SCRAPER_MAX_BYTES)
+            max_decompression_ratio: Maximum decoded/wire size ratio before aborting
+            allowed_content_types: Accepted media types (default: HTML and XHTML)
+            page_cache: Optional PageCache for conditional re-fetching
+            metrics: Optional registry with observe(name, value, **labels) and
+                inc(name, amount, **labels) that receives stage timings, wire
+                bytes and errors (e.g. the backend's pipeline.metrics registry)
         """
         self.timeout = timeout
+        self.connect_timeout = connect_timeout if connect_timeout is not None else timeout
+        self.session = session or get_shared_session()
+        self.max_bytes = max_bytes if max_bytes is not None else DEFAULT_MAX_BYTES
+        self.max_decompression_ratio = (
+            max_decompression_ratio
+            if max_decompression_ratio is not None
+            else DEFAULT_MAX_DECOMPRESSION_RATIO
+        )
+        self.allowed_content_types = frozenset(
+            content_type.lower() for content_type in (allowed_content_types or HTML_CONTENT_TYPES)
+        )
+        self.page_cache = page_cache
+        self.metrics = metrics
         self.headers = headers or {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
@@ -40,16 +124,273 @@ class WebScraper:
         Returns:
             HTML content as string, or None if request fails
         """
+        cached = self.page_cache.get(url) if self.page_cache else None
+        stored = cached is not None
+        if cached is not None and cached["body"] is None:
+            cached = None
+        if cached is not None and self.page_cache.is_fresh(cached):
+            self.page_cache.record_hit(url, revalidated=False)
+            return cached["body"]
+
+        started = time.perf_counter()
+        response = self._open(url, PageCache.conditional_headers(cached) if cached else None)
+        if response is None:
+            return None
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            logger.info(f"Not modified: {url}")
+            self.page_cache.record_hit(url, revalidated=True)
+            return cached["body"]
+        if stored and not self.page_cache.is_cacheable(response.headers):
+            # The page stopped being cacheable; its old copy must not be served.
+            self.page_cache.delete(url)
+
+        pieces = self._iter_text(url, response)
+        try:
+            html = "".join(pieces)
+        except FetchAborted as e:
+            logger.error(f"Error fetching {url}: {e}")
+            self._count_error("fetch_aborted")
+            return None
+        finally:
+            pieces.close()
+        self._observe_stage("fetch", time.perf_counter() - started)
+
+        if self.page_cache and self.page_cache.is_cacheable(response.headers):
+            self.page_cache.record_miss()
+            self.page_cache.put(url, response.headers, body=html)
+        return html
+
+    def extract_chunks(
+        self, url: str, max_chunks: int = MAX_CHUNKS, trace: Optional[Dict[str, Any]] = None
+    ) -> Optional[List[str]]:
+        """
+        Fetch a URL and extract its visible text chunks while it downloads.
+
+        With a page cache, a revisit sends the stored validators and a 304
+        response returns the cached chunks without downloading or parsing.
+        
+        Args:
+            url: The URL to scrape
+            max_chunks: Maximum number of chunks returned
+            trace: Optional dict filled with this call's page-cache outcome,
+                status code, byte counts, fetch/extract times in milliseconds
+                and the extractor's stats()
+            
+        Returns:
+            List of text chunks, or None if the fetch fails
+        """
+        return self._extract(url, max_chunks, trace)[0]
+
+    def page(self, url: str) -> Page:
+        """
+        Open a URL as a Page, which fetches and parses it at most once.
+
+        Args:
+            url: The URL to scrape
+
+        Returns:
+            Page whose extractors (text, links, images, CSS selections and
+            chunks) are computed on first use and memoized
+        """
+        return Page(self, url)
+
+    def _extract(
+        self,
+        url: str,
+        max_chunks: int,
+        trace: Optional[Dict[str, Any]] = None,
+        keep_body: bool = False,
+    ) -> Tuple[Optional[List[str]], Optional[str]]:
+        # Returns (chunks, body). The body is only known when keep_body is set
+        # or the page is cacheable, and the download was not cut short.
+        cached = self.page_cache.get(url) if self.page_cache else None
+        stored = cached is not None
+        if cached is not None and cached["body"] is None and cached["max_chunks"] != max_chunks:
+            cached = None
+        if cached is not None and self.page_cache.is_fresh(cached):
+            self.page_cache.record_hit(url, revalidated=False)
+            if trace is not None:
+                trace["page_cache"] = "hit"
+            return self._cached_chunks(url, cached, max_chunks), cached["body"]
+
+        started = time.perf_counter()
+        response = self._open(url, PageCache.conditional_headers(cached) if cached else None)
+        if response is None:
+            return None, None
+        if trace is not None:
+            trace["status_code"] = response.status_code
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            logger.info(f"Not modified: {url}")
+            self.page_cache.record_hit(url, revalidated=True)
+            if trace is not None:
+                trace["page_cache"] = "revalidated"
+            return self._cached_chunks(url, cached, max_chunks), cached["body"]
+
+        cacheable = self.page_cache is not None and self.page_cache.is_cacheable(response.headers)
+        if stored and not cacheable:
+            self.page_cache.delete(url)
+        body: Optional[List[str]] = [] if cacheable or keep_body else None
+        extractor = ChunkExtractor(max_chunks=max_chunks)
+        pieces = self._iter_text(url, response, trace)
+        # Parsing runs interleaved with the download; the time spent in
+        # feed() is extraction, the remainder is fetching.
+        extract_seconds = 0.0
+        try:
+            for piece in pieces:
+                if body is not None:
+                    body.append(piece)
+                feed_started = time.perf_counter()
+                more = extractor.feed(piece)
+                extract_seconds += time.perf_counter() - feed_started
+                if not more:
+                    # The rest of the page cannot change the result.
+                    body = None
+                    break
+        except FetchAborted as e:
+            logger.error(f"Error fetching {url}: {e}")
+            self._count_error("fetch_aborted")
+            return None, None
+        finally:
+            pieces.close()
+
+        html = "".join(body) if body is not None else None
+        downloaded = time.perf_counter()
+        chunks = extractor.close()
+        fetch_seconds = downloaded - started - extract_seconds
+        extract_seconds += time.perf_counter() - downloaded
+        self._observe_stage("fetch", fetch_seconds)
+        self._observe_stage("extract", extract_seconds)
+        if trace is not None:
+            if self.page_cache is not None:
+                trace["page_cache"] = "miss"
+            trace["fetch_ms"] = fetch_seconds * 1000
+            trace["extract_ms"] = extract_seconds * 1000
+            trace["extraction"] = extractor.stats()
+        if cacheable:
+            self.page_cache.record_miss()
+            self.page_cache.put(url, response.headers, body=html, chunks=chunks, max_chunks=max_chunks)
+        return chunks, html
+
+    def _cached_chunks(self, url: str, cached: Dict[str, Any], max_chunks: int) -> List[str]:
+        if cached["chunks"] is not None and cached["max_chunks"] == max_chunks:
+            return cached["chunks"]
+        chunks = extract_chunks(cached["body"], max_chunks=max_chunks)
+        self.page_cache.update_chunks(url, chunks, max_chunks)
+        return chunks
+
+    def _open(
+        self,
+        url: str,
+        extra_headers: Optional[Dict[str, str]] = None,
+        allow_redirects: bool = True,
+    ) -> Optional[requests.Response]:
+        # Without allow_redirects, a redirect response is returned unread so
+        # the caller can vet its Location before following it.
+        headers = {**self.headers, **extra_headers} if extra_headers else self.headers
         try:
             logger.info(f"Fetching URL: {url}")
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = self.session.get(
+                url,
+                headers=headers,
+                timeout=(self.connect_timeout, self.timeout),
+                stream=True,
+                allow_redirects=allow_redirects,
+            )
             response.raise_for_status()
-            logger.info(f"Successfully fetched {url}")
-            return response.text
         except requests.RequestException as e:
             logger.error(f"Error fetching {url}: {e}")
+            self._count_error(type(e).__name__)
             return None
-    
+
+        if response.is_redirect and not allow_redirects:
+            return response
+
+        if response.status_code == 304:
+            if extra_headers:
+                return response
+            logger.error(f"Error fetching {url}: unexpected 304 response")
+            self._count_error("unexpected_not_modified")
+            response.close()
+            return None
+
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type and content_type not in self.allowed_content_types:
+            logger.error(f"Error fetching {url}: unsupported content type {content_type}")
+            self._count_error("unsupported_content_type")
+            response.close()
+            return None
+
+        content_length = response.headers.get("Content-Length", "")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            logger.error(f"Error fetching {url}: Content-Length {content_length} exceeds {self.max_bytes} bytes")
+            self._count_error("body_too_large")
+            response.close()
+            return None
+
+        return response
+
+    def _iter_text(
+        self, url: str, response: requests.Response, trace: Optional[Dict[str, Any]] = None
+    ) -> _ResponseText:
+        return _ResponseText(response, self._decode_body(url, response, trace))
+
+    def _decode_body(
+        self, url: str, response: requests.Response, trace: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        decoder = None
+        decoded_bytes = 0
+        wire_bytes = 0
+        try:
+            for block in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                decoded_bytes += len(block)
+                wire_bytes = response.raw.tell() or decoded_bytes
+                if decoded_bytes > self.max_bytes or wire_bytes > self.max_bytes:
+                    raise FetchAborted(f"body exceeds {self.max_bytes} bytes")
+                if (
+                    decoded_bytes > RATIO_CHECK_MIN_BYTES
+                    and decoded_bytes > wire_bytes * self.max_decompression_ratio
+                ):
+                    raise FetchAborted(
+                        f"decompression ratio exceeds {self.max_decompression_ratio:g}"
+                    )
+
+                if decoder is None:
+                    decoder = self._decoder(response.encoding or chardet.detect(block)["encoding"])
+                text = decoder.decode(block)
+                if text:
+                    yield text
+
+            if decoder is not None:
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    yield tail
+            logger.info(f"Successfully fetched {url}")
+        except requests.RequestException as e:
+            raise FetchAborted(str(e)) from e
+        finally:
+            if self.metrics is not None and wire_bytes:
+                self.metrics.inc("fetched_bytes_total", wire_bytes)
+            if trace is not None:
+                trace["wire_bytes"] = wire_bytes
+                trace["decoded_bytes"] = decoded_bytes
+
+    def _observe_stage(self, stage: str, seconds: float) -> None:
+        if self.metrics is not None:
+            self.metrics.observe("stage_seconds", seconds, stage=stage)
+
+    def _count_error(self, kind: str) -> None:
+        if self.metrics is not None:
+            self.metrics.inc("errors_total", type=kind)
+
+    @staticmethod
+    def _decoder(encoding: Optional[str]) -> codecs.IncrementalDecoder:
+        try:
+            return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        except LookupError:
+            return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
     def parse(self, html: str) -> Optional[BeautifulSoup]:
         """
         Parse HTML content using BeautifulSoup.
@@ -60,11 +401,15 @@ class WebScraper:
         Returns:
             BeautifulSoup object, or None if parsing fails
         """
+        started = time.perf_counter()
         try:
-            return BeautifulSoup(html, 'lxml')
+            soup = BeautifulSoup(html, 'lxml')
         except Exception as e:
             logger.error(f"Error parsing HTML: {e}")
+            self._count_error("parse_error")
             return None
+        self._observe_stage("parse", time.perf_counter() - started)
+        return soup
     
     def get_text_content(self, url: str) -> Optional[str]:
         """
@@ -76,25 +421,7 @@ class WebScraper:
         Returns:
             Text content as string, or None if failed
         """
-        html = self.fetch(url)
-        if html is None:
-            return None
-        
-        soup = self.parse(html)
-        if soup is None:
-            return None
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        text = soup.get_text()
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return text
+        return self.page(url).text
     
     def get_links(self, url: str) -> List[str]:
         """
@@ -106,19 +433,7 @@ class WebScraper:
         Returns:
             List of URLs
         """
-        html = self.fetch(url)
-        if html is None:
-            return []
-        
-        soup = self.parse(html)
-        if soup is None:
-            return []
-        
-        links = []
-        for link in soup.find_all('a', href=True):
-            links.append(link['href'])
-        
-        return links
+        return self.page(url).links
     
     def get_images(self, url: str) -> List[str]:
         """
@@ -130,19 +445,7 @@ class WebScraper:
         Returns:
             List of image URLs
         """
-        html = self.fetch(url)
-        if html is None:
-            return []
-        
-        soup = self.parse(html)
-        if soup is None:
-            return []
-        
-        images = []
-        for img in soup.find_all('img', src=True):
-            images.append(img['src'])
-        
-        return images
+        return self.page(url).images
     
     def get_elements(self, url: str, selector: str) -> List[str]:
         """
@@ -155,16 +458,7 @@ class WebScraper:
         Returns:
             List of element texts
         """
-        html = self.fetch(url)
-        if html is None:
-            return []
-        
-        soup = self.parse(html)
-        if soup is None:
-            return []
-        
-        elements = soup.select(selector)
-        return [elem.get_text(strip=True) for elem in elements]
+        return self.page(url).select(selector)
     
     def scrape(self, url: str) -> Dict[str, Any]:
         """
@@ -176,45 +470,7 @@ class WebScraper:
         Returns:
             Dictionary containing scraped data
         """
-        result = {
-            'url': url,
-            'success': False,
-            'text_content': None,
-            'links': [],
-            'images': [],
-            'error': None
-        }
-        
-        html = self.fetch(url)
-        if html is None:
-            result['error'] = 'Failed to fetch URL'
-            return result
-        
-        soup = self.parse(html)
-        if soup is None:
-            result['error'] = 'Failed to parse HTML'
-            return result
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        result['text_content'] = ' '.join(chunk for chunk in chunks if chunk)
-        
-        # Get links
-        for link in soup.find_all('a', href=True):
-            result['links'].append(link['href'])
-        
-        # Get images
-        for img in soup.find_all('img', src=True):
-            result['images'].append(img['src'])
-        
-        result['success'] = True
-        return result
+        return self.page(url).scrape()
 
 
 # Convenience functions
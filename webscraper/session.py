@@ -0,0 +1,208 @@
+"""
+Shared, pooled HTTP session used by WebScraper.
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class DNSCache:
+    """
+    Small TTL cache of resolved addresses, keyed by (host, port).
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 512):
+        """
+        Initialize the DNSCache.
+
+        Args:
+            ttl: Seconds a resolved address is reused
+            max_entries: Maximum number of cached hosts
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> str:
+        """
+        Resolve a host to an IP address, reusing a cached answer when fresh.
+
+        Args:
+            host: Hostname to resolve
+            port: Port the connection is for
+
+        Returns:
+            IP address as string
+        """
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] > now:
+                self._entries.move_to_end(key)
+                return cached[1]
+
+        address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4][0]
+        with self._lock:
+            self._entries[key] = (now + self.ttl, address)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return address
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def forget(self, host: str, port: int) -> None:
+        """
+        Drop a cached address, e.g. after a failed connection.
+        """
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+dns_cache = DNSCache(ttl=float(os.environ.get("SCRAPER_DNS_TTL", 60)))
+
+
+class _CachedDNSMixin:
+    def _new_conn(self) -> socket.socket:
+        hostname = self._dns_host
+        if dns_cache.ttl <= 0:
+            return super()._new_conn()
+        try:
+            address = dns_cache.resolve(hostname, self.port)
+        except socket.gaierror:
+            return super()._new_conn()
+
+        # urllib3 only uses _dns_host to open the socket; SNI and the Host
+        # header are taken from it again after this method returns.
+        self._dns_host = address
+        try:
+            return super()._new_conn()
+        except Exception:
+            dns_cache.forget(hostname, self.port)
+            raise
+        finally:
+            self._dns_host = hostname
+
+
+class _CachedDNSHTTPConnection(_CachedDNSMixin, HTTPConnection):
+    pass
+
+
+class _CachedDNSHTTPSConnection(_CachedDNSMixin, HTTPSConnection):
+    pass
+
+
+class _CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CachedDNSHTTPConnection
+
+
+class _CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CachedDNSHTTPSConnection
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections resolve hosts through the shared DNSCache.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CachedDNSHTTPConnectionPool,
+            "https": _CachedDNSHTTPSConnectionPool,
+        }
+
+
+def build_session(
+    pool_connections: int = 32,
+    pool_maxsize: int = 8,
+    retries: int = 2,
+    backoff_factor: float = 0.3,
+) -> requests.Session:
+    """
+    Build a keep-alive session with bounded per-host pools and GET retries.
+
+    Args:
+        pool_connections: Number of per-host pools kept alive
+        pool_maxsize: Maximum connections kept per host
+        retries: Retry attempts for idempotent requests
+        backoff_factor: Exponential backoff factor between retries
+
+    Returns:
+        Configured requests.Session
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = PooledHTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    # Scans of unrelated pages must not leak cookies into each other.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_shared_session: Optional[requests.Session] = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session() -> requests.Session:
+    """
+    Return the process-wide session, creating it on first use.
+
+    Pool sizes and retry policy come from the SCRAPER_POOL_CONNECTIONS,
+    SCRAPER_POOL_MAXSIZE, SCRAPER_RETRIES and SCRAPER_BACKOFF environment
+    variables.
+    """
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = build_session(
+                    pool_connections=int(os.environ.get("SCRAPER_POOL_CONNECTIONS", 32)),
+                    pool_maxsize=int(os.environ.get("SCRAPER_POOL_MAXSIZE", 8)),
+                    retries=int(os.environ.get("SCRAPER_RETRIES", 2)),
+                    backoff_factor=float(os.environ.get("SCRAPER_BACKOFF", 0.3)),
+                )
+    return _shared_session
+
+
+def session_stats() -> Dict[str, int]:
+    """
+    Report the number of live host pools and cached DNS entries.
+    """
+    pools = 0
+    if _shared_session is not None:
+        adapter = _shared_session.get_adapter("https://")
+        pools = len(adapter.poolmanager.pools)
+    return {"host_pools": pools, "dns_entries": len(dns_cache)}